@@ -5,8 +5,7 @@ from sqlalchemy.ext.asyncio import create_async_engine
 from sqlmodel import SQLModel
 
 from alembic import context
-from apps.example.models import *
-from apps.example_app.models import *
+from config.apps import app_registry
 from config.settings import get_settings
 
 # this is the Alembic Config object, which provides
@@ -24,6 +23,8 @@ if config.config_file_name is not None:
 # target_metadata = mymodel.Base.metadata
 
 # target_metadata = None
+# the models of every app under `apps/`, see `config.apps`
+app_registry.import_models()
 target_metadata = SQLModel.metadata
 settings = get_settings()
 db_url = str(settings.ASYNC_DATABASE_URI)
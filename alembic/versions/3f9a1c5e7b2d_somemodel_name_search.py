@@ -0,0 +1,63 @@
+"""somemodel name search index
+
+Revision ID: 3f9a1c5e7b2d
+Revises: 7235dcd2cce6
+Create Date: 2026-10-18 10:12:41.204518
+
+"""
+
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "3f9a1c5e7b2d"
+down_revision: Union[str, Sequence[str], None] = "7235dcd2cce6"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# kept in sync with `apps.example.models.somemodel`
+SQLITE_NAME_SEARCH_DDL = (
+    "CREATE VIRTUAL TABLE IF NOT EXISTS somemodel_search "
+    "USING fts5(name, content='somemodel', content_rowid='id')",
+    "CREATE TRIGGER IF NOT EXISTS somemodel_search_insert AFTER INSERT ON somemodel "
+    "BEGIN INSERT INTO somemodel_search(rowid, name) VALUES (new.id, new.name); END",
+    "CREATE TRIGGER IF NOT EXISTS somemodel_search_delete AFTER DELETE ON somemodel "
+    "BEGIN INSERT INTO somemodel_search(somemodel_search, rowid, name) "
+    "VALUES ('delete', old.id, old.name); END",
+    "CREATE TRIGGER IF NOT EXISTS somemodel_search_update "
+    "AFTER UPDATE OF name ON somemodel "
+    "BEGIN INSERT INTO somemodel_search(somemodel_search, rowid, name) "
+    "VALUES ('delete', old.id, old.name); "
+    "INSERT INTO somemodel_search(rowid, name) VALUES (new.id, new.name); END",
+)
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    dialect = op.get_bind().dialect.name
+    if dialect == "postgresql":
+        op.create_index(
+            "ix_somemodel_name_search",
+            "somemodel",
+            [sa.text("to_tsvector('simple', name)")],
+            postgresql_using="gin",
+        )
+    elif dialect == "sqlite":
+        for statement in SQLITE_NAME_SEARCH_DDL:
+            op.execute(statement)
+        # index the rows that already exist
+        op.execute("INSERT INTO somemodel_search(somemodel_search) VALUES ('rebuild')")
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    dialect = op.get_bind().dialect.name
+    if dialect == "postgresql":
+        op.drop_index("ix_somemodel_name_search", table_name="somemodel")
+    elif dialect == "sqlite":
+        for trigger in ("insert", "delete", "update"):
+            op.execute(f"DROP TRIGGER IF EXISTS somemodel_search_{trigger}")
+        op.execute("DROP TABLE IF EXISTS somemodel_search")
@@ -0,0 +1,25 @@
+from fastapi import APIRouter, HTTPException, status
+
+from common.schemas.jobs import JobRead
+from common.schemas.response import StandardResponse
+from common.utils.jobs import job_queue
+
+router = APIRouter()
+
+
+@router.get(
+    "/{job_id}",
+    response_model=StandardResponse[JobRead],
+    status_code=status.HTTP_200_OK,
+)
+async def get_job_api(job_id: str):
+    """
+    Status of a background job, and its result once it succeeded
+    """
+    job = await job_queue.get(job_id)
+    if job is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Job Not Found",
+        )
+    return StandardResponse(data=job)
@@ -1,14 +1,12 @@
 from fastapi import APIRouter
 
-from apps.example.apis.v1 import router as example_router_v1
-from apps.example.apis.v2 import router as example_router_v2
-from apps.example_app.apis.v1 import router as example2_router_v1
+from api.jobs import router as jobs_router
+from config.apps import app_registry
 
 api_router = APIRouter()
 
-# subapp #1
-api_router.include_router(example_router_v1, prefix="/example")
-api_router.include_router(example_router_v2, prefix="/example")
+# the `apis/v*` routers of every app under `apps/`, see `config.apps`
+api_router.include_router(app_registry.api_router())
 
-# subapp #2
-api_router.include_router(example2_router_v1, prefix="/example2")
+# background jobs
+api_router.include_router(jobs_router, prefix="/jobs", tags=["Jobs"])
@@ -1,18 +1,30 @@
 from typing import List, Optional
 
-from fastapi import APIRouter, Depends, Query, status
-from fastapi_pagination import Page, Params
+from fastapi import APIRouter, Depends, Path, Query, Request, Response, status
+from fastapi_pagination import Params
 from sqlmodel.ext.asyncio.session import AsyncSession
 
 from apps.example.schemas import (
+    SomeModelBulkDelete,
     SomeModelCreate,
     SomeModelDelete,
     SomeModelRead,
     SomeModelUpdate,
 )
 from apps.example.services.core_service import SomeModelService
-from common.schemas.enums import OrderEnum
+from common.schemas.enums import CountModeEnum, ExportFormatEnum, OrderEnum
+from common.schemas.ingest import IngestReport
+from common.schemas.jobs import JobRead
+from common.schemas.pagination import CursorPage, CursorParams, Page
 from common.schemas.response import StandardResponse
+from common.utils.conditional import (
+    is_conditional,
+    is_not_modified,
+    not_modified,
+    page_validator,
+)
+from common.utils.responses import TrustedJSONResponse
+from common.utils.streaming import export_response, iter_request_rows
 from config.db import get_session
 
 router = APIRouter()
@@ -54,26 +66,205 @@ async def bulk_create_model_api(
     )
 
 
+@router.post(
+    "/models/jobs",
+    response_model=StandardResponse[JobRead],
+    status_code=status.HTTP_202_ACCEPTED,
+)
+async def enqueue_bulk_create_models_api(
+    payload: List[SomeModelCreate],
+    response: Response,
+    session: AsyncSession = Depends(get_session),
+):
+    """
+    Bulk create in the background, poll the job at the `Location` header
+    """
+    service = SomeModelService(session=session)
+    job = await service.enqueue_bulk_create_models(
+        payload=payload,
+    )
+    response.headers["Location"] = f"/api/jobs/{job.id}"
+    return StandardResponse(
+        data=job,
+    )
+
+
+@router.post(
+    "/models/ingest",
+    response_model=StandardResponse[IngestReport],
+    status_code=status.HTTP_200_OK,
+)
+async def ingest_models_api(
+    request: Request,  # NDJSON or CSV body, read as it arrives
+    batch_size: int = Query(default=1000, ge=1, le=10_000),
+    session: AsyncSession = Depends(get_session),
+):
+    service = SomeModelService(session=session)
+    report = await service.ingest_models(
+        rows=iter_request_rows(request),
+        batch_size=batch_size,
+    )
+    return StandardResponse(
+        data=report,
+    )
+
+
 @router.get(
     "/models",
     response_model=StandardResponse[Page[SomeModelRead]],
     status_code=status.HTTP_200_OK,
 )
 async def get_models_api(
+    request: Request,
     order: Optional[OrderEnum] = Query(
         default=OrderEnum.asc,
         description="Optional",
     ),
+    count_mode: CountModeEnum = Query(
+        default=CountModeEnum.exact,
+        description="How `total` is computed, `none` skips it and only sets `has_next`",
+    ),
     params: Params = Depends(),  # load page&size into params
     session: AsyncSession = Depends(get_session),
 ):
     service = SomeModelService(session=session)
+    # before the page, so a write in between can only make the ETag older; only
+    # loaded for conditional requests, the others use it when it is cached
+    validator = await service.get_models_validator(
+        cached_only=not is_conditional(request)
+    )
+    if validator is not None and is_not_modified(request, validator):
+        return not_modified(validator)
+
     paginated_models = await service.list_some_models(
         params=params,
         order=order,
+        count_mode=count_mode,
     )
-    return StandardResponse(
-        data=paginated_models,
+    # items are already `SomeModelRead`, skip the response model validation
+    return TrustedJSONResponse(
+        StandardResponse[Page[SomeModelRead]](
+            data=paginated_models,
+        ),
+        headers=(
+            validator or page_validator(paginated_models.items, paginated_models.total)
+        ).headers,
+    )
+
+
+@router.get(
+    "/models/search",
+    response_model=StandardResponse[Page[SomeModelRead]],
+    status_code=status.HTTP_200_OK,
+)
+async def search_models_api(
+    request: Request,
+    q: str = Query(
+        min_length=1,
+        max_length=200,
+        description="Words to find in the name, each may be the start of a word",
+    ),
+    count_mode: CountModeEnum = Query(
+        default=CountModeEnum.exact,
+        description="How `total` is computed, `none` skips it and only sets `has_next`",
+    ),
+    params: Params = Depends(),  # load page&size into params
+    session: AsyncSession = Depends(get_session),
+):
+    service = SomeModelService(session=session)
+    validator = await service.get_models_validator(
+        cached_only=not is_conditional(request)
+    )
+    if validator is not None and is_not_modified(request, validator):
+        return not_modified(validator)
+
+    paginated_models = await service.search_some_models(
+        query=q,
+        params=params,
+        count_mode=count_mode,
+    )
+    return TrustedJSONResponse(
+        StandardResponse[Page[SomeModelRead]](
+            data=paginated_models,
+        ),
+        headers=(
+            validator or page_validator(paginated_models.items, paginated_models.total)
+        ).headers,
+    )
+
+
+@router.get(
+    "/models/cursor",
+    response_model=StandardResponse[CursorPage[SomeModelRead]],
+    status_code=status.HTTP_200_OK,
+)
+async def get_models_by_cursor_api(
+    request: Request,
+    order: Optional[OrderEnum] = Query(
+        default=OrderEnum.asc,
+        description="Optional",
+    ),
+    params: CursorParams = Depends(),  # load cursor&size into params
+    session: AsyncSession = Depends(get_session),
+):
+    service = SomeModelService(session=session)
+    validator = await service.get_models_validator(
+        cached_only=not is_conditional(request)
+    )
+    if validator is not None and is_not_modified(request, validator):
+        return not_modified(validator)
+
+    paginated_models = await service.list_some_models_by_cursor(
+        params=params,
+        order=order,
+    )
+    return TrustedJSONResponse(
+        StandardResponse[CursorPage[SomeModelRead]](
+            data=paginated_models,
+        ),
+        headers=(validator or page_validator(paginated_models.items)).headers,
+    )
+
+
+@router.get(
+    "/model/{id}",
+    response_model=StandardResponse[SomeModelRead],
+    status_code=status.HTTP_200_OK,
+)
+async def get_a_model_api(
+    request: Request,
+    id: int = Path(ge=1),
+    session: AsyncSession = Depends(get_session),
+):
+    service = SomeModelService(session=session)
+    validator = await service.get_a_model_validator(id=id)
+    if is_not_modified(request, validator):
+        return not_modified(validator)
+
+    model = await service.get_a_model(id=id)
+    return TrustedJSONResponse(
+        StandardResponse[SomeModelRead](
+            data=model,
+        ),
+        headers=validator.headers,
+    )
+
+
+@router.get(
+    "/models/export",
+    status_code=status.HTTP_200_OK,
+)
+async def export_models_api(
+    format: ExportFormatEnum = Query(default=ExportFormatEnum.ndjson),
+    batch_size: int = Query(default=1000, ge=1, le=10_000),
+    session: AsyncSession = Depends(get_session),
+):
+    service = SomeModelService(session=session)
+    return export_response(
+        service.export_models(batch_size=batch_size),
+        schema=SomeModelRead,
+        format=format,
+        filename="models",
     )
 
 
@@ -95,6 +286,24 @@ async def update_a_model_api(
     )
 
 
+@router.put(
+    "/models",
+    response_model=StandardResponse[List[SomeModelRead]],
+    status_code=status.HTTP_200_OK,
+)
+async def bulk_update_models_api(
+    payload: List[SomeModelUpdate],
+    session: AsyncSession = Depends(get_session),
+):
+    service = SomeModelService(session=session)
+    updated_models = await service.bulk_update_models(
+        payload=payload,
+    )
+    return StandardResponse(
+        data=updated_models,
+    )
+
+
 @router.delete(
     "/model",
     response_model=StandardResponse[SomeModelRead],
@@ -109,3 +318,19 @@ async def delete_a_model_api(
         payload=payload,
     )
     return StandardResponse(data=updated_model, message="Delete success")
+
+
+@router.delete(
+    "/models",
+    response_model=StandardResponse[List[int]],
+    status_code=status.HTTP_200_OK,
+)
+async def bulk_delete_models_api(
+    payload: SomeModelBulkDelete,
+    session: AsyncSession = Depends(get_session),
+):
+    service = SomeModelService(session=session)
+    deleted_ids = await service.bulk_delete_models(
+        payload=payload,
+    )
+    return StandardResponse(data=deleted_ids, message="Delete success")
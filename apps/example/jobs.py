@@ -0,0 +1,23 @@
+"""
+Background jobs of the example app, run by `poetry run worker`
+"""
+
+from typing import Any, List
+
+from apps.example.schemas import SomeModelCreate
+from apps.example.services.core_service import SomeModelService
+from common.utils.jobs import job
+from config.db import db
+
+
+@job("example.bulk_create_models")
+async def bulk_create_models(payload: List[dict[str, Any]]) -> List[int]:
+    """
+    Bulk create models, returns their ids
+    """
+    async with db.session_factory() as session:
+        service = SomeModelService(session=session)
+        models = await service.bulk_create_a_model(
+            payload=[SomeModelCreate(**row) for row in payload],
+        )
+    return [model.id for model in models]
@@ -1,5 +1,7 @@
 from typing import Optional
 
+from sqlalchemy import DDL, Index, event, func, text
+from sqlalchemy.dialects import postgresql  # noqa: F401, text search functions
 from sqlmodel import Field, SQLModel
 
 from common.mixins.models import TimestampMixin
@@ -14,3 +16,39 @@ class SomeModel(SQLModel, TimestampMixin, table=True):
 
     id: Optional[int] = Field(default=None, primary_key=True)
     name: str
+
+
+# Name search, see `SomeModelRepo.search_some_models_by_name`.
+# Postgres: GIN index on the `simple` text search vector of the name, queries must
+# use the very same expression to hit it.
+# SQLite: FTS5 table indexing the name, kept in sync by triggers.
+SOME_MODEL_NAME_VECTOR = func.to_tsvector(text("'simple'"), SomeModel.name)
+
+Index("ix_somemodel_name_search", SOME_MODEL_NAME_VECTOR, postgresql_using="gin").ddl_if(
+    dialect="postgresql"
+)
+
+_SQLITE_NAME_SEARCH_DDL = (
+    "CREATE VIRTUAL TABLE IF NOT EXISTS somemodel_search "
+    "USING fts5(name, content='somemodel', content_rowid='id')",
+    "CREATE TRIGGER IF NOT EXISTS somemodel_search_insert AFTER INSERT ON somemodel "
+    "BEGIN INSERT INTO somemodel_search(rowid, name) VALUES (new.id, new.name); END",
+    "CREATE TRIGGER IF NOT EXISTS somemodel_search_delete AFTER DELETE ON somemodel "
+    "BEGIN INSERT INTO somemodel_search(somemodel_search, rowid, name) "
+    "VALUES ('delete', old.id, old.name); END",
+    "CREATE TRIGGER IF NOT EXISTS somemodel_search_update "
+    "AFTER UPDATE OF name ON somemodel "
+    "BEGIN INSERT INTO somemodel_search(somemodel_search, rowid, name) "
+    "VALUES ('delete', old.id, old.name); "
+    "INSERT INTO somemodel_search(rowid, name) VALUES (new.id, new.name); END",
+)
+
+for _statement in _SQLITE_NAME_SEARCH_DDL:
+    event.listen(
+        SomeModel.__table__, "after_create", DDL(_statement).execute_if(dialect="sqlite")
+    )
+event.listen(
+    SomeModel.__table__,
+    "after_drop",
+    DDL("DROP TABLE IF EXISTS somemodel_search").execute_if(dialect="sqlite"),
+)
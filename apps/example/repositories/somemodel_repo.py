@@ -2,23 +2,90 @@
 # Low-level DB access functions
 """
 
-from sqlmodel import col, select
+import re
+
+from fastapi_pagination import Params
+from sqlalchemy import column, func, table, text
 from sqlmodel.ext.asyncio.session import AsyncSession
+from sqlmodel.sql.expression import Select
 
-from apps.example.models import SomeModel
+from apps.example.models import SOME_MODEL_NAME_VECTOR, SomeModel
 from apps.example.schemas import SomeModelCreate, SomeModelUpdate
-from common.repository.base import CRUDBase
+from common.repository.base import CRUDBase, SchemaType
+from common.schemas.enums import CountModeEnum
+from common.schemas.pagination import Page
+
+# FTS5 table behind the SQLite name search, see `apps.example.models.somemodel`
+somemodel_search = table(
+    "somemodel_search", column("rowid"), column("name"), column("rank")
+)
 
 
 class SomeModelRepo(CRUDBase[SomeModel, SomeModelCreate, SomeModelUpdate]):
+    cache_ttl = 60
+    order_by_columns = ("id", "name", "created_at", "updated_at")
+    single_flight = ("get_multi_paginated_ordered", "search_some_models_by_name")
+
     def __init__(self, session: AsyncSession):
         super().__init__(SomeModel, session=session)
 
-    async def get_some_models_by_name(
-        self, *, name: str, db_session: AsyncSession | None = None
-    ) -> SomeModel:
+    async def search_some_models_by_name(
+        self,
+        *,
+        query: str,
+        params: Params | None = Params(),
+        count_mode: CountModeEnum = CountModeEnum.exact,
+        schema: type[SchemaType] | None = None,
+        db_session: AsyncSession | None = None,
+    ) -> Page[SomeModel] | Page[SchemaType]:
+        """
+        Models whose name has a word starting with each word of `query`, best
+        matches first. Served by the name search index, see `SomeModel`.
+        """
         db_session = db_session or self.session
-        some_model = await db_session.exec(
-            select(SomeModel).where(col(SomeModel.name).ilike(f"%{name}%"))
+        words = re.findall(r"\w+", query.lower())
+        if not words:
+            page_type = Page if schema is None else Page[schema]
+            return page_type.create([], params, total=0, has_next=False)
+
+        search = self._search_query(db_session.get_bind().dialect.name, words, schema)
+
+        async def load() -> Page[SomeModel] | Page[SchemaType]:
+            return await self._paginate(
+                search,
+                params=params,
+                count_mode=count_mode,
+                schema=schema,
+                db_session=db_session,
+            )
+
+        return await self._cached_page(
+            load,
+            "search_some_models_by_name",
+            words,
+            params.page,
+            params.size,
+            count_mode,
+            schema=schema,
+            db_session=db_session,
         )
-        return some_model.all()
+
+    def _search_query(
+        self, dialect: str, words: list[str], schema: type[SchemaType] | None
+    ) -> Select:
+        query = self._select(schema)
+        if dialect == "postgresql":
+            tsquery = func.to_tsquery(
+                text("'simple'"), " & ".join(f"{word}:*" for word in words)
+            )
+            return query.where(SOME_MODEL_NAME_VECTOR.op("@@")(tsquery)).order_by(
+                func.ts_rank(SOME_MODEL_NAME_VECTOR, tsquery).desc(), SomeModel.id
+            )
+        if dialect == "sqlite":
+            match = " ".join(f'"{word}"*' for word in words)
+            return (
+                query.join(somemodel_search, somemodel_search.c.rowid == SomeModel.id)
+                .where(somemodel_search.c.name.op("MATCH")(match))
+                .order_by(somemodel_search.c.rank, SomeModel.id)
+            )
+        raise NotImplementedError(f"Name search is not supported on {dialect}")
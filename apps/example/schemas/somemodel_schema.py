@@ -1,5 +1,5 @@
 # schemas.py
-from typing import Optional
+from typing import List, Optional
 
 from pydantic import BaseModel, Field
 
@@ -17,6 +17,10 @@ class SomeModelDelete(BaseModel):
     id: int = Field(..., ge=1)
 
 
+class SomeModelBulkDelete(BaseModel):
+    ids: List[int] = Field(..., min_length=1)
+
+
 class SomeModelRead(BaseModel):
     id: int
     name: str
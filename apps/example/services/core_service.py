@@ -2,20 +2,29 @@
 Business rules for writing operations, uses repo
 """
 
-from typing import List
+from typing import Any, AsyncIterable, AsyncIterator, List, Optional
 
-from fastapi_pagination import Page, Params
+from fastapi import HTTPException, status
+from fastapi_pagination import Params
 from sqlmodel.ext.asyncio.session import AsyncSession
 
 from apps.example.models import SomeModel
 from apps.example.repositories import SomeModelRepo
 from apps.example.schemas import (
+    SomeModelBulkDelete,
     SomeModelCreate,
     SomeModelDelete,
     SomeModelRead,
     SomeModelUpdate,
 )
-from common.schemas.enums import OrderEnum
+from common.schemas.enums import CountModeEnum, OrderEnum
+from common.schemas.ingest import IngestReport
+from common.schemas.jobs import JobRead
+from common.schemas.pagination import CursorPage, CursorParams, Page
+from common.utils.conditional import Validator
+from common.utils.jobs import job_queue
+from common.utils.streaming import ingest
+from config.db import db
 
 
 class SomeModelService:
@@ -49,29 +58,143 @@ class SomeModelService:
             objs_in=payload,
         )
 
+    async def enqueue_bulk_create_models(
+        self,
+        payload: List[SomeModelCreate],
+    ) -> JobRead:
+        """
+        Bulk Create model logic, run by a worker, see `apps.example.jobs`
+        """
+        return await job_queue.enqueue(
+            "example.bulk_create_models",
+            payload=[row.model_dump() for row in payload],
+        )
+
+    async def ingest_models(
+        self,
+        rows: AsyncIterable[tuple[int, Any]],
+        batch_size: int = 1000,
+    ) -> IngestReport:
+        """
+        Streamed bulk create logic, each batch of valid rows is committed on its own
+        """
+
+        async def write(payload: List[SomeModelCreate]) -> int:
+            return await self.repo.bulk_insert(objs_in=payload)
+
+        return await ingest(
+            rows,
+            schema=SomeModelCreate,
+            write=write,
+            batch_size=batch_size,
+        )
+
+    async def get_a_model(self, id: int) -> SomeModelRead:
+        """
+        Get model logic
+        """
+        model = await self.repo.get(id=id, schema=SomeModelRead)
+        if model is None:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND, detail="Resource Not Found"
+            )
+        return model
+
+    async def get_a_model_validator(self, id: int) -> Validator:
+        """
+        ETag / Last-Modified of a model, 404 if it does not exist
+        """
+        return await self.repo.get_validator(id=id)
+
+    async def get_models_validator(
+        self, cached_only: bool = False
+    ) -> Optional[Validator]:
+        """
+        ETag / Last-Modified of every list of models, they all change together.
+        With `cached_only`, `None` unless it is cached.
+        """
+        return await self.repo.get_validator(cached_only=cached_only)
+
     async def list_some_models(
         self,
         params: Params,
         order: OrderEnum,
-    ) -> Page[SomeModel]:
+        count_mode: CountModeEnum = CountModeEnum.exact,
+    ) -> Page[SomeModelRead]:
+        """
+        List models logic, only the `SomeModelRead` columns are loaded so views
+        can render the page without revalidating
+        """
         return await self.repo.get_multi_paginated_ordered(
             params=params,
             order=order,
+            count_mode=count_mode,
+            schema=SomeModelRead,
+        )
+
+    async def search_some_models(
+        self,
+        query: str,
+        params: Params,
+        count_mode: CountModeEnum = CountModeEnum.exact,
+    ) -> Page[SomeModelRead]:
+        """
+        Search models by name logic, best matches first
+        """
+        return await self.repo.search_some_models_by_name(
+            query=query,
+            params=params,
+            count_mode=count_mode,
+            schema=SomeModelRead,
+        )
+
+    async def list_some_models_by_cursor(
+        self,
+        params: CursorParams,
+        order: OrderEnum,
+    ) -> CursorPage[SomeModelRead]:
+        return await self.repo.get_multi_cursor_paginated_ordered(
+            params=params,
+            order=order,
+            schema=SomeModelRead,
         )
 
+    async def export_models(
+        self, batch_size: int = 1000
+    ) -> AsyncIterator[List[SomeModelRead]]:
+        """
+        Stream all models in batches. Runs while the response body is sent, after
+        the request's session is released, so it reads through its own session.
+        """
+        async with db.session_factory() as session:
+            async for batch in self.repo.iter_batches(
+                batch_size=batch_size, schema=SomeModelRead, db_session=session
+            ):
+                yield batch
+
     async def update_a_model(
         self,
         payload: SomeModelUpdate,
     ) -> SomeModelRead:
         """
-        Create model logic
+        Update model logic
         """
-        model = await self.repo.get(id=payload.id)
-        return await self.repo.update(
-            obj_current=model,
+        return await self.repo.update_by_id(
+            id=payload.id,
             obj_new=payload,
         )
 
+    async def bulk_update_models(
+        self,
+        payload: List[SomeModelUpdate],
+    ) -> List[SomeModelRead]:
+        """
+        Bulk Update model logic
+        """
+        return await self.repo.update_many(
+            objs_new=payload,
+        )
+
     async def delete_a_model(self, payload: SomeModelDelete) -> SomeModelRead:
         """
         Delete model logic
@@ -79,3 +202,11 @@ class SomeModelService:
         return await self.repo.remove(
             id=payload.id,
         )
+
+    async def bulk_delete_models(self, payload: SomeModelBulkDelete) -> List[int]:
+        """
+        Bulk Delete model logic
+        """
+        return await self.repo.remove_many(
+            ids=payload.ids,
+        )
@@ -0,0 +1,306 @@
+import asyncio
+import csv
+import io
+import json
+
+import pytest
+
+import apps.example.jobs  # noqa: F401, registers the jobs
+from common.utils import streaming
+from common.utils.instrumentation import query_budget
+from common.utils.jobs import Worker, job_queue
+
+BASE_URL = "/api/example/v1"
+
+
+@pytest.mark.asyncio
+async def test_get_models_by_cursor_api(client):
+    response = await client.post(
+        f"{BASE_URL}/models", json=[{"name": f"model {i}"} for i in range(3)]
+    )
+    assert response.status_code == 201
+
+    response = await client.get(f"{BASE_URL}/models/cursor", params={"size": 2})
+    assert response.status_code == 200
+    page = response.json()["data"]
+    assert [item["name"] for item in page["items"]] == ["model 0", "model 1"]
+    assert page["previous_cursor"] is None
+
+    response = await client.get(
+        f"{BASE_URL}/models/cursor",
+        params={"size": 2, "cursor": page["next_cursor"]},
+    )
+    page = response.json()["data"]
+    assert [item["name"] for item in page["items"]] == ["model 2"]
+    assert page["next_cursor"] is None
+
+    response = await client.get(f"{BASE_URL}/models/cursor", params={"cursor": "x"})
+    assert response.status_code == 400
+
+
+@pytest.mark.asyncio
+async def test_get_models_without_count_api(client):
+    await client.post(
+        f"{BASE_URL}/models", json=[{"name": f"model {i}"} for i in range(3)]
+    )
+
+    response = await client.get(
+        f"{BASE_URL}/models", params={"size": 2, "count_mode": "none"}
+    )
+    assert response.status_code == 200
+    page = response.json()["data"]
+    assert len(page["items"]) == 2
+    assert page["total"] is None
+    assert page["has_next"] is True
+
+    response = await client.get(f"{BASE_URL}/models", params={"size": 2})
+    page = response.json()["data"]
+    assert page["total"] == 3
+    assert page["pages"] == 2
+
+
+@pytest.mark.asyncio
+async def test_update_models_api(client):
+    response = await client.post(
+        f"{BASE_URL}/models", json=[{"name": f"model {i}"} for i in range(2)]
+    )
+    first, second = response.json()["data"]
+
+    response = await client.put(
+        f"{BASE_URL}/model", json={"id": first["id"], "name": "renamed"}
+    )
+    assert response.status_code == 200
+    assert response.json()["data"] == {"id": first["id"], "name": "renamed"}
+
+    response = await client.put(
+        f"{BASE_URL}/models",
+        json=[
+            {"id": first["id"], "name": "first"},
+            {"id": second["id"], "name": "second"},
+        ],
+    )
+    assert response.status_code == 200
+    assert sorted(item["name"] for item in response.json()["data"]) == [
+        "first",
+        "second",
+    ]
+
+    response = await client.put(
+        f"{BASE_URL}/model", json={"id": second["id"] + 1, "name": "missing"}
+    )
+    assert response.status_code == 404
+
+    # a NOT NULL column, not a conflict
+    response = await client.put(
+        f"{BASE_URL}/model", json={"id": first["id"], "name": None}
+    )
+    assert response.status_code == 422
+    assert response.json()["detail"] == "Field name cannot be null"
+    response = await client.put(
+        f"{BASE_URL}/models",
+        json=[{"id": first["id"], "name": "first"}, {"id": second["id"], "name": None}],
+    )
+    assert response.status_code == 422
+
+
+@pytest.mark.asyncio
+async def test_delete_models_api(client):
+    response = await client.post(
+        f"{BASE_URL}/models", json=[{"name": f"model {i}"} for i in range(3)]
+    )
+    ids = [item["id"] for item in response.json()["data"]]
+
+    response = await client.request("DELETE", f"{BASE_URL}/model", json={"id": ids[0]})
+    assert response.status_code == 200
+    assert response.json()["data"]["id"] == ids[0]
+
+    response = await client.request("DELETE", f"{BASE_URL}/models", json={"ids": ids})
+    assert response.status_code == 200
+    assert sorted(response.json()["data"]) == ids[1:]
+
+    response = await client.request("DELETE", f"{BASE_URL}/models", json={"ids": []})
+    assert response.status_code == 422
+
+
+@pytest.mark.asyncio
+async def test_export_models_api(client):
+    await client.post(
+        f"{BASE_URL}/models", json=[{"name": f"model {i}"} for i in range(3)]
+    )
+
+    response = await client.get(f"{BASE_URL}/models/export", params={"batch_size": 2})
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/x-ndjson"
+    rows = [json.loads(line) for line in response.text.splitlines()]
+    assert [row["name"] for row in rows] == ["model 0", "model 1", "model 2"]
+
+    response = await client.get(
+        f"{BASE_URL}/models/export", params={"format": "csv", "batch_size": 2}
+    )
+    assert response.status_code == 200
+    assert response.headers["content-disposition"] == (
+        'attachment; filename="models.csv"'
+    )
+    rows = list(csv.DictReader(io.StringIO(response.text)))
+    assert [row["name"] for row in rows] == ["model 0", "model 1", "model 2"]
+
+
+@pytest.mark.asyncio
+async def test_export_models_as_arrow_api(client):
+    await client.post(f"{BASE_URL}/models", json=[{"name": "model 0"}])
+
+    response = await client.get(f"{BASE_URL}/models/export", params={"format": "arrow"})
+    if streaming.pa is None:
+        assert response.status_code == 501
+        return
+
+    assert response.status_code == 200
+    table = streaming.pa.ipc.open_stream(response.content).read_all()
+    assert table.column("name").to_pylist() == ["model 0"]
+
+
+@pytest.mark.asyncio
+async def test_ingest_models_api(client):
+    lines = [json.dumps({"name": f"model {i}"}) for i in range(5)]
+    lines[1] = '{"name": ""}'
+    lines[3] = "not json"
+    body = ("\n".join(lines) + "\n").encode()
+
+    async def chunks():
+        for i in range(0, len(body), 7):  # rows split across chunks
+            yield body[i : i + 7]
+
+    response = await client.post(
+        f"{BASE_URL}/models/ingest",
+        params={"batch_size": 2},
+        content=chunks(),
+        headers={"content-type": "application/x-ndjson"},
+    )
+    assert response.status_code == 200
+    report = response.json()["data"]
+    assert (report["inserted"], report["failed"], report["batches"]) == (3, 2, 3)
+    assert [
+        (error["batch"], [row["line"] for row in error["rows"]])
+        for error in report["errors"]
+    ] == [(0, [2]), (1, [4])]
+
+    response = await client.post(
+        f"{BASE_URL}/models/ingest",
+        content='name\n"multi\nline"\nplain\n',
+        headers={"content-type": "text/csv"},
+    )
+    assert response.json()["data"]["inserted"] == 2
+
+    response = await client.get(f"{BASE_URL}/models", params={"size": 10})
+    names = [item["name"] for item in response.json()["data"]["items"]]
+    assert names == ["model 0", "model 2", "model 4", "multi\nline", "plain"]
+
+    response = await client.post(
+        f"{BASE_URL}/models/ingest",
+        content="[]",
+        headers={"content-type": "application/json"},
+    )
+    assert response.status_code == 415
+
+
+@pytest.mark.asyncio
+async def test_search_models_api(client):
+    await client.post(
+        f"{BASE_URL}/models",
+        json=[{"name": name} for name in ["Red apple", "Apple pie", "Banana"]],
+    )
+
+    response = await client.get(
+        f"{BASE_URL}/models/search", params={"q": "apple p", "size": 10}
+    )
+    assert response.status_code == 200
+    page = response.json()["data"]
+    assert [item["name"] for item in page["items"]] == ["Apple pie"]
+    assert page["total"] == 1
+
+    response = await client.get(f"{BASE_URL}/models/search", params={"q": ""})
+    assert response.status_code == 422
+
+
+@pytest.mark.asyncio
+async def test_conditional_get_models_api(client, redis_connection):
+    await client.post(f"{BASE_URL}/models", json=[{"name": "a"}, {"name": "b"}])
+
+    # without a cached validator, a plain GET only runs the page queries and
+    # gets an ETag of its own, the first revalidation gets the table's one
+    with query_budget(max_statements=2):
+        response = await client.get(f"{BASE_URL}/models?count_mode=exact")
+    assert response.status_code == 200
+    page_etag = response.headers["etag"]
+    response = await client.get(
+        f"{BASE_URL}/models", headers={"If-None-Match": page_etag}
+    )
+    assert response.status_code == 200
+    etag = response.headers["etag"]
+    assert etag != page_etag
+    assert etag.startswith('W/"') and "last-modified" in response.headers
+
+    with query_budget(max_statements=None if redis_connection is None else 0):
+        response = await client.get(f"{BASE_URL}/models", headers={"If-None-Match": etag})
+    assert response.status_code == 304
+    assert response.headers["etag"] == etag and not response.content
+
+    # a delete keeps max(updated_at) but changes the count
+    first_id = (await client.get(f"{BASE_URL}/models")).json()["data"]["items"][0]["id"]
+    await client.request("DELETE", f"{BASE_URL}/model", json={"id": first_id})
+    response = await client.get(f"{BASE_URL}/models", headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.headers["etag"] != etag
+    assert len(response.json()["data"]["items"]) == 1
+
+
+@pytest.mark.asyncio
+async def test_conditional_get_a_model_api(client):
+    model = (await client.post(f"{BASE_URL}/model", json={"name": "a"})).json()["data"]
+
+    response = await client.get(f"{BASE_URL}/model/{model['id']}")
+    assert response.status_code == 200
+    assert response.json()["data"] == model
+    etag, last_modified = response.headers["etag"], response.headers["last-modified"]
+
+    response = await client.get(
+        f"{BASE_URL}/model/{model['id']}", headers={"If-Modified-Since": last_modified}
+    )
+    assert response.status_code == 304
+
+    await client.put(f"{BASE_URL}/model", json={"id": model["id"], "name": "b"})
+    response = await client.get(
+        f"{BASE_URL}/model/{model['id']}", headers={"If-None-Match": etag}
+    )
+    assert response.status_code == 200
+    assert response.json()["data"]["name"] == "b"
+
+    response = await client.get(f"{BASE_URL}/model/{model['id'] + 1}")
+    assert response.status_code == 404
+
+
+@pytest.mark.asyncio
+async def test_bulk_create_models_job_api(client, redis_client):
+    response = await client.post(
+        f"{BASE_URL}/models/jobs", json=[{"name": f"job {i}"} for i in range(3)]
+    )
+    assert response.status_code == 202
+    job = response.json()["data"]
+    assert job["status"] == "queued"
+    assert response.headers["location"] == f"/api/jobs/{job['id']}"
+
+    stop = asyncio.Event()
+    worker = asyncio.create_task(Worker(job_queue, block=0.01).run(stop))
+    for _ in range(300):
+        job = (await client.get(f"/api/jobs/{job['id']}")).json()["data"]
+        if job["status"] == "succeeded":
+            break
+        await asyncio.sleep(0.01)
+    stop.set()
+    await worker
+
+    assert job["status"] == "succeeded" and len(job["result"]) == 3
+    response = await client.get(f"{BASE_URL}/models", params={"size": 10})
+    assert [item["id"] for item in response.json()["data"]["items"]] == job["result"]
+
+    assert (await client.get("/api/jobs/missing")).status_code == 404
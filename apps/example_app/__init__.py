@@ -0,0 +1,2 @@
+# mounted under /api/example2 instead of /api/example_app
+url_prefix = "/example2"
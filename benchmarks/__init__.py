@@ -0,0 +1,3 @@
+"""
+Offline benchmarks, run them as modules, e.g. `python -m benchmarks.bench_bulk_create`
+"""
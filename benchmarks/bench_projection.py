@@ -0,0 +1,86 @@
+"""
+Per-row time and peak memory of listing `SomeModelRead` items from full ORM
+loads versus `schema=` column projections in `CRUDBase`.
+
+>>> poetry run python -m benchmarks.bench_projection --rows 10000
+"""
+
+import argparse
+import asyncio
+import time
+import tracemalloc
+
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlalchemy.orm import sessionmaker
+from sqlmodel import SQLModel
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from apps.example.models import SomeModel
+from apps.example.schemas import SomeModelCreate, SomeModelRead
+from common.repository.base import CRUDBase
+from config.settings import get_settings
+
+settings = get_settings()
+
+
+async def orm_entities(crud: CRUDBase, rows: int) -> list[SomeModelRead]:
+    """
+    Full `SomeModel` objects turned into the read schema afterwards
+    """
+    items = await crud.get_multi(limit=rows)
+    return [SomeModelRead.model_validate(item) for item in items]
+
+
+async def projection(crud: CRUDBase, rows: int) -> list[SomeModelRead]:
+    return await crud.get_multi(limit=rows, schema=SomeModelRead)
+
+
+async def run(url: str, rows: int, iterations: int) -> None:
+    engine = create_async_engine(url)
+    async_session = sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+
+    async with engine.begin() as conn:
+        await conn.run_sync(SQLModel.metadata.create_all)
+        await conn.execute(SomeModel.__table__.delete())
+    async with async_session() as session:
+        await CRUDBase(SomeModel, session).bulk_insert(
+            objs_in=[SomeModelCreate(name=f"bench {i}") for i in range(rows)]
+        )
+
+    print(f"{engine.dialect.name}: {rows} rows")
+    print(f"{'case':<16}{'us/row':>10}{'peak MiB':>10}")
+    for name, case in {"orm entities": orm_entities, "projection": projection}.items():
+        elapsed = 0.0
+        for _ in range(iterations):
+            async with async_session() as session:
+                crud = CRUDBase(SomeModel, session)
+                start = time.perf_counter()
+                await case(crud, rows)
+                elapsed += time.perf_counter() - start
+
+        async with async_session() as session:
+            tracemalloc.start()
+            await case(CRUDBase(SomeModel, session), rows)
+            peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+
+        per_row = elapsed / iterations / rows * 1_000_000
+        print(f"{name:<16}{per_row:>10.2f}{peak / 2**20:>10.1f}")
+
+    async with engine.begin() as conn:
+        await conn.run_sync(SQLModel.metadata.drop_all)
+    await engine.dispose()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--url", default=settings.ASYNC_SQLITE_URI)
+    parser.add_argument("--rows", type=int, default=10_000)
+    parser.add_argument("--iterations", type=int, default=5)
+    args = parser.parse_args()
+
+    asyncio.run(run(args.url, args.rows, args.iterations))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+"""
+Time to render a `StandardResponse[Page[SomeModelRead]]` of 1k and 10k items
+through FastAPI, with the response model validation and with `TrustedJSONResponse`.
+The items are `SomeModelRead` objects, as the service returns them.
+
+>>> poetry run python -m benchmarks.bench_serialization --iterations 20
+"""
+
+import argparse
+import asyncio
+import time
+
+from fastapi import FastAPI
+from fastapi.responses import JSONResponse, ORJSONResponse
+from httpx import ASGITransport, AsyncClient
+
+from apps.example.schemas import SomeModelRead
+from common.schemas.pagination import Page
+from common.schemas.response import StandardResponse
+from common.utils.responses import TrustedJSONResponse, orjson
+
+
+def build_app(items: list[SomeModelRead]) -> FastAPI:
+    app = FastAPI()
+    response_type = StandardResponse[Page[SomeModelRead]]
+
+    def page(items: list) -> dict:
+        return {"items": items, "total": len(items), "page": 1, "size": len(items)}
+
+    @app.get("/response-model", response_model=response_type)
+    async def response_model():
+        return StandardResponse(data=page(items))
+
+    @app.get(
+        "/response-model-orjson",
+        response_model=response_type,
+        response_class=ORJSONResponse if orjson is not None else JSONResponse,
+    )
+    async def response_model_orjson():
+        return StandardResponse(data=page(items))
+
+    @app.get("/trusted", response_model=response_type)
+    async def trusted():
+        return TrustedJSONResponse(response_type(data=Page[SomeModelRead](**page(items))))
+
+    return app
+
+
+async def run(sizes: list[int], iterations: int) -> None:
+    paths = ["/response-model", "/trusted"]
+    if orjson is not None:
+        paths.insert(1, "/response-model-orjson")
+
+    print(f"{'items':>6}  {'path':<24}{'ms/request':>12}")
+    for size in sizes:
+        items = [SomeModelRead(id=i, name=f"model {i}") for i in range(size)]
+        transport = ASGITransport(app=build_app(items))
+        async with AsyncClient(transport=transport, base_url="http://bench") as client:
+            bodies = set()
+            for path in paths:
+                bodies.add((await client.get(path)).content.replace(b" ", b""))
+                start = time.perf_counter()
+                for _ in range(iterations):
+                    await client.get(path)
+                elapsed = (time.perf_counter() - start) / iterations
+                print(f"{size:>6}  {path:<24}{elapsed * 1000:>12.2f}")
+            assert len(bodies) == 1, "all paths must render the same JSON"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1_000, 10_000])
+    parser.add_argument("--iterations", type=int, default=20)
+    args = parser.parse_args()
+
+    asyncio.run(run(args.sizes, args.iterations))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+"""
+Per-request overhead of the `get_session` dependency, before and after the
+session factory was moved into `config.db.DatabaseRegistry`.
+
+>>> poetry run python -m benchmarks.bench_session_dependency --iterations 20000
+"""
+
+import argparse
+import asyncio
+import time
+
+from sqlalchemy.orm import sessionmaker
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from config.db import db, get_session
+
+
+async def legacy_get_session():
+    """
+    The previous dependency: a new sessionmaker on every request
+    """
+    async_session = sessionmaker(
+        db.async_engine,
+        class_=AsyncSession,
+        expire_on_commit=False,
+    )
+
+    async with async_session() as session:
+        yield session
+
+
+async def measure(dependency, iterations: int) -> float:
+    start = time.perf_counter()
+    for _ in range(iterations):
+        async for _session in dependency():
+            pass
+    return (time.perf_counter() - start) / iterations
+
+
+async def run(iterations: int) -> None:
+    db.init()
+    # warm up both paths
+    await measure(legacy_get_session, 100)
+    await measure(get_session, 100)
+
+    print(f"{iterations} iterations, no queries")
+    print(f"{'dependency':<28}{'µs/request':>12}")
+    for name, dependency in (
+        ("sessionmaker per request", legacy_get_session),
+        ("shared session factory", get_session),
+    ):
+        print(f"{name:<28}{await measure(dependency, iterations) * 1e6:>12.2f}")
+
+    await db.dispose()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--iterations", type=int, default=20000)
+    args = parser.parse_args()
+
+    asyncio.run(run(args.iterations))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,172 @@
+"""
+Cold start of the app: each run is a fresh interpreter timing `import main`, the
+lifespan startup and the first request, so it can be tracked as apps are added.
+
+>>> poetry run python -m benchmarks.bench_startup --runs 10
+>>> poetry run python -m benchmarks.bench_startup --top 15 --output startup.json
+
+`--top` lists the modules taking the longest to import (`python -X importtime`).
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import time
+from typing import Any
+
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlmodel import SQLModel
+
+from benchmarks.results import percentile, write_results
+from config.apps import app_registry
+from config.settings import get_settings
+
+settings = get_settings()
+
+URL = "/api/example/v1/models?size=50"
+
+# the probe runs in the fresh interpreter, nothing of the app is imported before
+PROBE = f"""
+import asyncio, json, time
+
+start = time.perf_counter()
+import main
+imported = time.perf_counter()
+
+from httpx import ASGITransport, AsyncClient
+
+
+async def first_request():
+    async with main.app.router.lifespan_context(main.app):
+        started = time.perf_counter()
+        transport = ASGITransport(app=main.app)
+        async with AsyncClient(transport=transport, base_url="http://bench") as client:
+            response = await client.get({URL!r})
+        return started, time.perf_counter(), response.status_code
+
+
+started, responded, status = asyncio.run(first_request())
+print(json.dumps({{
+    "import_ms": (imported - start) * 1000,
+    "startup_ms": (started - imported) * 1000,
+    "first_request_ms": (responded - started) * 1000,
+    "status": status,
+    "routes": len(main.app.routes),
+}}))
+"""
+
+
+def run_probe(env: dict[str, str], *python_options: str) -> tuple[dict[str, Any], str]:
+    """
+    Run the probe in a new interpreter, returns its timings and its stderr
+    """
+    start = time.perf_counter()
+    process = subprocess.run(
+        [sys.executable, *python_options, "-c", PROBE],
+        capture_output=True,
+        text=True,
+        env=env,
+    )
+    elapsed = (time.perf_counter() - start) * 1000
+    if process.returncode != 0:
+        raise RuntimeError(f"Startup probe failed:\n{process.stderr}")
+    timings = json.loads(process.stdout.splitlines()[-1])
+    timings["process_ms"] = elapsed
+    return timings, process.stderr
+
+
+def interpreter_ms(env: dict[str, str]) -> float:
+    start = time.perf_counter()
+    subprocess.run([sys.executable, "-c", "pass"], check=True, env=env)
+    return (time.perf_counter() - start) * 1000
+
+
+def slowest_imports(stderr: str, top: int) -> list[tuple[str, float, float]]:
+    """
+    `(module, self ms, cumulative ms)` of the `top` slowest imports, by self time
+    """
+    imports = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        own, cumulative, module = line.removeprefix("import time:").split("|")
+        imports.append((module.strip(), int(own) / 1000, int(cumulative) / 1000))
+    return sorted(imports, key=lambda item: item[1], reverse=True)[:top]
+
+
+async def create_tables(url: str, drop: bool = False) -> None:
+    app_registry.import_models()
+    engine = create_async_engine(url)
+    async with engine.begin() as conn:
+        if drop:
+            await conn.run_sync(SQLModel.metadata.drop_all)
+        else:
+            await conn.run_sync(SQLModel.metadata.create_all)
+    await engine.dispose()
+
+
+def summarize(name: str, values: list[float]) -> dict[str, Any]:
+    return {
+        "name": name,
+        "runs": len(values),
+        "median_ms": round(percentile(values, 50), 3),
+        "p95_ms": round(percentile(values, 95), 3),
+    }
+
+
+def run(args: argparse.Namespace) -> tuple[list[dict[str, Any]], dict[str, Any]]:
+    env = {**os.environ, "ASYNC_DATABASE_URI": args.url, "DEBUG": "False"}
+    asyncio.run(create_tables(args.url))
+    try:
+        runs = [run_probe(env)[0] for _ in range(args.runs)]
+        baseline = [interpreter_ms(env) for _ in range(args.runs)]
+        if args.top:
+            _, stderr = run_probe(env, "-X", "importtime")
+    finally:
+        asyncio.run(create_tables(args.url, drop=True))
+
+    failed = [timings["status"] for timings in runs if timings["status"] >= 400]
+    if failed:
+        raise RuntimeError(f"First request to {URL} failed: {failed[0]}")
+
+    results = [
+        summarize("interpreter", baseline),
+        *(
+            summarize(metric.removesuffix("_ms"), [timings[metric] for timings in runs])
+            for metric in ("import_ms", "startup_ms", "first_request_ms", "process_ms")
+        ),
+    ]
+    meta = {"routes": runs[0]["routes"], "apps": len(app_registry.app_configs)}
+
+    print(f"{args.runs} cold starts, {meta['apps']} apps, {meta['routes']} routes")
+    print(f"{'phase':<16}{'median ms':>12}{'p95 ms':>12}")
+    for result in results:
+        print(
+            f"{result['name']:<16}{result['median_ms']:>12.1f}{result['p95_ms']:>12.1f}"
+        )
+
+    if args.top:
+        print(f"\n{'slowest imports':<56}{'self ms':>10}{'cumul. ms':>12}")
+        for module, own, cumulative in slowest_imports(stderr, args.top):
+            print(f"{module:<56}{own:>10.1f}{cumulative:>12.1f}")
+    return results, meta
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--url", default=settings.ASYNC_SQLITE_URI)
+    parser.add_argument("--runs", type=int, default=10)
+    parser.add_argument("--top", type=int, default=0, help="list the slowest imports")
+    parser.add_argument("--output", help="write the results to this JSON file")
+    args = parser.parse_args()
+
+    results, meta = run(args)
+    if args.output:
+        write_results(args.output, "startup", results, runs=args.runs, **meta)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,62 @@
+"""
+Compare two JSON results of a benchmark, e.g. of the base and the head commit.
+
+>>> poetry run python -m benchmarks.compare crud-1b1bd78.json crud-08b74dc.json --threshold 10
+
+Exits with 1 when a case got slower (or its RPS lower) by more than the threshold.
+"""
+
+import argparse
+import json
+import sys
+from pathlib import Path
+
+
+def load(path: str) -> dict:
+    return json.loads(Path(path).read_text())
+
+
+def compare(old: dict, new: dict, threshold: float) -> list[str]:
+    """
+    Print the change of every metric, returns the regressions
+    """
+    previous = {result["name"]: result for result in old["results"]}
+    regressions = []
+    print(f"{old['benchmark']}: {old.get('commit')} -> {new.get('commit')}")
+    for result in new["results"]:
+        base = previous.get(result["name"])
+        if base is None:
+            continue
+        for metric, value in result.items():
+            lower_is_better = metric.endswith("_ms")
+            if not (lower_is_better or metric == "rps") or not base.get(metric):
+                continue
+            change = (value - base[metric]) / base[metric] * 100
+            regressed = change > threshold if lower_is_better else -change > threshold
+            flag = "  REGRESSION" if regressed else ""
+            print(
+                f"  {result['name']:<44}{metric:<10}"
+                f"{base[metric]:>12.2f}{value:>12.2f}{change:>+9.1f}%{flag}"
+            )
+            if regressed:
+                regressions.append(f"{result['name']} {metric} {change:+.1f}%")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("old")
+    parser.add_argument("new")
+    parser.add_argument(
+        "--threshold", type=float, default=10.0, help="tolerated change, in %%"
+    )
+    args = parser.parse_args()
+
+    regressions = compare(load(args.old), load(args.new), args.threshold)
+    if regressions:
+        print(f"\n{len(regressions)} regressions over {args.threshold}%")
+    sys.exit(1 if regressions else 0)
+
+
+if __name__ == "__main__":
+    main()
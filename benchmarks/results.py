@@ -0,0 +1,56 @@
+"""
+JSON results of the benchmarks, so runs can be compared between commits with
+`python -m benchmarks.compare`
+"""
+
+import json
+import platform
+import subprocess
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Optional, Sequence
+
+
+def percentile(values: Sequence[float], q: float) -> float:
+    """
+    `q`th percentile (0-100) of `values`, linearly interpolated
+    """
+    ordered = sorted(values)
+    if not ordered:
+        return 0.0
+    rank = (len(ordered) - 1) * q / 100
+    low = int(rank)
+    high = min(low + 1, len(ordered) - 1)
+    return ordered[low] + (ordered[high] - ordered[low]) * (rank - low)
+
+
+def git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def write_results(
+    path: str, benchmark: str, results: list[dict[str, Any]], **meta: Any
+) -> None:
+    """
+    Write `results` (one dict per case, keyed by `name`) with the commit and
+    environment they were measured on
+    """
+    document = {
+        "benchmark": benchmark,
+        "commit": git_commit(),
+        "created_at": datetime.now(timezone.utc).isoformat(),
+        "python": platform.python_version(),
+        **meta,
+        "results": results,
+    }
+    Path(path).parent.mkdir(parents=True, exist_ok=True)
+    Path(path).write_text(json.dumps(document, indent=2) + "\n")
+    print(f"\nResults written to {path}")
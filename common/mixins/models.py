@@ -5,4 +5,7 @@ from sqlmodel import Field
 
 class TimestampMixin:
     created_at: datetime = Field(default_factory=datetime.now)
-    updated_at: datetime = Field(default_factory=datetime.now)
+    # `onupdate` also bumps it in bulk UPDATE statements, not only ORM flushes
+    updated_at: datetime = Field(
+        default_factory=datetime.now, sa_column_kwargs={"onupdate": datetime.now}
+    )
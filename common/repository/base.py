@@ -1,16 +1,58 @@
-from typing import Any, Generic, Optional, Sequence, TypeVar
-from uuid import UUID
+from copy import copy
+from typing import (
+    Any,
+    AsyncIterable,
+    AsyncIterator,
+    Awaitable,
+    Callable,
+    Generic,
+    Iterable,
+    Optional,
+    Sequence,
+    TypeVar,
+)
+from uuid import UUID, uuid4
 
 from fastapi import HTTPException, status
-from fastapi_pagination import Page, Params
-from fastapi_pagination.ext.sqlmodel import paginate
+from fastapi_pagination import Params
 from pydantic import BaseModel
-from sqlalchemy import exc
+from redis.asyncio import Redis
+from sqlalchemy import Column, MetaData, Table, case, delete, exc, insert, literal
+from sqlalchemy import select as sa_select
+from sqlalchemy import true, update
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.ext.asyncio import AsyncEngine
+from sqlalchemy.orm import make_transient_to_detached
+from sqlalchemy.sql import Executable, Insert, TableClause
+from sqlalchemy.sql.dml import UpdateBase
 from sqlmodel import SQLModel, func, select
 from sqlmodel.ext.asyncio.session import AsyncSession
 from sqlmodel.sql.expression import Select
 
-from common.schemas.enums import OrderEnum
+from common.repository.batching import WriteBatcher, get_write_batcher
+from common.repository.cache import RepositoryCache, local_cache
+from common.repository.pagination import (
+    NEXT,
+    PREVIOUS,
+    count_cached,
+    count_estimated,
+    count_exact,
+    decode_cursor,
+    encode_cursor,
+    keyset_query,
+)
+from common.schemas.enums import CountModeEnum, OrderEnum
+from common.schemas.pagination import CursorPage, CursorParams, Page
+from common.utils.adapters import type_adapter
+from common.utils.conditional import Validator
+from common.utils.instrumentation import CHUNKED
+from common.utils.iterables import achunked, aiterate, chunked
+from common.utils.singleflight import get_single_flight
+from config.db import RoutingSession, reading_primary
+from config.redis import redis_registry
+from config.settings import get_settings
+
+settings = get_settings()
 
 ModelType = TypeVar("ModelType", bound=SQLModel)
 CreateSchemaType = TypeVar("CreateSchemaType", bound=BaseModel)
@@ -24,23 +66,93 @@ class CRUDBase(Generic[ModelType, CreateSchemaType, UpdateSchemaType]):
     Based on https://github.com/jonra1993/fastapi-alembic-sqlmodel-async
     """
 
-    def __init__(self, model: type[ModelType], session: Optional[AsyncSession] = None):
+    # seconds a `CountModeEnum.cached` total is kept in Redis
+    count_cache_ttl: int = 60
+    # seconds rows and pages are cached in Redis, `None` keeps the read-through cache off
+    cache_ttl: Optional[int] = None
+    # bump when the cached shape of the model changes so old entries are ignored
+    cache_version: int = 1
+    # columns an upsert keeps from the first insert when it updates a row
+    insert_only_columns: tuple[str, ...] = ("created_at", "created_by_id")
+    # columns the `*_ordered` methods sort on, others fall back to `id`; `None`
+    # allows every column. Each should be indexed, see `scripts/audit_indexes.py`
+    order_by_columns: Optional[tuple[str, ...]] = None
+    # paginated read methods whose identical concurrent `schema=` calls share one
+    # load, see `common/utils/singleflight.py`; across workers through a Redis
+    # lock with `single_flight_across_workers` (cached misses already are)
+    single_flight: tuple[str, ...] = ()
+    single_flight_across_workers: bool = False
+    # group commit: concurrent `create` calls within `write_batch_delay` seconds
+    # (up to `write_batch_size` rows) share one INSERT and one commit
+    write_batching: bool = False
+    write_batch_size: int = 100
+    write_batch_delay: float = 0.002
+
+    def __init__(
+        self,
+        model: type[ModelType],
+        session: Optional[AsyncSession] = None,
+        redis_client: Optional[Redis] = None,
+    ):
         """
         CRUD object with default methods to Create, Read, Update, Delete (CRUD).
         **Parameters**
         * `model`: A SQLModel model class
-        * `schema`: A Pydantic model (schema) class
+        * `session`: The AsyncSession used when a method gets no `db_session`
+        * `redis_client`: Redis used for caching, defaults to the client of `config.redis`
         """
         self.model = model
         self.session = session
+        self.redis_client = redis_client or redis_registry.client
+        self.cache_namespace = f"{settings.APP_NAME}:{model.__tablename__}"
+        self.cache = (
+            RepositoryCache(
+                redis_client=self.redis_client,
+                namespace=self.cache_namespace,
+                ttl=self.cache_ttl,
+                version=self.cache_version,
+                local_cache=local_cache if settings.CACHE_L1_ENABLED else None,
+            )
+            if self.cache_ttl
+            else None
+        )
 
     async def get(
-        self, *, id: UUID | str, db_session: AsyncSession | None = None
-    ) -> ModelType | None:
+        self,
+        *,
+        id: UUID | str,
+        schema: type[SchemaType] | None = None,
+        db_session: AsyncSession | None = None,
+    ) -> ModelType | SchemaType | None:
+        """
+        With a `schema`, only its columns are selected and a `schema` object is
+        returned instead of an ORM one (same for the other read methods)
+        """
         db_session = db_session or self.session
-        query = select(self.model).where(self.model.id == id)
-        response = await db_session.exec(query)
-        return response.one_or_none()
+
+        async def load() -> ModelType | None:
+            query = select(self.model).where(self.model.id == id)
+            response = await db_session.exec(query)
+            return response.one_or_none()
+
+        if self.cache is None:
+            if schema is None:
+                return await load()
+            response = await db_session.exec(
+                self._select(schema).where(self.model.id == id)
+            )
+            row = response.one_or_none()
+            return self._to_schema([row], schema)[0] if row is not None else None
+
+        obj = await self.cache.get_or_load(
+            self.cache.item_key(id),
+            self._from_primary(load, db_session),
+            dumps=self._dump,
+            loads=self._load,
+        )
+        if schema is not None:
+            return self._to_schema([obj], schema)[0] if obj is not None else None
+        return await self._attach(obj, db_session)
 
     async def get_by_ids(
         self,
@@ -49,45 +161,138 @@ class CRUDBase(Generic[ModelType, CreateSchemaType, UpdateSchemaType]):
         db_session: AsyncSession | None = None,
     ) -> list[ModelType] | None:
         db_session = db_session or self.session
-        response = await db_session.exec(
-            select(self.model).where(self.model.id.in_(list_ids))
-        )
-        return response.all()
+        if self.cache is None:
+            response = await db_session.exec(
+                select(self.model).where(self.model.id.in_(list_ids))
+            )
+            return response.all()
+
+        generation = await self.cache.generation()
+        cached = await self.cache.get_many([self.cache.item_key(id) for id in list_ids])
+        objs = [
+            await self._attach(self._load(data), db_session)
+            for data in cached
+            if data is not None
+        ]
 
-    async def get_count(self, db_session: AsyncSession | None = None) -> ModelType | None:
+        missing_ids = [id for id, data in zip(list_ids, cached) if data is None]
+        if missing_ids:
+            with reading_primary(db_session):
+                response = await db_session.exec(
+                    select(self.model).where(self.model.id.in_(missing_ids))
+                )
+            loaded = response.all()
+            await self.cache.set_many(
+                {self.cache.item_key(obj.id): self._dump(obj) for obj in loaded},
+                generation=generation,
+            )
+            objs.extend(loaded)
+        return objs
+
+    async def get_count(self, db_session: AsyncSession | None = None) -> int:
         db_session = db_session or self.session
-        response = await db_session.exec(
-            select(func.count()).select_from(select(self.model).subquery())
-        )
+        response = await db_session.exec(select(func.count()).select_from(self.model))
         return response.one()
 
+    async def get_validator(
+        self,
+        *,
+        id: UUID | str | None = None,
+        cached_only: bool = False,
+        db_session: AsyncSession | None = None,
+    ) -> Validator | None:
+        """
+        Conditional GET validator of the row `id` (its `updated_at`), or of the
+        whole table (`max(updated_at)` and the row count). With the cache on it
+        is kept in Redis until the next write, so a `304` needs no query.
+        With `cached_only`, `None` unless it is cached: no query at all.
+        """
+        db_session = db_session or self.session
+
+        if cached_only:
+            key = await self.cache.validator_key(id) if self.cache is not None else None
+            if key is None:
+                return None
+            (data,) = await self.cache.get_many([key])
+            return Validator.model_validate(data) if data is not None else None
+
+        async def load() -> Validator | None:
+            if id is None:
+                query = sa_select(func.max(self.model.updated_at), func.count())
+                response = await db_session.exec(query)
+                last_modified, count = response.one()
+                return Validator(last_modified=last_modified, count=count)
+
+            query = sa_select(self.model.updated_at).where(self.model.id == id)
+            response = await db_session.exec(query)
+            row = response.one_or_none()
+            return Validator(last_modified=row[0]) if row is not None else None
+
+        if self.cache is None:
+            validator = await load()
+        else:
+            validator = await self.cache.get_or_load(
+                await self.cache.validator_key(id),
+                self._from_primary(load, db_session),
+                dumps=lambda validator: validator.model_dump(mode="json"),
+                loads=Validator.model_validate,
+            )
+        if validator is None:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Resource Not Found",
+            )
+        return validator
+
     async def get_multi(
         self,
         *,
         skip: int = 0,
         limit: int = 100,
         query: T | Select[T] | None = None,
+        schema: type[SchemaType] | None = None,
         db_session: AsyncSession | None = None,
-    ) -> list[ModelType]:
+    ) -> list[ModelType] | list[SchemaType]:
         db_session = db_session or self.session
         if query is None:
-            query = select(self.model).offset(skip).limit(limit).order_by(self.model.id)
+            query = self._select(schema).offset(skip).limit(limit).order_by(self.model.id)
         response = await db_session.exec(query)
-        return response.all()
+        return self._to_schema(response.all(), schema)
 
     async def get_multi_paginated(
         self,
         *,
         params: Params | None = Params(),
         query: T | Select[T] | None = None,
+        count_mode: CountModeEnum = CountModeEnum.exact,
+        schema: type[SchemaType] | None = None,
         db_session: AsyncSession | None = None,
-    ) -> Page[ModelType]:
+    ) -> Page[ModelType] | Page[SchemaType]:
         db_session = db_session or self.session
+        cacheable = query is None
         if query is None:
-            query = select(self.model)
+            query = self._select(schema)
 
-        output = await paginate(db_session, query, params)
-        return output
+        async def load() -> Page[ModelType] | Page[SchemaType]:
+            return await self._paginate(
+                query,
+                params=params,
+                count_mode=count_mode,
+                schema=schema,
+                db_session=db_session,
+            )
+
+        if not cacheable:
+            return await load()
+        return await self._cached_page(
+            load,
+            "get_multi_paginated",
+            params.page,
+            params.size,
+            count_mode,
+            schema=schema,
+            db_session=db_session,
+        )
 
     async def get_multi_paginated_ordered(
         self,
@@ -96,21 +301,89 @@ class CRUDBase(Generic[ModelType, CreateSchemaType, UpdateSchemaType]):
         order_by: str | None = None,
         order: OrderEnum | None = OrderEnum.asc,
         query: T | Select[T] | None = None,
+        count_mode: CountModeEnum = CountModeEnum.exact,
+        schema: type[SchemaType] | None = None,
         db_session: AsyncSession | None = None,
-    ) -> Page[ModelType]:
+    ) -> Page[ModelType] | Page[SchemaType]:
         db_session = db_session or self.session
         columns = self.model.__table__.columns
 
-        if order_by is None or order_by not in columns:
+        if order_by not in self.sortable_columns():
             order_by = "id"
 
+        cacheable = query is None
         if query is None:
             if order == OrderEnum.asc:
-                query = select(self.model).order_by(columns[order_by].asc())
+                query = self._select(schema).order_by(columns[order_by].asc())
             else:
-                query = select(self.model).order_by(columns[order_by].desc())
+                query = self._select(schema).order_by(columns[order_by].desc())
+
+        async def load() -> Page[ModelType] | Page[SchemaType]:
+            return await self._paginate(
+                query,
+                params=params,
+                count_mode=count_mode,
+                schema=schema,
+                db_session=db_session,
+            )
+
+        if not cacheable:
+            return await load()
+        return await self._cached_page(
+            load,
+            "get_multi_paginated_ordered",
+            params.page,
+            params.size,
+            order_by,
+            order,
+            count_mode,
+            schema=schema,
+            db_session=db_session,
+        )
+
+    async def _paginate(
+        self,
+        query: Select[T],
+        *,
+        params: Params,
+        count_mode: CountModeEnum,
+        schema: type[SchemaType] | None,
+        db_session: AsyncSession,
+    ) -> Page[ModelType] | Page[SchemaType]:
+        """
+        Fetch one page of `query` and its total according to `count_mode`.
+        With `CountModeEnum.none` one extra row is fetched to tell `has_next`.
+        """
+        raw_params = params.to_raw_params()
+        offset, limit = raw_params.offset, raw_params.limit
+        page_type = Page if schema is None else Page[schema]
+
+        if count_mode == CountModeEnum.none:
+            response = await db_session.exec(query.offset(offset).limit(limit + 1))
+            items = self._to_schema(response.all(), schema)
+            return page_type.create(items[:limit], params, has_next=len(items) > limit)
 
-        return await paginate(db_session, query, params)
+        response = await db_session.exec(query.offset(offset).limit(limit))
+        items = self._to_schema(response.all(), schema)
+
+        if count_mode == CountModeEnum.estimated:
+            total = await count_estimated(db_session, query)
+        elif count_mode == CountModeEnum.cached:
+            total = await count_cached(
+                db_session,
+                query,
+                redis_client=self.redis_client,
+                key_prefix=self.cache_namespace,
+                ttl=self.count_cache_ttl,
+            )
+        else:
+            total = await count_exact(db_session, query)
+
+        # an estimate can be below what was actually fetched
+        total = max(total, offset + len(items))
+        return page_type.create(
+            items, params, total=total, has_next=offset + len(items) < total
+        )
 
     async def get_multi_ordered(
         self,
@@ -119,31 +392,149 @@ class CRUDBase(Generic[ModelType, CreateSchemaType, UpdateSchemaType]):
         limit: int = 100,
         order_by: str | None = None,
         order: OrderEnum | None = OrderEnum.asc,
+        schema: type[SchemaType] | None = None,
         db_session: AsyncSession | None = None,
-    ) -> list[ModelType]:
+    ) -> list[ModelType] | list[SchemaType]:
         db_session = db_session or self.session
         columns = self.model.__table__.columns
 
-        if order_by is None or order_by not in columns:
+        if order_by not in self.sortable_columns():
             order_by = "id"
 
         if order == OrderEnum.asc:
             query = (
-                select(self.model)
+                self._select(schema)
                 .offset(skip)
                 .limit(limit)
                 .order_by(columns[order_by].asc())
             )
         else:
             query = (
-                select(self.model)
+                self._select(schema)
                 .offset(skip)
                 .limit(limit)
                 .order_by(columns[order_by].desc())
             )
 
         response = await db_session.exec(query)
-        return response.all()
+        return self._to_schema(response.all(), schema)
+
+    async def get_multi_cursor_paginated_ordered(
+        self,
+        *,
+        params: CursorParams | None = CursorParams(),
+        order_by: str | None = None,
+        order: OrderEnum | None = OrderEnum.asc,
+        query: T | Select[T] | None = None,
+        schema: type[SchemaType] | None = None,
+        db_session: AsyncSession | None = None,
+    ) -> CursorPage[ModelType] | CursorPage[SchemaType]:
+        """
+        Keyset pagination on `(order_by, id)`: constant cost per page at any depth.
+        The `order_by` column should be NOT NULL for the cursors to be stable.
+        """
+        db_session = db_session or self.session
+        columns = self.model.__table__.columns
+
+        if order_by not in self.sortable_columns():
+            order_by = "id"
+
+        if query is None:
+            # the cursor columns are selected even if `schema` does not have them
+            query = self._select(schema, order_by, "id")
+
+        order_column, id_column = columns[order_by], columns["id"]
+        after, direction = None, NEXT
+        if params.cursor:
+            fields = self.model.model_fields
+            value, id, direction = decode_cursor(
+                params.cursor,
+                order_by=order_by,
+                value_type=fields[order_by].annotation,
+                id_type=fields["id"].annotation,
+            )
+            after = (value, id)
+
+        backwards = direction == PREVIOUS
+        response = await db_session.exec(
+            keyset_query(
+                query,
+                order_column=order_column,
+                id_column=id_column,
+                order=order,
+                size=params.size,
+                after=after,
+                backwards=backwards,
+            )
+        )
+        items = response.all()
+
+        has_more = len(items) > params.size
+        items = items[: params.size]
+        if backwards:
+            items.reverse()
+
+        def cursor_for(item: Any, direction: str) -> str:
+            return encode_cursor(
+                order_by=order_by,
+                value=getattr(item, order_by),
+                id=item.id,
+                direction=direction,
+            )
+
+        has_next = has_more if not backwards else after is not None
+        has_previous = has_more if backwards else after is not None
+        page_type = CursorPage if schema is None else CursorPage[schema]
+        return page_type(
+            items=self._to_schema(items, schema),
+            size=params.size,
+            next_cursor=cursor_for(items[-1], NEXT) if items and has_next else None,
+            previous_cursor=(
+                cursor_for(items[0], PREVIOUS) if items and has_previous else None
+            ),
+        )
+
+    async def iter_batches(
+        self,
+        *,
+        batch_size: int = 1000,
+        query: T | Select[T] | None = None,
+        schema: type[SchemaType] | None = None,
+        db_session: AsyncSession | None = None,
+    ) -> AsyncIterator[list[ModelType] | list[SchemaType]]:
+        """
+        Stream the rows of `query` (all rows by id by default) in lists of
+        `batch_size`, through a server-side cursor where the driver has one,
+        so memory stays flat whatever the number of rows
+        """
+        db_session = db_session or self.session
+        if query is None:
+            query = self._select(schema).order_by(self.model.id)
+
+        query = query.execution_options(yield_per=batch_size)
+        if schema is None:
+            response = await db_session.stream_scalars(query)
+        else:
+            response = await db_session.stream(query)
+        async for partition in response.partitions():
+            yield self._to_schema(list(partition), schema)
+
+    async def iter_all(
+        self,
+        *,
+        batch_size: int = 1000,
+        query: T | Select[T] | None = None,
+        schema: type[SchemaType] | None = None,
+        db_session: AsyncSession | None = None,
+    ) -> AsyncIterator[ModelType | SchemaType]:
+        """
+        Row by row variant of `iter_batches`
+        """
+        async for batch in self.iter_batches(
+            batch_size=batch_size, query=query, schema=schema, db_session=db_session
+        ):
+            for obj in batch:
+                yield obj
 
     async def create(
         self,
@@ -152,8 +543,29 @@ class CRUDBase(Generic[ModelType, CreateSchemaType, UpdateSchemaType]):
         created_by_id: UUID | str | None = None,
         db_session: AsyncSession | None = None,
     ) -> ModelType:
+        """
+        With `write_batching`, the row is written by the group commit of the
+        repository, through a session of its own, then merged into `db_session`.
+        Only when `db_session` has nothing of its own to commit, otherwise the
+        row is written by `db_session` as without batching.
+        """
         db_session = db_session or self.session
 
+        if self._can_batch_create(db_session):
+            row = self._to_insert_rows([obj_in], created_by_id=created_by_id)[0]
+            try:
+                db_obj = await self._write_batcher(db_session.bind).submit(row)
+            except exc.IntegrityError:
+                raise HTTPException(
+                    status_code=409,
+                    detail="Resource already exists",
+                )
+            db_obj = await db_session.merge(db_obj, load=False)
+            if isinstance(db_session.sync_session, RoutingSession):
+                # the row is on the primary, read it back from there
+                db_session.sync_session.wrote = True
+            return db_obj
+
         db_obj = self.model.model_validate(obj_in)  # type: ignore
 
         # case there is created-by-id Field
@@ -170,6 +582,7 @@ class CRUDBase(Generic[ModelType, CreateSchemaType, UpdateSchemaType]):
                 detail="Resource already exists",
             )
         await db_session.refresh(db_obj)
+        await self._invalidate([db_obj.id])
         return db_obj
 
     async def bulk_create(
@@ -177,20 +590,55 @@ class CRUDBase(Generic[ModelType, CreateSchemaType, UpdateSchemaType]):
         *,
         objs_in: Sequence[CreateSchemaType | ModelType],
         created_by_id: UUID | str | None = None,
+        chunk_size: int = 1000,
         db_session: AsyncSession | None = None,
-    ):
+    ) -> list[ModelType]:
+        """
+        Insert all rows with multi-row `INSERT ... RETURNING`, one statement per
+        `chunk_size` rows, so the returned objects come back fully populated
+        without a `refresh` per row. Rows are returned in input order.
+        """
         db_session = db_session or self.session
+        rows = self._to_insert_rows(objs_in, created_by_id=created_by_id)
+        if not rows:
+            return []
 
-        # case there is created-by-id Field
         db_objects = []
-        for obj_in in objs_in:
-            db_obj = self.model.model_validate(obj_in)  # type: ignore
-            if created_by_id:
-                db_obj.created_by_id = created_by_id
-            db_objects.append(db_obj)
+        try:
+            for chunk in chunked(rows, chunk_size):
+                db_objects.extend(await self._insert_returning(chunk, db_session))
+            await db_session.commit()
+        except exc.IntegrityError:
+            await db_session.rollback()
+            raise HTTPException(
+                status_code=409,
+                detail="Resource already exists",
+            )
+
+        await self._invalidate([obj.id for obj in db_objects])
+        return db_objects
+
+    async def bulk_insert(
+        self,
+        *,
+        objs_in: Sequence[CreateSchemaType | ModelType],
+        created_by_id: UUID | str | None = None,
+        chunk_size: int = 1000,
+        db_session: AsyncSession | None = None,
+    ) -> int:
+        """
+        Fire-and-forget variant of `bulk_create` for ingest jobs: rows are sent
+        with executemany and nothing is read back. Returns the number of rows written.
+        """
+        db_session = db_session or self.session
+        rows = self._to_insert_rows(objs_in, created_by_id=created_by_id)
+        if not rows:
+            return 0
 
+        query = insert(self.model.__table__).execution_options(**{CHUNKED: True})
         try:
-            db_session.add_all(db_objects)
+            for chunk in chunked(rows, chunk_size):
+                await db_session.exec(query, params=chunk)
             await db_session.commit()
         except exc.IntegrityError:
             await db_session.rollback()
@@ -199,10 +647,352 @@ class CRUDBase(Generic[ModelType, CreateSchemaType, UpdateSchemaType]):
                 detail="Resource already exists",
             )
 
-        for obj in db_objects:
-            await db_session.refresh(obj)
+        await self._invalidate()
+        return len(rows)
+
+    async def upsert(
+        self,
+        *,
+        obj_in: CreateSchemaType | ModelType,
+        index_elements: Sequence[str] | None = None,
+        update_columns: Sequence[str] | None = None,
+        created_by_id: UUID | str | None = None,
+        db_session: AsyncSession | None = None,
+    ) -> ModelType | None:
+        """
+        Insert a row or update the one it conflicts with, see `bulk_upsert`.
+        Returns `None` when the row was skipped.
+        """
+        db_objects = await self.bulk_upsert(
+            objs_in=[obj_in],
+            index_elements=index_elements,
+            update_columns=update_columns,
+            created_by_id=created_by_id,
+            db_session=db_session,
+        )
+        return db_objects[0] if db_objects else None
+
+    async def bulk_upsert(
+        self,
+        *,
+        objs_in: Sequence[CreateSchemaType | ModelType],
+        index_elements: Sequence[str] | None = None,
+        update_columns: Sequence[str] | None = None,
+        created_by_id: UUID | str | None = None,
+        chunk_size: int = 1000,
+        db_session: AsyncSession | None = None,
+    ) -> list[ModelType]:
+        """
+        `INSERT ... ON CONFLICT (index_elements) DO UPDATE` (Postgres and SQLite),
+        so replaying the same rows is idempotent.
+        * `index_elements`: the conflict target, defaults to the primary key
+        * `update_columns`: columns overwritten on conflict, defaults to every
+          inserted column but the conflict target and `insert_only_columns`;
+          an empty list means `DO NOTHING`, skipped rows are not returned
+        """
+        db_session = db_session or self.session
+        rows = self._to_insert_rows(objs_in, created_by_id=created_by_id)
+        if not rows:
+            return []
+
+        query = self._upsert_query(
+            db_session.get_bind().dialect.name,
+            index_elements=index_elements,
+            update_columns=update_columns,
+        )
+        query = query.returning(self.model).execution_options(**{CHUNKED: True})
+
+        db_objects = []
+        try:
+            for chunk in chunked(rows, chunk_size):
+                response = await db_session.exec(
+                    query,
+                    params=chunk,
+                    execution_options={"populate_existing": True},
+                )
+                db_objects.extend(response.scalars().all())
+            await db_session.commit()
+        except exc.IntegrityError:
+            await db_session.rollback()
+            raise HTTPException(
+                status_code=409,
+                detail="Resource already exists",
+            )
+
+        await self._invalidate([obj.id for obj in db_objects])
         return db_objects
 
+    async def copy_from(
+        self,
+        *,
+        records: Iterable[Any] | AsyncIterable[Any],
+        columns: Sequence[str] | None = None,
+        chunk_size: int = 10_000,
+        merge: bool | Callable[[TableClause, Table], Executable] = False,
+        index_elements: Sequence[str] | None = None,
+        update_columns: Sequence[str] | None = None,
+        created_by_id: UUID | str | None = None,
+        db_session: AsyncSession | None = None,
+    ) -> int:
+        """
+        Bulk load with `COPY` (asyncpg's `copy_records_to_table`) on Postgres,
+        chunked executemany elsewhere. Returns the number of rows written.
+        * `records`: schema/model objects or tuples in `columns` order, from
+          a sync or async iterable, so streamed input is loaded chunk by chunk
+        * `columns`: defaults to every column but the primary key
+        * `merge`: load into a temporary staging table first, then merge it into
+          the table with `INSERT ... SELECT ... ON CONFLICT` (see `bulk_upsert`
+          for `index_elements` and `update_columns`), or with the statement
+          returned by `merge(staging, table)` when it is a callable. The merged
+          rows are evicted from the cache by the ids the merge returns: `RETURNING`
+          the primary key is added to INSERT/UPDATE statements that have none
+        """
+        db_session = db_session or self.session
+        table = self.model.__table__
+        if columns is None:
+            columns = [column.name for column in table.columns if not column.primary_key]
+
+        connection = await db_session.connection()
+        target = table
+        if merge:
+            target = Table(
+                f"copy_{table.name}_{uuid4().hex[:8]}",
+                MetaData(),
+                *(Column(name, table.columns[name].type) for name in columns),
+                prefixes=["TEMPORARY"],
+            )
+            await connection.run_sync(target.create)
+
+        written, ids = 0, []
+        try:
+            async for chunk in achunked(aiterate(records), chunk_size):
+                rows = self._to_copy_records(chunk, columns, created_by_id)
+                if connection.dialect.driver == "asyncpg":
+                    raw_connection = await connection.get_raw_connection()
+                    await raw_connection.driver_connection.copy_records_to_table(
+                        target.name,
+                        records=rows,
+                        columns=columns,
+                        schema_name=target.schema,
+                    )
+                else:
+                    await connection.execute(
+                        insert(target).execution_options(**{CHUNKED: True}),
+                        [dict(zip(columns, row)) for row in rows],
+                    )
+                written += len(rows)
+
+            if merge:
+                staging = target
+                if callable(merge):
+                    query = merge(staging, table)
+                else:
+                    query = self._upsert_query(
+                        connection.dialect.name,
+                        index_elements=index_elements,
+                        update_columns=update_columns,
+                        from_select=(
+                            columns,
+                            # `WHERE true` keeps SQLite from parsing ON CONFLICT as a join
+                            select(*(staging.c[name] for name in columns)).where(true()),
+                        ),
+                    )
+                if isinstance(query, UpdateBase) and not query._returning:
+                    query = query.returning(*table.primary_key.columns)
+                result = await connection.execute(query)
+                if result.returns_rows:
+                    ids = list(result.scalars())
+                    written = len(ids)
+                else:
+                    written = result.rowcount
+                await connection.run_sync(staging.drop)
+            await db_session.commit()
+        except exc.IntegrityError:
+            await db_session.rollback()
+            raise HTTPException(
+                status_code=409,
+                detail="Resource already exists",
+            )
+
+        await self._invalidate(ids)
+        return written
+
+    def _upsert_query(
+        self,
+        dialect: str,
+        *,
+        index_elements: Sequence[str] | None = None,
+        update_columns: Sequence[str] | None = None,
+        from_select: tuple[Sequence[str], Select[Any]] | None = None,
+    ) -> Insert:
+        """
+        Dialect `INSERT ... ON CONFLICT` of the model, with the defaults of `bulk_upsert`
+        """
+        if index_elements is None:
+            index_elements = [column.name for column in self.model.__table__.primary_key]
+        if update_columns is None:
+            update_columns = [
+                name
+                for name in self.model.__table__.columns.keys()
+                if name not in index_elements and name not in self.insert_only_columns
+            ]
+
+        if dialect == "postgresql":
+            query = postgresql.insert(self.model)
+        elif dialect == "sqlite":
+            query = sqlite.insert(self.model)
+        else:
+            raise NotImplementedError(f"Upsert is not supported on {dialect}")
+        if from_select is not None:
+            query = query.from_select(*from_select)
+
+        if update_columns:
+            return query.on_conflict_do_update(
+                index_elements=index_elements,
+                set_={name: query.excluded[name] for name in update_columns},
+            )
+        return query.on_conflict_do_nothing(index_elements=index_elements)
+
+    def _to_copy_records(
+        self,
+        records: list[Any],
+        columns: Sequence[str],
+        created_by_id: UUID | str | None = None,
+    ) -> list[tuple[Any, ...]]:
+        """
+        Tuples in `columns` order, objects are validated like in `bulk_create`
+        """
+        rows = iter(
+            self._to_insert_rows(
+                [record for record in records if not isinstance(record, tuple)],
+                created_by_id=created_by_id,
+            )
+        )
+        copy_records = []
+        for record in records:
+            if not isinstance(record, tuple):
+                row = next(rows)
+                record = tuple(row.get(name) for name in columns)
+            copy_records.append(record)
+        return copy_records
+
+    async def _insert_returning(
+        self, rows: list[dict[str, Any]], db_session: AsyncSession
+    ) -> list[ModelType]:
+        """
+        One multi-row `INSERT ... RETURNING`, the objects in the order of `rows`
+        """
+        # SQLite does not promise the RETURNING order of a multi-row INSERT, so
+        # SQLAlchemy would insert row by row to keep the input order. Generated
+        # integer ids follow the VALUES order, sorting on them restores it instead.
+        sort_by_id = (
+            db_session.get_bind().dialect.name == "sqlite"
+            and self._generates_int_ids(rows)
+        )
+        query = (
+            insert(self.model)
+            .returning(self.model, sort_by_parameter_order=not sort_by_id)
+            .execution_options(**{CHUNKED: True})
+        )
+        response = await db_session.exec(query, params=rows)
+        objs = response.scalars().all()
+        return sorted(objs, key=lambda obj: obj.id) if sort_by_id else list(objs)
+
+    async def _insert_batch(
+        self, rows: list[dict[str, Any]], db_session: AsyncSession
+    ) -> list[ModelType | exc.IntegrityError]:
+        """
+        Flush of the write batcher: every row in one statement and one commit.
+        On a conflict, the rows are retried each in a savepoint, so only the
+        conflicting ones fail.
+        """
+        try:
+            results = await self._insert_returning(rows, db_session)
+            await db_session.commit()
+        except exc.IntegrityError:
+            await db_session.rollback()
+            results = []
+            for row in rows:
+                try:
+                    async with db_session.begin_nested():
+                        response = await db_session.exec(
+                            insert(self.model).values(row).returning(self.model)
+                        )
+                        results.append(response.scalars().one())
+                except exc.IntegrityError as error:
+                    results.append(error)
+            await db_session.commit()
+
+        await self._invalidate(
+            [obj.id for obj in results if not isinstance(obj, exc.IntegrityError)]
+        )
+        return results
+
+    def _can_batch_create(self, db_session: AsyncSession) -> bool:
+        """
+        The group commit commits nothing of `db_session`: it batches only when
+        the session has no pending changes and no open transaction
+        """
+        return (
+            self.write_batching
+            and isinstance(db_session.bind, AsyncEngine)
+            and not (db_session.new or db_session.dirty or db_session.deleted)
+            and not db_session.in_transaction()
+        )
+
+    def _write_batcher(self, bind: AsyncEngine) -> WriteBatcher:
+        repository = copy(self)
+        repository.session = None  # each flush opens its own
+
+        async def flush(rows: list[dict[str, Any]]) -> list[Any]:
+            async with AsyncSession(bind, expire_on_commit=False) as session:
+                return await repository._insert_batch(rows, session)
+
+        return get_write_batcher(
+            (type(self), self.model, bind),
+            flush,
+            max_batch=self.write_batch_size,
+            max_delay=self.write_batch_delay,
+        )
+
+    def _generates_int_ids(self, rows: list[dict[str, Any]]) -> bool:
+        """
+        Whether the database generates the integer primary key of every row
+        """
+        primary_key = list(self.model.__table__.primary_key)
+        return (
+            len(primary_key) == 1
+            and primary_key[0].type.python_type is int
+            and all(primary_key[0].name not in row for row in rows)
+        )
+
+    def _to_insert_rows(
+        self,
+        objs_in: Sequence[CreateSchemaType | ModelType],
+        created_by_id: UUID | str | None = None,
+    ) -> list[dict[str, Any]]:
+        """
+        Validate input objects into column/value dicts for an INSERT.
+        Empty primary keys are left out so the database generates them.
+        """
+        primary_keys = {column.name for column in self.model.__table__.primary_key}
+        rows = []
+        for obj_in in objs_in:
+            db_obj = self.model.model_validate(obj_in)  # type: ignore
+
+            # case there is created-by-id Field
+            if created_by_id:
+                db_obj.created_by_id = created_by_id
+
+            rows.append(
+                {
+                    key: value
+                    for key, value in db_obj.model_dump().items()
+                    if value is not None or key not in primary_keys
+                }
+            )
+        return rows
+
     async def update(
         self,
         *,
@@ -224,26 +1014,329 @@ class CRUDBase(Generic[ModelType, CreateSchemaType, UpdateSchemaType]):
             update_data = obj_new.model_dump(
                 exclude_unset=True
             )  # This tells Pydantic to not include the values that were not sent
+        self._check_not_null(update_data)
         for field in update_data:
             setattr(obj_current, field, update_data[field])
 
         db_session.add(obj_current)
         await db_session.commit()
         await db_session.refresh(obj_current)
+        await self._invalidate([obj_current.id])
         return obj_current
 
+    async def update_by_id(
+        self,
+        *,
+        id: UUID | str,
+        obj_new: UpdateSchemaType | dict[str, Any],
+        db_session: AsyncSession | None = None,
+    ) -> ModelType:
+        """
+        Update a row without loading it first: one `UPDATE ... RETURNING`
+        statement and the commit
+        """
+        db_session = db_session or self.session
+        query = (
+            update(self.model)
+            .where(self.model.id == id)
+            .values(self._to_update_values(obj_new))
+            .returning(self.model)
+        )
+        try:
+            response = await db_session.exec(query)
+            db_obj = response.scalars().one_or_none()
+            if db_obj is None:
+                await db_session.rollback()
+                raise HTTPException(
+                    status_code=status.HTTP_404_NOT_FOUND,
+                    detail="Resource Not Found",
+                )
+            await db_session.commit()
+        except exc.IntegrityError:
+            await db_session.rollback()
+            raise HTTPException(
+                status_code=409,
+                detail="Resource already exists",
+            )
+
+        await self._invalidate([id])
+        return db_obj
+
+    async def update_many(
+        self,
+        *,
+        objs_new: Sequence[UpdateSchemaType | dict[str, Any]],
+        chunk_size: int = 1000,
+        db_session: AsyncSession | None = None,
+    ) -> list[ModelType]:
+        """
+        Update many rows, each with its own values (which must include the `id`),
+        in one `UPDATE ... SET col = CASE id WHEN ... END ... RETURNING` statement
+        per `chunk_size` rows. Nothing is written unless every row exists.
+        """
+        db_session = db_session or self.session
+        rows = {
+            obj_new["id"] if isinstance(obj_new, dict) else obj_new.id: (
+                self._to_update_values(obj_new)
+            )
+            for obj_new in objs_new
+        }
+        if not rows:
+            return []
+
+        columns = self.model.__table__.columns
+        db_objects = []
+        try:
+            for chunk in chunked(rows.items(), chunk_size):
+                ids = [id for id, _ in chunk]
+                values = {
+                    name: case(
+                        {
+                            id: literal(row[name], columns[name].type)
+                            for id, row in chunk
+                            if name in row
+                        },
+                        value=self.model.id,
+                        else_=columns[name],
+                    )
+                    for name in {name for _, row in chunk for name in row}
+                }
+                query = (
+                    update(self.model)
+                    .where(self.model.id.in_(ids))
+                    .values(values)
+                    .returning(self.model)
+                    .execution_options(**{CHUNKED: True})
+                )
+                response = await db_session.exec(query)
+                db_objects.extend(response.scalars().all())
+
+            if len(db_objects) != len(rows):
+                await db_session.rollback()
+                raise HTTPException(
+                    status_code=status.HTTP_404_NOT_FOUND,
+                    detail="Resource Not Found",
+                )
+            await db_session.commit()
+        except exc.IntegrityError:
+            await db_session.rollback()
+            raise HTTPException(
+                status_code=409,
+                detail="Resource already exists",
+            )
+
+        await self._invalidate(list(rows))
+        return db_objects
+
+    def _to_update_values(
+        self, obj_new: UpdateSchemaType | dict[str, Any]
+    ) -> dict[str, Any]:
+        """
+        Column/value dict for an UPDATE, with only the fields that were sent
+        and without the primary key
+        """
+        if isinstance(obj_new, dict):
+            update_data = obj_new
+        else:
+            update_data = obj_new.model_dump(exclude_unset=True)
+        self._check_not_null(update_data)
+        primary_keys = {column.name for column in self.model.__table__.primary_key}
+        return {
+            key: value for key, value in update_data.items() if key not in primary_keys
+        }
+
+    def _check_not_null(self, update_data: dict[str, Any]) -> None:
+        """
+        Reject nulls sent for NOT NULL columns, the database would answer with
+        an IntegrityError that is not a conflict
+        """
+        columns = self.model.__table__.columns
+        for key, value in update_data.items():
+            if value is None and key in columns and not columns[key].nullable:
+                raise HTTPException(
+                    status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+                    detail=f"Field {key} cannot be null",
+                )
+
     async def remove(
         self, *, id: UUID | str, db_session: AsyncSession | None = None
     ) -> ModelType:
+        """
+        Delete a row with one `DELETE ... RETURNING` statement and the commit
+        """
         db_session = db_session or self.session
-        response = await db_session.exec(select(self.model).where(self.model.id == id))
-        obj = response.one_or_none()
+        response = await db_session.exec(
+            delete(self.model).where(self.model.id == id).returning(self.model)
+        )
+        obj = response.scalars().one_or_none()
         if not obj:
+            await db_session.rollback()
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
                 detail="Resource Not Found",
             )
 
-        await db_session.delete(obj)
         await db_session.commit()
+        await self._invalidate([id])
         return obj
+
+    async def remove_many(
+        self,
+        *,
+        ids: Sequence[UUID | str],
+        chunk_size: int = 1000,
+        db_session: AsyncSession | None = None,
+    ) -> list[UUID | str]:
+        """
+        Delete the rows of `ids`, one statement per `chunk_size` ids.
+        Returns the ids that existed and were deleted.
+        """
+        db_session = db_session or self.session
+        deleted_ids = []
+        for chunk in chunked(ids, chunk_size):
+            response = await db_session.exec(
+                delete(self.model)
+                .where(self.model.id.in_(chunk))
+                .returning(self.model.id)
+                .execution_options(**{CHUNKED: True})
+            )
+            deleted_ids.extend(response.scalars().all())
+        await db_session.commit()
+
+        await self._invalidate(deleted_ids)
+        return deleted_ids
+
+    async def remove_where(
+        self, *whereclause: Any, db_session: AsyncSession | None = None
+    ) -> list[UUID | str]:
+        """
+        Delete every row matching the filters in one statement, e.g.
+        `remove_where(Model.created_at < cutoff)`. Returns the deleted ids.
+        """
+        if not whereclause:
+            raise ValueError("remove_where needs at least one filter")
+
+        db_session = db_session or self.session
+        response = await db_session.exec(
+            delete(self.model).where(*whereclause).returning(self.model.id)
+        )
+        deleted_ids = list(response.scalars().all())
+        await db_session.commit()
+
+        await self._invalidate(deleted_ids)
+        return deleted_ids
+
+    def sortable_columns(self) -> list[str]:
+        """
+        Names of the columns callers may pass as `order_by`
+        """
+        columns = self.model.__table__.columns.keys()
+        if self.order_by_columns is None:
+            return columns
+        return [name for name in self.order_by_columns if name in columns]
+
+    def _select(self, schema: type[SchemaType] | None = None, *extra: str) -> Select:
+        """
+        `SELECT` of the model, or of only the columns of `schema` (and `extra`),
+        which returns plain rows and skips building ORM objects
+        """
+        if schema is None:
+            return select(self.model)
+        columns = self.model.__table__.columns
+        names = dict.fromkeys([*schema.model_fields, *extra])
+        return sa_select(*(columns[name] for name in names if name in columns))
+
+    def _to_schema(
+        self, items: Sequence[Any], schema: type[SchemaType] | None
+    ) -> list[Any]:
+        """
+        Validate rows (or ORM objects from a custom query) into `schema` objects
+        in one call, or return them as they are without a schema
+        """
+        if schema is None:
+            return list(items)
+        return type_adapter(list[schema]).validate_python(items, from_attributes=True)
+
+    def _dump(self, obj: ModelType) -> dict[str, Any]:
+        return obj.model_dump(mode="json")
+
+    def _load(self, data: dict[str, Any]) -> ModelType:
+        return self.model.model_validate(data)
+
+    async def _attach(
+        self, obj: ModelType | None, db_session: AsyncSession
+    ) -> ModelType | None:
+        """
+        Cached rows are built outside of the session, merge them in without a
+        SELECT so they can be updated or deleted like freshly loaded ones.
+        """
+        if obj is None or obj in db_session:
+            return obj
+        make_transient_to_detached(obj)
+        return await db_session.merge(obj, load=False)
+
+    async def _cached_page(
+        self,
+        load: Callable[[], Awaitable[Page[Any]]],
+        method: str,
+        *key_parts: Any,
+        schema: type[SchemaType] | None = None,
+        db_session: AsyncSession | None = None,
+    ) -> Page[Any]:
+        """
+        Load the page of `method` through the read-through cache, and through
+        single-flight when `method` is in `single_flight`
+        """
+        db_session = db_session or self.session
+
+        def dumps(page: Page[Any]) -> dict[str, Any]:
+            return page.model_dump(mode="json")
+
+        def loads(data: dict[str, Any]) -> Page[Any]:
+            if schema is not None:
+                return Page[schema](**data)
+            return Page(**{**data, "items": [self._load(item) for item in data["items"]]})
+
+        schema_name = f"{schema.__module__}.{schema.__qualname__}" if schema else None
+        if self.cache is not None:
+            load_from_database = self._from_primary(load, db_session)
+
+            async def load() -> Page[Any]:
+                return await self.cache.get_or_load(
+                    await self.cache.list_key(method, *key_parts, schema_name),
+                    load_from_database,
+                    dumps=dumps,
+                    loads=loads,
+                )
+
+        # ORM rows belong to the session of the caller that loaded them
+        if schema is None or method not in self.single_flight:
+            return await load()
+        flight = get_single_flight(
+            f"{type(self).__name__}.{method}",
+            self.redis_client if self.single_flight_across_workers else None,
+        )
+        return await flight.do(
+            repr((self.cache_namespace, *key_parts, schema_name)),
+            load,
+            dumps=dumps,
+            loads=loads,
+        )
+
+    def _from_primary(
+        self, load: Callable[[], Awaitable[Any]], db_session: AsyncSession
+    ) -> Callable[[], Awaitable[Any]]:
+        """
+        Cache misses are filled from the primary: a replica lagging behind a
+        write would cache its stale rows under the generation of the write
+        """
+
+        async def load_from_primary() -> Any:
+            with reading_primary(db_session):
+                return await load()
+
+        return load_from_primary
+
+    async def _invalidate(self, ids: Sequence[UUID | str] = ()) -> None:
+        if self.cache is not None:
+            await self.cache.invalidate(ids)
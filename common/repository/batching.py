@@ -0,0 +1,93 @@
+"""
+Group commit for `CRUDBase.create` when a repository sets `write_batching`:
+single-row creates arriving within a few milliseconds of each other are
+written by one multi-row `INSERT ... RETURNING` and one commit.
+"""
+
+import asyncio
+from typing import Any, Awaitable, Callable, Generic, Hashable, TypeVar
+
+T = TypeVar("T")
+R = TypeVar("R")
+
+
+class WriteBatcher(Generic[T, R]):
+    """
+    Collects submitted items until `max_batch` of them are pending or
+    `max_delay` seconds passed since the first one, then hands them to `flush`
+    at once. `flush` returns one result per item, in order; a result that is an
+    exception is raised to the submitter of that item only.
+    """
+
+    def __init__(
+        self,
+        flush: Callable[[list[T]], Awaitable[list[R | Exception]]],
+        *,
+        max_batch: int = 100,
+        max_delay: float = 0.002,
+    ):
+        self.flush = flush
+        self.max_batch = max_batch
+        self.max_delay = max_delay
+        self._pending: list[tuple[T, asyncio.Future]] = []
+        self._timer: asyncio.TimerHandle | None = None
+        self._flushes: set[asyncio.Task] = set()
+
+    def __len__(self) -> int:
+        return len(self._pending)
+
+    async def submit(self, item: T) -> R:
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((item, future))
+        if len(self._pending) >= self.max_batch:
+            self._start_flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.max_delay, self._start_flush)
+        return await future
+
+    def _start_flush(self) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        batch, self._pending = self._pending, []
+        if batch:
+            # keep a reference, the loop only holds weak ones to tasks
+            task = asyncio.create_task(self._flush(batch))
+            self._flushes.add(task)
+            task.add_done_callback(self._flushes.discard)
+
+    async def _flush(self, batch: list[tuple[T, asyncio.Future]]) -> None:
+        try:
+            results = await self.flush([item for item, _ in batch])
+        except Exception as exc:
+            results = [exc] * len(batch)
+
+        for (_, future), result in zip(batch, results):
+            if future.done():  # the submitter was cancelled
+                continue
+            if isinstance(result, Exception):
+                future.set_exception(result)
+            else:
+                future.set_result(result)
+
+
+_batchers: dict[Hashable, WriteBatcher] = {}
+
+
+def get_write_batcher(
+    key: Hashable,
+    flush: Callable[[list[Any]], Awaitable[list[Any]]],
+    *,
+    max_batch: int,
+    max_delay: float,
+) -> WriteBatcher:
+    """
+    The batcher of `key` in the process, created with `flush` on first use
+    """
+    batcher = _batchers.get(key)
+    if batcher is None:
+        batcher = _batchers[key] = WriteBatcher(
+            flush, max_batch=max_batch, max_delay=max_delay
+        )
+    return batcher
@@ -0,0 +1,357 @@
+"""
+Read-through cache used by `CRUDBase` when a repository sets `cache_ttl`:
+an optional in-process `LocalCache` (L1) in front of Redis (L2)
+"""
+
+import asyncio
+import hashlib
+import json
+import logging
+import sys
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Iterable, Optional, TypeVar
+from uuid import uuid4
+
+from redis.asyncio import Redis
+from redis.exceptions import RedisError
+
+from common.utils.locks import RedisLock
+from config.settings import get_settings
+
+settings = get_settings()
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+INVALIDATION_CHANNEL = f"{settings.APP_NAME}:cache:invalidate"
+
+
+class LocalCache:
+    """
+    Per-worker LRU cache bounded by entry count and by approximate size in bytes,
+    with a TTL per entry. Values are shared between readers and must not be mutated.
+    """
+
+    def __init__(self, *, max_entries: int, max_bytes: int, ttl: float):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self._entries: OrderedDict[str, tuple[float, int, Any]] = OrderedDict()
+        self._bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: str) -> Optional[Any]:
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+
+        expires_at, _, value = entry
+        if expires_at <= time.monotonic():
+            self._pop(key)
+            self.expirations += 1
+            self.misses += 1
+            return None
+
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def set(
+        self, key: str, value: Any, *, size: int, ttl: Optional[float] = None
+    ) -> None:
+        self._pop(key)  # an older value must not outlive a newer, too large one
+        if size > self.max_bytes:
+            return
+
+        ttl = self.ttl if ttl is None else min(ttl, self.ttl)
+        self._entries[key] = (time.monotonic() + ttl, size, value)
+        self._bytes += size
+
+        while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+            self._pop(next(iter(self._entries)))
+            self.evictions += 1
+
+    def delete_many(self, keys: Iterable[str]) -> None:
+        for key in keys:
+            self._pop(key)
+
+    def clear(self) -> None:
+        self._entries.clear()
+        self._bytes = 0
+
+    def stats(self) -> dict[str, int]:
+        return {
+            "entries": len(self._entries),
+            "bytes": self._bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+        }
+
+    def _pop(self, key: str) -> None:
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self._bytes -= entry[1]
+
+
+local_cache = LocalCache(
+    max_entries=settings.CACHE_L1_MAX_ENTRIES,
+    max_bytes=settings.CACHE_L1_MAX_BYTES,
+    ttl=settings.CACHE_L1_TTL,
+)
+
+
+class RepositoryCache:
+    """
+    Keys look like `<namespace>:v<version>:item:<id>` for single rows and
+    `<namespace>:v<version>:list:g<generation>:<digest>` for list queries, and
+    `<namespace>:v<version>:validator:g<generation>:<id or "table">` for the
+    conditional GET validators.
+    `version` is bumped in code when the cached shape changes, `generation` is a
+    Redis counter bumped on every write so all cached lists go stale at once.
+
+    Values are stored as JSON, `dumps` turns a loaded value into JSON-compatible
+    data and `loads` builds it back. With a `local_cache`, decoded data is also
+    kept in process and writes evict it in every worker through Redis pub/sub.
+
+    Misses are loaded under a short Redis lock (single-flight): concurrent
+    readers of the same key wait for the first one instead of all hitting the
+    database. Any Redis error degrades to loading from the database.
+    """
+
+    def __init__(
+        self,
+        *,
+        redis_client: Redis,
+        namespace: str,
+        ttl: int,
+        version: int = 1,
+        local_cache: Optional[LocalCache] = None,
+        lock_timeout: float = 5.0,
+        lock_poll_interval: float = 0.05,
+    ):
+        self.redis_client = redis_client
+        self.namespace = namespace
+        self.ttl = ttl
+        self.version = version
+        self.local_cache = local_cache
+        self.lock_timeout = lock_timeout
+        self.lock_poll_interval = lock_poll_interval
+
+    @property
+    def prefix(self) -> str:
+        return f"{self.namespace}:v{self.version}"
+
+    @property
+    def generation_key(self) -> str:
+        return f"{self.prefix}:generation"
+
+    def item_key(self, id: Any) -> str:
+        return f"{self.prefix}:item:{id}"
+
+    async def list_key(self, *parts: Any) -> Optional[str]:
+        """
+        Key of a list query in the current generation, `None` if Redis is unavailable
+        """
+        generation = await self.generation()
+        if generation is None:
+            return None
+        digest = hashlib.sha1(repr(parts).encode()).hexdigest()
+        return f"{self.prefix}:list:g{generation}:{digest}"
+
+    async def validator_key(self, id: Any = None) -> Optional[str]:
+        """
+        Key of the validator of a row, or of the table without `id`, in the
+        current generation; `None` if Redis is unavailable
+        """
+        generation = await self.generation()
+        if generation is None:
+            return None
+        return f"{self.prefix}:validator:g{generation}:{'table' if id is None else id}"
+
+    async def get_or_load(
+        self,
+        key: Optional[str],
+        loader: Callable[[], Awaitable[Optional[T]]],
+        *,
+        dumps: Callable[[T], Any],
+        loads: Callable[[Any], T],
+    ) -> Optional[T]:
+        """
+        Return the cached value of `key`, or load, cache and return it.
+        `None` results are not cached.
+        """
+        if key is None:
+            return await loader()
+
+        if self.local_cache is not None:
+            data = self.local_cache.get(key)
+            if data is not None:
+                return loads(data)
+
+        try:
+            raw = await self.redis_client.get(key)
+        except RedisError:
+            logger.warning("Redis unavailable, loading %s from the database", key)
+            return await loader()
+        if raw is not None:
+            return loads(self._decode(key, raw))
+
+        lock = RedisLock(
+            self.redis_client,
+            f"{key}:lock",
+            timeout=self.lock_timeout,
+            poll_interval=self.lock_poll_interval,
+        )
+        try:
+            if not await lock.acquire():
+                raw = await lock.wait(key)
+                if raw is not None:
+                    return loads(self._decode(key, raw))
+        except RedisError:
+            pass  # load without the lock
+
+        try:
+            generation = await self.generation()
+            value = await loader()
+            # a write during the load makes the value possibly stale already
+            if value is not None:
+                await self.set_many({key: dumps(value)}, generation=generation)
+        finally:
+            await lock.release()
+        return value
+
+    async def get_many(self, keys: list[str]) -> list[Optional[Any]]:
+        """
+        Cached data of each key, `None` for misses
+        """
+        values = [
+            self.local_cache.get(key) if self.local_cache is not None else None
+            for key in keys
+        ]
+        missing = [key for key, value in zip(keys, values) if value is None]
+        if not missing:
+            return values
+
+        try:
+            raws = dict(zip(missing, await self.redis_client.mget(missing)))
+        except RedisError:
+            logger.warning(
+                "Redis unavailable, loading %d keys from the database", len(missing)
+            )
+            return values
+
+        return [
+            (
+                value
+                if value is not None or raws[key] is None
+                else self._decode(key, raws[key])
+            )
+            for key, value in zip(keys, values)
+        ]
+
+    async def set_many(
+        self, values: dict[str, Any], *, generation: Optional[int] = None
+    ) -> None:
+        """
+        Cache the data of `values`, unless `generation` is given and a write
+        happened since
+        """
+        if not values:
+            return
+        if generation is not None and generation != await self.generation():
+            return
+
+        raws = {key: json.dumps(data) for key, data in values.items()}
+        try:
+            async with self.redis_client.pipeline(transaction=False) as pipe:
+                for key, raw in raws.items():
+                    pipe.set(key, raw, ex=self.ttl)
+                await pipe.execute()
+        except RedisError:
+            logger.warning("Redis unavailable, could not cache %d keys", len(values))
+            return
+
+        if self.local_cache is not None:
+            for key, data in values.items():
+                self.local_cache.set(
+                    key, data, size=sys.getsizeof(raws[key]), ttl=self.ttl
+                )
+
+    async def invalidate(self, ids: Iterable[Any] = ()) -> None:
+        """
+        Drop the cached rows of `ids` and every cached list of the model, in
+        Redis and in the local cache of every worker
+        """
+        keys = [self.item_key(id) for id in ids]
+        if self.local_cache is not None:
+            self.local_cache.delete_many([*keys, self.generation_key])
+
+        try:
+            async with self.redis_client.pipeline(transaction=False) as pipe:
+                if keys:
+                    pipe.delete(*keys)
+                pipe.incr(self.generation_key)
+                if self.local_cache is not None:
+                    pipe.publish(
+                        INVALIDATION_CHANNEL, json.dumps([*keys, self.generation_key])
+                    )
+                await pipe.execute()
+        except RedisError:
+            logger.error("Redis unavailable, could not invalidate %s", self.prefix)
+
+    async def generation(self) -> Optional[int]:
+        """
+        Current write generation of the model, `None` if Redis is unavailable
+        """
+        if self.local_cache is not None:
+            generation = self.local_cache.get(self.generation_key)
+            if generation is not None:
+                return generation
+
+        try:
+            generation = int(await self.redis_client.get(self.generation_key) or 0)
+        except RedisError:
+            return None
+
+        if self.local_cache is not None:
+            self.local_cache.set(self.generation_key, generation, size=sys.getsizeof(0))
+        return generation
+
+    def _decode(self, key: str, raw: str) -> Any:
+        data = json.loads(raw)
+        if self.local_cache is not None:
+            self.local_cache.set(key, data, size=sys.getsizeof(raw), ttl=self.ttl)
+        return data
+
+
+async def listen_for_invalidations(
+    redis_client: Redis, cache: LocalCache = local_cache, retry_interval: float = 1.0
+) -> None:
+    """
+    Evict keys other workers invalidated from this worker's local cache.
+    Runs until cancelled. Messages missed while disconnected are unknown, so
+    the local cache is cleared whenever the subscription is (re)established.
+    """
+    while True:
+        try:
+            async with redis_client.pubsub() as pubsub:
+                await pubsub.subscribe(INVALIDATION_CHANNEL)
+                cache.clear()
+                async for message in pubsub.listen():
+                    if message["type"] == "message":
+                        cache.delete_many(json.loads(message["data"]))
+        except RedisError:
+            logger.warning("Cache invalidation channel lost, retrying")
+            cache.clear()
+            await asyncio.sleep(retry_interval)
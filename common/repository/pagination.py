@@ -0,0 +1,156 @@
+"""
+Pagination helpers used by `CRUDBase`: keyset cursors and the total count modes
+"""
+
+import base64
+import binascii
+import hashlib
+import json
+import logging
+from typing import Any
+
+from fastapi import HTTPException, status
+from pydantic import TypeAdapter, ValidationError
+from pydantic_core import to_jsonable_python
+from redis.asyncio import Redis
+from redis.exceptions import RedisError
+from sqlalchemy import Column, exc, text, tuple_
+from sqlmodel import func, select
+from sqlmodel.ext.asyncio.session import AsyncSession
+from sqlmodel.sql.expression import Select
+
+from common.schemas.enums import OrderEnum
+
+logger = logging.getLogger(__name__)
+
+NEXT = "next"
+PREVIOUS = "prev"
+
+
+def encode_cursor(*, order_by: str, value: Any, id: Any, direction: str) -> str:
+    payload = {"o": order_by, "v": value, "id": id, "d": direction}
+    raw = json.dumps(to_jsonable_python(payload), separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(
+    cursor: str, *, order_by: str, value_type: Any, id_type: Any
+) -> tuple[Any, Any, str]:
+    """
+    Returns the `(value, id, direction)` stored in a cursor, validated as the given types
+    """
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        payload = json.loads(raw)
+        if payload["o"] != order_by or payload["d"] not in (NEXT, PREVIOUS):
+            raise ValueError("cursor does not match the requested ordering")
+
+        value = TypeAdapter(value_type).validate_python(payload["v"])
+        id = TypeAdapter(id_type).validate_python(payload["id"])
+    except (
+        binascii.Error,
+        UnicodeDecodeError,
+        ValueError,
+        KeyError,
+        TypeError,
+        ValidationError,
+    ):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid cursor",
+        )
+    return value, id, payload["d"]
+
+
+def keyset_query(
+    query: Select,
+    *,
+    order_column: Column,
+    id_column: Column,
+    order: OrderEnum,
+    size: int,
+    after: tuple[Any, Any] | None = None,
+    backwards: bool = False,
+) -> Select:
+    """
+    Order by `(order_column, id)` and seek past `after` instead of using OFFSET,
+    so every page costs the same index range scan regardless of its depth.
+    One extra row is fetched to tell whether there is another page.
+    """
+    ascending = (order == OrderEnum.asc) != backwards
+    key = tuple_(order_column, id_column)
+
+    if after is not None:
+        query = query.where(key > tuple_(*after) if ascending else key < tuple_(*after))
+
+    if ascending:
+        query = query.order_by(None).order_by(order_column.asc(), id_column.asc())
+    else:
+        query = query.order_by(None).order_by(order_column.desc(), id_column.desc())
+
+    return query.limit(size + 1)
+
+
+async def count_exact(db_session: AsyncSession, query: Select) -> int:
+    count_query = select(func.count()).select_from(
+        query.order_by(None).limit(None).offset(None).subquery()
+    )
+    response = await db_session.exec(count_query)
+    return response.one()
+
+
+async def count_estimated(db_session: AsyncSession, query: Select) -> int:
+    """
+    Row estimate of the query plan on Postgres, from the planner's table statistics.
+    Other databases have no cheap estimate and get an exact count.
+    """
+    bind = db_session.get_bind()
+    if bind.dialect.name != "postgresql":
+        return await count_exact(db_session, query)
+
+    query = query.order_by(None).limit(None).offset(None)
+    try:
+        compiled = query.compile(bind, compile_kwargs={"literal_binds": True})
+    except exc.CompileError:
+        # parameters without a literal form cannot be EXPLAINed as text
+        return await count_exact(db_session, query)
+
+    response = await db_session.exec(text(f"EXPLAIN (FORMAT JSON) {compiled}"))
+    plan = response.scalar()
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return int(plan[0]["Plan"]["Plan Rows"])
+
+
+async def count_cached(
+    db_session: AsyncSession,
+    query: Select,
+    *,
+    redis_client: Redis,
+    key_prefix: str,
+    ttl: int,
+) -> int:
+    """
+    Exact count kept in Redis for `ttl` seconds, keyed on the compiled query.
+    Falls back to counting on every call while Redis is unavailable.
+    """
+    compiled = query.order_by(None).limit(None).offset(None).compile()
+    digest = hashlib.sha1(
+        f"{compiled}|{sorted(compiled.params.items())}".encode()
+    ).hexdigest()
+    key = f"{key_prefix}:count:{digest}"
+
+    try:
+        cached = await redis_client.get(key)
+    except RedisError:
+        logger.warning("Redis unavailable, counting %s without cache", key)
+        return await count_exact(db_session, query)
+    if cached is not None:
+        return int(cached)
+
+    total = await count_exact(db_session, query)
+    try:
+        await redis_client.set(key, total, ex=ttl)
+    except RedisError:
+        logger.warning("Redis unavailable, could not cache %s", key)
+    return total
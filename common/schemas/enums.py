@@ -4,3 +4,24 @@ from enum import Enum
 class OrderEnum(str, Enum):
     asc = "asc"
     desc = "desc"
+
+
+class CountModeEnum(str, Enum):
+    exact = "exact"  # COUNT(*) over the query
+    none = "none"  # no total, only `has_next`
+    estimated = "estimated"  # planner estimate, exact on non-Postgres databases
+    cached = "cached"  # exact, cached in Redis
+
+
+class ExportFormatEnum(str, Enum):
+    ndjson = "ndjson"
+    csv = "csv"
+    arrow = "arrow"  # Arrow IPC stream, needs `pyarrow`
+
+
+class JobStatusEnum(str, Enum):
+    queued = "queued"
+    running = "running"
+    retrying = "retrying"  # failed, queued again after a delay
+    succeeded = "succeeded"
+    failed = "failed"  # out of attempts
@@ -0,0 +1,31 @@
+from typing import Any, List
+
+from pydantic import BaseModel
+
+
+class IngestRowError(BaseModel):
+    line: int
+    errors: List[Any]
+
+
+class IngestBatchError(BaseModel):
+    batch: int  # 0-based index of the batch
+    first_line: int
+    last_line: int
+    inserted: int
+    rows: List[IngestRowError] = []
+    omitted_rows: int = 0  # row errors past `INGEST_MAX_ROW_ERRORS`
+    detail: str | None = None  # set when writing the batch failed as a whole
+
+
+class IngestReport(BaseModel):
+    """
+    Totals of a streamed ingest, with only the batches that had errors, up to
+    `INGEST_MAX_ERROR_BATCHES` of them
+    """
+
+    inserted: int = 0
+    failed: int = 0
+    batches: int = 0
+    errors: List[IngestBatchError] = []
+    omitted_batches: int = 0  # batches with errors past the limit
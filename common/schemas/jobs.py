@@ -0,0 +1,17 @@
+from datetime import datetime
+from typing import Any, Optional
+
+from pydantic import BaseModel
+
+from common.schemas.enums import JobStatusEnum
+
+
+class JobRead(BaseModel):
+    id: str
+    name: str
+    status: JobStatusEnum
+    attempts: int = 0
+    result: Any = None
+    error: Optional[str] = None
+    created_at: datetime
+    updated_at: datetime
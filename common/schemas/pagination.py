@@ -0,0 +1,34 @@
+from typing import Generic, List, Optional, TypeVar
+
+from fastapi import Query
+from fastapi_pagination import Page as BasePage
+from pydantic import BaseModel
+
+DataType = TypeVar("DataType")
+
+
+class CursorParams(BaseModel):
+    cursor: Optional[str] = Query(
+        None, description="Opaque cursor taken from a previous page"
+    )
+    size: int = Query(50, ge=1, le=100, description="Page size")
+
+
+class CursorPage(
+    BaseModel,
+    Generic[DataType],
+):
+    items: List[DataType]
+    size: int
+    next_cursor: Optional[str] = None
+    previous_cursor: Optional[str] = None
+
+
+class Page(BasePage[DataType], Generic[DataType]):
+    """
+    `fastapi_pagination.Page` that can be built without a total (see `CountModeEnum`).
+    `items` is a list rather than a `Sequence`, which pydantic serializes natively.
+    """
+
+    items: List[DataType]
+    has_next: Optional[bool] = None
@@ -0,0 +1,88 @@
+import importlib
+import sys
+
+import pytest
+
+from config.apps import AppRegistry, app_registry
+from config.redis import RedisRegistry
+from config.settings import ModeEnum, Settings
+
+ROUTER = """
+from fastapi import APIRouter
+
+router = APIRouter()
+
+
+@router.get("/{path}")
+async def view():
+    return {{}}
+"""
+
+
+@pytest.fixture
+def fake_apps(tmp_path, monkeypatch):
+    """
+    Package `fake_apps` with `first` (v1, v2 and models, own url prefix),
+    `second` (no apis) and a plain module that is not an app
+    """
+    files = {
+        "__init__.py": "",
+        "not_an_app.py": "",
+        "first/__init__.py": 'url_prefix = "/one"\n',
+        "first/apis/v1/__init__.py": ROUTER.format(path="hello"),
+        "first/apis/v2/__init__.py": ROUTER.format(path="hello"),
+        "first/models.py": "",
+        "second/__init__.py": "",
+        "second/jobs.py": "",
+    }
+    for name, content in files.items():
+        path = tmp_path / "fake_apps" / name
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(content)
+    monkeypatch.syspath_prepend(str(tmp_path))
+
+    yield importlib.import_module("fake_apps")
+
+    for module in [name for name in sys.modules if name.startswith("fake_apps")]:
+        del sys.modules[module]
+
+
+def test_apps_are_discovered_and_imported_lazily(fake_apps):
+    registry = AppRegistry(fake_apps)
+
+    assert list(registry.app_configs) == ["first", "second"]
+    first, second = registry.app_configs.values()
+    assert first.api_versions() == ["v1", "v2"] and second.api_versions() == []
+    assert "fake_apps.first.apis.v1" not in sys.modules
+
+    router = registry.api_router()
+
+    assert [route.path for route in router.routes] == ["/one/hello", "/one/hello"]
+    assert second.url_prefix == "/second"
+    assert "fake_apps.first.models" not in sys.modules
+    assert [module.__name__ for module in registry.import_models()] == [
+        "fake_apps.first.models"
+    ]
+    assert [module.__name__ for module in registry.import_modules("jobs")] == [
+        "fake_apps.second.jobs"
+    ]
+
+
+def test_app_routes_are_mounted_under_their_prefix():
+    paths = {route.path for route in app_registry.api_router().routes}
+
+    assert "/example/v1/models" in paths
+    assert "/example/v2/example" in paths
+    assert "/example2/v1/example2" in paths
+
+
+@pytest.mark.asyncio
+async def test_redis_client_is_built_on_first_use():
+    registry = RedisRegistry(Settings(MODE=ModeEnum.testing))
+    assert registry._client is None
+
+    client = registry.client
+
+    assert registry.client is client
+    await registry.close()
+    assert registry._client is None
@@ -0,0 +1,26 @@
+import pytest
+
+from config.db import db
+from scripts.audit_indexes import IndexSuggestion, audit
+
+
+@pytest.mark.asyncio
+async def test_audit_reports_orders_without_index(async_db_engine):
+    async with db.async_engine.connect() as conn:
+        report = await audit(conn)
+
+    # `somemodel` only has its primary key (and the name search index)
+    assert report.suggestions == [
+        IndexSuggestion(table="somemodel", columns=[column, "id"])
+        for column in ("name", "created_at", "updated_at")
+    ]
+    assert report.suggestions[0].name == "ix_somemodel_name_id"
+    calls = {finding.call: finding.issues for finding in report.findings}
+    assert any(
+        issue.startswith("sort")
+        for issue in calls["get_multi_ordered(order_by=created_at, order=desc)"]
+    )
+    assert not any(
+        issue.startswith("sort")
+        for issue in calls.get("get_multi_ordered(order_by=id, order=asc)", [])
+    )
@@ -0,0 +1,98 @@
+import asyncio
+
+import pytest
+from fastapi import HTTPException
+
+from apps.example.models import SomeModel
+from apps.example.schemas import SomeModelCreate
+from common.repository.base import CRUDBase
+from common.repository.batching import WriteBatcher
+from common.utils.instrumentation import query_budget
+from config.db import db
+
+
+class BatchedCRUD(CRUDBase):
+    write_batching = True
+    write_batch_delay = 0.01
+
+
+@pytest.mark.asyncio
+async def test_batcher_flushes_on_size_and_delay():
+    flushed = []
+
+    async def flush(items):
+        flushed.append(items)
+        return [ValueError(item) if item < 0 else item * 10 for item in items]
+
+    batcher = WriteBatcher(flush, max_batch=3, max_delay=0.01)
+    results = await asyncio.gather(
+        *(batcher.submit(item) for item in (1, 2, 3, 4, -5)), return_exceptions=True
+    )
+
+    assert flushed == [[1, 2, 3], [4, -5]]
+    assert results[:4] == [10, 20, 30, 40]
+    assert isinstance(results[4], ValueError)
+    assert len(batcher) == 0
+
+
+@pytest.mark.asyncio
+async def test_concurrent_creates_share_one_insert(db_session):
+    async def create(name):
+        async with db.session_factory() as session:
+            return await BatchedCRUD(SomeModel, session).create(
+                obj_in=SomeModelCreate(name=name)
+            )
+
+    with query_budget() as timings:
+        models = await asyncio.gather(*(create(f"model {i}") for i in range(10)))
+
+    assert timings.statements == 1
+    assert [model.name for model in models] == [f"model {i}" for i in range(10)]
+    assert len({model.id for model in models}) == 10
+    assert await CRUDBase(SomeModel, db_session).get_count() == 10
+
+
+@pytest.mark.asyncio
+async def test_conflicts_fail_only_their_own_create(db_session):
+    existing = await CRUDBase(SomeModel, db_session).create(
+        obj_in=SomeModelCreate(name="existing")
+    )
+
+    async def create(obj_in):
+        async with db.session_factory() as session:
+            return await BatchedCRUD(SomeModel, session).create(obj_in=obj_in)
+
+    results = await asyncio.gather(
+        create(SomeModelCreate(name="first")),
+        create(SomeModel(id=existing.id, name="conflict")),
+        create(SomeModelCreate(name="second")),
+        return_exceptions=True,
+    )
+
+    assert [result.name for result in (results[0], results[2])] == ["first", "second"]
+    assert isinstance(results[1], HTTPException) and results[1].status_code == 409
+    assert await CRUDBase(SomeModel, db_session).get_count() == 3
+
+
+@pytest.mark.asyncio
+async def test_sessions_with_pending_changes_are_not_batched(db_session):
+    db_session.add(SomeModel(name="pending"))
+
+    model = await BatchedCRUD(SomeModel, db_session).create(
+        obj_in=SomeModelCreate(name="created")
+    )
+
+    async with db.session_factory() as session:
+        models = await CRUDBase(SomeModel, session).get_multi()
+    assert model.name == "created"
+    assert {model.name for model in models} == {"pending", "created"}
+
+
+@pytest.mark.asyncio
+async def test_batched_create_reads_back_from_the_primary(db_session):
+    model = await BatchedCRUD(SomeModel, db_session).create(
+        obj_in=SomeModelCreate(name="batched")
+    )
+
+    assert model in db_session
+    assert db_session.sync_session.wrote
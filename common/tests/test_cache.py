@@ -0,0 +1,225 @@
+import asyncio
+
+import pytest
+import redis.asyncio as async_redis
+from fastapi_pagination import Params
+from sqlmodel import delete
+
+from apps.example.models import SomeModel
+from apps.example.schemas import SomeModelCreate, SomeModelRead
+from common.repository.base import CRUDBase
+from common.repository.cache import (
+    LocalCache,
+    RepositoryCache,
+    listen_for_invalidations,
+)
+
+
+class CachedCRUD(CRUDBase):
+    cache_ttl = 60
+
+
+@pytest.mark.asyncio
+async def test_get_is_cached_and_invalidated_on_update(db_session, redis_client):
+    crud = CachedCRUD(SomeModel, db_session, redis_client=redis_client)
+    model = await crud.create(obj_in=SomeModelCreate(name="Initial"))
+    key = crud.cache.item_key(model.id)
+
+    assert await crud.get(id=model.id) is model
+    assert await redis_client.exists(key)
+
+    # a cache hit is merged into the session and can be written through it
+    db_session.expunge_all()
+    found = await crud.get(id=model.id)
+    assert found is not model
+    assert found.name == "Initial"
+
+    await crud.update(obj_current=found, obj_new={"name": "Updated"})
+    assert not await redis_client.exists(key)
+
+    db_session.expunge_all()
+    found = await crud.get(id=model.id)
+    assert found.name == "Updated"
+    assert await crud.get_count() == 1
+
+
+@pytest.mark.asyncio
+async def test_copy_from_merge_evicts_the_merged_rows(db_session, redis_client):
+    crud = CachedCRUD(SomeModel, db_session, redis_client=redis_client)
+    model = await crud.create(obj_in=SomeModelCreate(name="old"))
+    assert (await crud.get(id=model.id)).name == "old"
+    assert await redis_client.exists(crud.cache.item_key(model.id))
+
+    written = await crud.copy_from(
+        records=[SomeModel(id=model.id, name="merged")],
+        columns=["id", "name", "created_at", "updated_at"],
+        merge=True,
+    )
+
+    assert written == 1
+    assert not await redis_client.exists(crud.cache.item_key(model.id))
+    db_session.expunge_all()
+    assert (await crud.get(id=model.id)).name == "merged"
+
+
+@pytest.mark.asyncio
+async def test_get_by_ids_mixes_hits_and_misses(db_session, redis_client):
+    crud = CachedCRUD(SomeModel, db_session, redis_client=redis_client)
+    models = await crud.bulk_create(
+        objs_in=[SomeModelCreate(name=f"Test Model {i}") for i in range(3)]
+    )
+    await crud.get(id=models[0].id)
+
+    found = await crud.get_by_ids(list_ids=[model.id for model in models])
+    assert sorted(obj.id for obj in found) == sorted(model.id for model in models)
+    for model in models:
+        assert await redis_client.exists(crud.cache.item_key(model.id))
+
+
+@pytest.mark.asyncio
+async def test_pages_are_invalidated_by_writes(db_session, redis_client):
+    crud = CachedCRUD(SomeModel, db_session, redis_client=redis_client)
+    await crud.create(obj_in=SomeModelCreate(name="Test Model 1"))
+
+    page = await crud.get_multi_paginated_ordered(params=Params(page=1, size=10))
+    assert page.total == 1
+    cached = await crud.get_multi_paginated_ordered(params=Params(page=1, size=10))
+    assert [obj.name for obj in cached.items] == ["Test Model 1"]
+    assert cached.items[0] is not page.items[0]
+
+    await crud.create(obj_in=SomeModelCreate(name="Test Model 2"))
+    page = await crud.get_multi_paginated_ordered(params=Params(page=1, size=10))
+    assert page.total == 2
+
+
+@pytest.mark.asyncio
+async def test_projected_pages_are_cached_per_schema(db_session, redis_client):
+    crud = CachedCRUD(SomeModel, db_session, redis_client=redis_client)
+    await crud.create(obj_in=SomeModelCreate(name="Test Model 1"))
+
+    params = Params(page=1, size=10)
+    await crud.get_multi_paginated_ordered(params=params, schema=SomeModelRead)
+    cached = await crud.get_multi_paginated_ordered(params=params, schema=SomeModelRead)
+    assert [type(obj) for obj in cached.items] == [SomeModelRead]
+
+    # the full rows are cached under their own key
+    page = await crud.get_multi_paginated_ordered(params=params)
+    assert [type(obj) for obj in page.items] == [SomeModel]
+
+
+@pytest.mark.asyncio
+async def test_concurrent_misses_load_once(redis_client):
+    cache = RepositoryCache(
+        redis_client=redis_client,
+        namespace="fastapi-django-like-template:test",
+        ttl=60,
+        lock_poll_interval=0.01,
+    )
+    loads = 0
+
+    async def loader():
+        nonlocal loads
+        loads += 1
+        await asyncio.sleep(0.05)
+        return "value"
+
+    results = await asyncio.gather(
+        *(
+            cache.get_or_load(
+                "fastapi-django-like-template:test:key", loader, dumps=str, loads=str
+            )
+            for _ in range(10)
+        )
+    )
+
+    assert results == ["value"] * 10
+    assert loads == 1
+
+
+@pytest.mark.asyncio
+async def test_unreachable_redis_falls_back_to_database(db_session):
+    redis_client = async_redis.Redis.from_url("redis://localhost:1")
+    crud = CachedCRUD(SomeModel, db_session, redis_client=redis_client)
+
+    model = await crud.create(obj_in=SomeModelCreate(name="Test Model"))
+    assert await crud.get(id=model.id) is model
+    page = await crud.get_multi_paginated(params=Params(page=1, size=10))
+    assert page.total == 1
+    await redis_client.aclose()
+
+
+def test_local_cache_lru_and_size_bounds():
+    cache = LocalCache(max_entries=2, max_bytes=100, ttl=60)
+    cache.set("a", 1, size=10)
+    cache.set("b", 2, size=10)
+    assert cache.get("a") == 1  # "b" is now the least recently used
+
+    cache.set("c", 3, size=10)
+    assert cache.get("b") is None
+    assert cache.get("c") == 3
+
+    cache.set("d", 4, size=95)  # over max_bytes together with "a" or "c"
+    assert len(cache) == 1
+    cache.set("too big", 5, size=101)
+    assert cache.get("too big") is None
+
+    assert cache.stats() == {
+        "entries": 1,
+        "bytes": 95,
+        "hits": 2,
+        "misses": 2,
+        "evictions": 3,
+        "expirations": 0,
+    }
+
+    # a newer value too large to keep still replaces the older one
+    cache.set("d", 6, size=101)
+    assert cache.get("d") is None
+    assert (len(cache), cache.stats()["bytes"]) == (0, 0)
+
+
+def test_local_cache_ttl():
+    cache = LocalCache(max_entries=10, max_bytes=100, ttl=60)
+    cache.set("a", 1, size=1, ttl=0)
+    assert cache.get("a") is None
+    assert cache.expirations == 1
+    assert cache.stats()["bytes"] == 0
+
+
+@pytest.mark.asyncio
+async def test_local_cache_serves_hits_without_redis(db_session, redis_client):
+    crud = CachedCRUD(SomeModel, db_session, redis_client=redis_client)
+    crud.cache.local_cache = LocalCache(max_entries=10, max_bytes=10_000, ttl=60)
+    model = await crud.create(obj_in=SomeModelCreate(name="Test Model"))
+    await crud.get(id=model.id)
+
+    # neither Redis nor the database has the row anymore
+    await redis_client.delete(crud.cache.item_key(model.id))
+    await db_session.exec(delete(SomeModel))
+    await db_session.commit()
+    db_session.expunge_all()
+
+    found = await crud.get(id=model.id)
+    assert found.name == "Test Model"
+
+
+@pytest.mark.asyncio
+async def test_invalidation_evicts_other_workers(db_session, redis_client):
+    crud = CachedCRUD(SomeModel, db_session, redis_client=redis_client)
+    crud.cache.local_cache = LocalCache(max_entries=10, max_bytes=10_000, ttl=60)
+    other_worker = LocalCache(max_entries=10, max_bytes=10_000, ttl=60)
+    listener = asyncio.create_task(listen_for_invalidations(redis_client, other_worker))
+
+    model = await crud.create(obj_in=SomeModelCreate(name="Test Model"))
+    key = crud.cache.item_key(model.id)
+    await asyncio.sleep(0.1)  # the listener clears its cache once subscribed
+    other_worker.set(key, {"id": model.id}, size=1)
+
+    await crud.update(obj_current=model, obj_new={"name": "Updated"})
+    for _ in range(50):
+        if other_worker.get(key) is None:
+            break
+        await asyncio.sleep(0.01)
+
+    listener.cancel()
+    assert other_worker.get(key) is None
@@ -0,0 +1,77 @@
+import pytest
+from fastapi import HTTPException
+
+from apps.example.models import SomeModel
+from apps.example.schemas import SomeModelCreate
+from common.repository.base import CRUDBase
+from common.schemas.enums import OrderEnum
+from common.schemas.pagination import CursorParams
+
+
+async def walk_pages(crud, order_by, order, size):
+    pages, cursor = [], None
+    while True:
+        page = await crud.get_multi_cursor_paginated_ordered(
+            params=CursorParams(cursor=cursor, size=size),
+            order_by=order_by,
+            order=order,
+        )
+        pages.append(page)
+        if page.next_cursor is None:
+            return pages
+        cursor = page.next_cursor
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("order", [OrderEnum.asc, OrderEnum.desc])
+async def test_cursor_pages_cover_all_rows_once(db_session, order):
+    crud = CRUDBase(SomeModel, db_session)
+    # duplicated names make sure ties are broken on id
+    created = await crud.bulk_create(
+        objs_in=[SomeModelCreate(name=f"name {i % 3}") for i in range(7)]
+    )
+
+    pages = await walk_pages(crud, "name", order, size=3)
+
+    assert [len(page.items) for page in pages] == [3, 3, 1]
+    assert pages[0].previous_cursor is None
+
+    names = [(obj.name, obj.id) for page in pages for obj in page.items]
+    expected = sorted(((obj.name, obj.id) for obj in created), reverse=order == "desc")
+    assert names == expected
+
+
+@pytest.mark.asyncio
+async def test_cursor_previous_page(db_session):
+    crud = CRUDBase(SomeModel, db_session)
+    await crud.bulk_create(objs_in=[SomeModelCreate(name=f"{i}") for i in range(5)])
+
+    pages = await walk_pages(crud, None, OrderEnum.asc, size=2)
+    last = pages[-1]
+
+    previous = await crud.get_multi_cursor_paginated_ordered(
+        params=CursorParams(cursor=last.previous_cursor, size=2),
+    )
+    assert [obj.id for obj in previous.items] == [obj.id for obj in pages[1].items]
+    assert previous.next_cursor is not None
+    assert previous.previous_cursor is not None
+
+    first = await crud.get_multi_cursor_paginated_ordered(
+        params=CursorParams(cursor=previous.previous_cursor, size=2),
+    )
+    assert [obj.id for obj in first.items] == [obj.id for obj in pages[0].items]
+    assert first.previous_cursor is None
+
+
+@pytest.mark.asyncio
+async def test_invalid_cursor(db_session):
+    crud = CRUDBase(SomeModel, db_session)
+    page = await crud.get_multi_cursor_paginated_ordered(params=CursorParams(size=1))
+    assert page.items == []
+    assert page.next_cursor is None
+
+    with pytest.raises(HTTPException) as e:
+        await crud.get_multi_cursor_paginated_ordered(
+            params=CursorParams(cursor="not-a-cursor")
+        )
+    assert e.value.status_code == 400
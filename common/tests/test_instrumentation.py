@@ -0,0 +1,133 @@
+import logging
+import re
+import time
+
+import pytest
+from fastapi import FastAPI
+from httpx import ASGITransport, AsyncClient
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlmodel import SQLModel
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from apps.example.models import SomeModel
+from common.repository.base import CRUDBase
+from common.utils.instrumentation import (
+    Histogram,
+    InstrumentationMiddleware,
+    QueryMonitor,
+    metrics,
+    parameters_shape,
+    statement_shape,
+)
+from config.settings import ModeEnum, Settings
+
+BASE_URL = "/api/example/v1"
+
+
+def test_histogram_renders_cumulative_buckets():
+    histogram = Histogram("latency_seconds", "Latency", (0.1, 1.0), ("route",))
+    for value in (0.05, 0.1, 0.5, 3.0):
+        histogram.observe(value, route='/a"b')
+
+    assert list(histogram.render()) == [
+        "# HELP latency_seconds Latency",
+        "# TYPE latency_seconds histogram",
+        'latency_seconds_bucket{route="/a\\"b",le="0.1"} 2',
+        'latency_seconds_bucket{route="/a\\"b",le="1.0"} 3',
+        'latency_seconds_bucket{route="/a\\"b",le="+Inf"} 4',
+        'latency_seconds_sum{route="/a\\"b"} 3.65',
+        'latency_seconds_count{route="/a\\"b"} 4',
+    ]
+
+
+@pytest.mark.asyncio
+async def test_requests_are_timed(client):
+    response = await client.post(
+        f"{BASE_URL}/models", json=[{"name": f"model {i}"} for i in range(3)]
+    )
+    response = await client.get(f"{BASE_URL}/models")
+    assert response.status_code == 200
+
+    timing = response.headers["Server-Timing"]
+    assert re.fullmatch(
+        r'app;dur=[\d.]+, db;dur=[\d.]+;desc="(\d+) queries", pool;dur=[\d.]+', timing
+    )
+    # the page and its count
+    assert int(re.search(r'"(\d+) queries"', timing).group(1)) >= 2
+
+    response = await client.get("/metrics")
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain")
+    body = response.text
+    labels = f'method="GET",route="{BASE_URL}/models"'
+    assert f'http_requests_total{{{labels},status="200"}}' in body
+    assert f"db_statements_per_request_count{{{labels}}}" in body
+    assert "db_pool_checkout_wait_seconds_count" in body
+    assert "cache_l1_hits" in body
+    assert metrics.requests.values[("GET", f"{BASE_URL}/models", "200")] >= 1
+
+
+@pytest.mark.asyncio
+async def test_server_timing_and_metrics_are_opt_in(monkeypatch):
+    for name in ("METRICS_ENABLED", "SERVER_TIMING_ENABLED", "DEBUG"):
+        monkeypatch.delenv(name, raising=False)
+    settings = Settings(MODE=ModeEnum.testing, _env_file=None)
+    assert not (settings.METRICS_ENABLED or settings.server_timing)
+    assert Settings(MODE=ModeEnum.testing, DEBUG=True, _env_file=None).server_timing
+
+    route = "/test/opt-in"
+    app = FastAPI()
+
+    @app.get(route, status_code=204)
+    async def view():
+        pass
+
+    middleware = InstrumentationMiddleware(app)
+    async with AsyncClient(
+        transport=ASGITransport(app=middleware), base_url="http://test"
+    ) as client:
+        response = await client.get(route)
+
+    assert "Server-Timing" not in response.headers
+    assert metrics.requests.values[("GET", route, "204")] >= 1
+
+
+def test_statement_shape_ignores_parameter_list_sizes():
+    assert statement_shape("SELECT a\n  FROM t WHERE id IN (?, ?, ?)") == (
+        "SELECT a FROM t WHERE id IN (...)"
+    )
+    assert statement_shape(
+        "INSERT INTO t (a, b) VALUES ($1::VARCHAR, $2::TIMESTAMP WITHOUT TIME ZONE, 0), "
+        "($3::VARCHAR, $4::TIMESTAMP WITHOUT TIME ZONE, 1)"
+    ) == statement_shape("INSERT INTO t (a, b) VALUES (%(a)s, %(b)s, 0)")
+    assert (
+        parameters_shape([(1, 2), (3, 4)], executemany=True) == "2 rows of 2 parameters"
+    )
+    assert parameters_shape({"name": "secret"}, executemany=False) == "1 parameters"
+
+
+def test_statement_shape_is_linear_on_unbalanced_parentheses():
+    start = time.perf_counter()
+    assert statement_shape("SELECT (" + "1" * 24 + " + x)") == (
+        "SELECT (" + "1" * 24 + " + x)"
+    )
+    assert time.perf_counter() - start < 0.1
+
+
+@pytest.mark.asyncio
+async def test_slow_queries_are_logged_with_their_origin(tmp_path, caplog):
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path}/slow.db")
+    QueryMonitor(slow_query_threshold=1e-9).listen(engine.sync_engine)
+    async with engine.begin() as conn:
+        await conn.run_sync(SQLModel.metadata.create_all)
+
+    with caplog.at_level(logging.WARNING, logger="common.utils.instrumentation"):
+        async with AsyncSession(engine) as session:
+            await CRUDBase(SomeModel, session).get_multi(limit=5)
+    await engine.dispose()
+
+    message = next(r.getMessage() for r in caplog.records if "CRUDBase" in r.getMessage())
+    assert re.match(
+        r"Slow query, [\d.]+ ms in CRUDBase\.get_multi: SELECT .* \[2 parameters\]",
+        message,
+    )
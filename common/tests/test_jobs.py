@@ -0,0 +1,192 @@
+import argparse
+import asyncio
+import json
+import signal
+
+import pytest
+from fastapi import HTTPException
+from redis.exceptions import RedisError
+
+from common.repository.cache import INVALIDATION_CHANNEL, local_cache
+from common.schemas.enums import JobStatusEnum
+from common.utils.jobs import JobQueue, Worker, job
+from config.settings import get_settings
+from scripts import worker as worker_script
+
+settings = get_settings()
+
+FINAL = (JobStatusEnum.succeeded, JobStatusEnum.failed)
+
+running = 0
+max_running = 0
+calls: dict[str, int] = {}
+
+
+@job("test.add")
+async def add(a: int, b: int) -> int:
+    global running, max_running
+    running += 1
+    max_running = max(max_running, running)
+    await asyncio.sleep(0.02)
+    running -= 1
+    return a + b
+
+
+@job("test.flaky")
+async def flaky(key: str, failures: int) -> str:
+    calls[key] = calls.get(key, 0) + 1
+    if calls[key] <= failures:
+        raise ConnectionError(f"failure {calls[key]}")
+    return "done"
+
+
+@job("test.conflict")
+async def conflict() -> None:
+    raise HTTPException(status_code=409, detail="Resource already exists")
+
+
+@job("test.slow")
+async def slow(key: str, seconds: float) -> int:
+    calls[key] = calls.get(key, 0) + 1
+    await asyncio.sleep(seconds)
+    return calls[key]
+
+
+def make_queue(redis_client, **kwargs) -> JobQueue:
+    options = {"retry_delay": 0.01, "claim_timeout": 60.0, **kwargs}
+    return JobQueue(redis_client, prefix=f"{settings.APP_NAME}:test-jobs", **options)
+
+
+async def run_until_done(queue: JobQueue, job_ids: list[str], **worker_options):
+    stop = asyncio.Event()
+    worker = Worker(queue, block=0.01, **worker_options)
+    task = asyncio.create_task(worker.run(stop))
+    for _ in range(300):
+        jobs = [await queue.get(job_id) for job_id in job_ids]
+        if all(job.status in FINAL for job in jobs):
+            break
+        await asyncio.sleep(0.01)
+    stop.set()
+    await task
+    return jobs
+
+
+@pytest.mark.asyncio
+async def test_jobs_run_with_a_concurrency_limit(redis_client):
+    queue = make_queue(redis_client)
+    queued = [await queue.enqueue("test.add", a=i, b=1) for i in range(6)]
+    assert {job.status for job in queued} == {JobStatusEnum.queued}
+
+    jobs = await run_until_done(queue, [job.id for job in queued], concurrency=2)
+
+    assert [job.result for job in jobs] == [1, 2, 3, 4, 5, 6]
+    assert {(job.status, job.attempts) for job in jobs} == {(JobStatusEnum.succeeded, 1)}
+    assert max_running == 2
+    assert await redis_client.xlen(queue.stream) == 0
+
+
+@pytest.mark.asyncio
+async def test_failed_jobs_are_retried_then_failed(redis_client):
+    queue = make_queue(redis_client, max_attempts=3)
+    recovers = await queue.enqueue("test.flaky", key="recovers", failures=2)
+    fails = await queue.enqueue("test.flaky", key="fails", failures=5)
+    unknown = await queue.enqueue("test.missing")
+    conflicts = await queue.enqueue("test.conflict")
+
+    recovers, fails, unknown, conflicts = await run_until_done(
+        queue, [recovers.id, fails.id, unknown.id, conflicts.id]
+    )
+
+    assert (recovers.status, recovers.attempts, recovers.error) == (
+        JobStatusEnum.succeeded,
+        3,
+        None,
+    )
+    assert (fails.status, fails.attempts) == (JobStatusEnum.failed, 3)
+    assert fails.error == "ConnectionError: failure 3"
+    assert unknown.status == JobStatusEnum.failed
+    assert unknown.error == "Unknown job test.missing"
+    # deterministic errors are not retried
+    assert (conflicts.status, conflicts.attempts) == (JobStatusEnum.failed, 1)
+    assert conflicts.error.startswith("HTTPException: 409")
+
+
+@pytest.mark.asyncio
+async def test_jobs_of_crashed_workers_are_claimed(redis_client):
+    queue = make_queue(redis_client, claim_timeout=0.05)
+    await queue.ensure_group()
+    queued = await queue.enqueue("test.add", a=1, b=2)
+    # read, then the worker dies without acknowledging it
+    assert len(await queue.read("crashed", count=1, block=0.01)) == 1
+    await asyncio.sleep(0.06)
+
+    (job,) = await run_until_done(queue, [queued.id])
+
+    assert (job.status, job.result) == (JobStatusEnum.succeeded, 3)
+
+
+@pytest.mark.asyncio
+async def test_running_jobs_are_not_claimed_by_other_workers(redis_client):
+    queue = make_queue(redis_client, claim_timeout=0.06)
+    queued = await queue.enqueue("test.slow", key="slow", seconds=0.3)
+    stop = asyncio.Event()
+    other = asyncio.create_task(Worker(queue, consumer="other", block=0.01).run(stop))
+
+    (job,) = await run_until_done(queue, [queued.id], consumer="first")
+    stop.set()
+    await other
+
+    assert (job.status, job.attempts, job.result) == (JobStatusEnum.succeeded, 1, 1)
+
+
+@pytest.mark.asyncio
+async def test_redis_errors_of_a_job_are_logged(redis_client, monkeypatch, caplog):
+    queue = make_queue(redis_client)
+
+    async def start(job_id):
+        raise RedisError("Connection refused")
+
+    monkeypatch.setattr(queue, "start", start)
+
+    await Worker(queue).handle("0-1", {"id": "job", "name": "test.add"})
+
+    assert "Redis unavailable, job job not updated" in caplog.text
+
+
+@pytest.mark.asyncio
+async def test_worker_script_evicts_invalidated_keys(redis_client, monkeypatch):
+    key = f"{settings.APP_NAME}:test-worker:item"
+    evicted = []
+
+    class FakeWorker:
+        def __init__(self, queue, concurrency):
+            pass
+
+        async def run(self, stop):
+            await asyncio.sleep(0.1)  # the listener clears the cache once subscribed
+            local_cache.set(key, {"id": 1}, size=1)
+            await redis_client.publish(INVALIDATION_CHANNEL, json.dumps([key]))
+            for _ in range(50):
+                if local_cache.get(key) is None:
+                    break
+                await asyncio.sleep(0.01)
+            evicted.append(local_cache.get(key) is None)
+
+    class FakeDatabase:
+        async def dispose(self):
+            pass
+
+    async def shutdown_redis():
+        pass
+
+    monkeypatch.setattr(worker_script.settings, "CACHE_L1_ENABLED", True)
+    monkeypatch.setattr(worker_script, "Worker", FakeWorker)
+    monkeypatch.setattr(worker_script, "db", FakeDatabase())
+    monkeypatch.setattr(worker_script, "shutdown_redis", shutdown_redis)
+    try:
+        await worker_script.run(argparse.Namespace(concurrency=1))
+    finally:
+        for signum in (signal.SIGINT, signal.SIGTERM):
+            asyncio.get_running_loop().remove_signal_handler(signum)
+
+    assert evicted == [True]
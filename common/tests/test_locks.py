@@ -0,0 +1,52 @@
+import asyncio
+
+import pytest
+
+from common.utils.locks import RedisLock
+from config.settings import get_settings
+
+settings = get_settings()
+
+KEY = f"{settings.APP_NAME}:test-lock"
+
+
+def make_lock(redis_client, timeout: float = 1.0) -> RedisLock:
+    return RedisLock(redis_client, KEY, timeout=timeout, poll_interval=0.01)
+
+
+@pytest.mark.asyncio
+async def test_only_the_holder_releases_the_lock(redis_client):
+    first, second = make_lock(redis_client, timeout=0.05), make_lock(redis_client)
+    assert await first.acquire()
+    assert not await second.acquire()
+
+    # expired, then taken by another worker: the late release must keep it
+    await asyncio.sleep(0.06)
+    assert await second.acquire()
+    await first.release()
+    assert await second.holder() == second.token
+
+    await second.release()
+    assert await second.holder() is None
+
+
+@pytest.mark.asyncio
+async def test_waiters_get_the_value_of_the_holder(redis_client):
+    holder, waiter = make_lock(redis_client), make_lock(redis_client)
+    await holder.acquire()
+
+    async def release_after(value: str | None):
+        await asyncio.sleep(0.03)
+        if value is not None:
+            await redis_client.set(f"{KEY}:value", value)
+        await holder.release()
+
+    task = asyncio.create_task(release_after("loaded"))
+    assert await waiter.wait(f"{KEY}:value") == "loaded"
+    await task
+
+    # released without a value
+    await holder.acquire()
+    task = asyncio.create_task(release_after(None))
+    assert await waiter.wait(f"{KEY}:missing") is None
+    await task
@@ -1,9 +1,17 @@
 # test_crudbase.py
+from datetime import datetime
+
 import pytest
+from fastapi import HTTPException
+from fastapi_pagination import Params
 
 from apps.example.models import SomeModel
-from apps.example.schemas import SomeModelCreate, SomeModelUpdate
+from apps.example.repositories import SomeModelRepo
+from apps.example.schemas import SomeModelCreate, SomeModelRead, SomeModelUpdate
 from common.repository.base import CRUDBase
+from common.schemas.enums import CountModeEnum, OrderEnum
+from common.schemas.pagination import CursorParams
+from common.utils.instrumentation import NPlusOneError, query_budget
 
 
 @pytest.mark.asyncio
@@ -39,6 +47,210 @@ async def test_update_some_model(db_session):
     assert updated.name == "Updated Name"
 
 
+@pytest.mark.asyncio
+async def test_update_by_id_some_model(db_session):
+    crud = CRUDBase(SomeModel, db_session)
+    model = await crud.create(obj_in=SomeModelCreate(name="Initial"))
+
+    updated = await crud.update_by_id(
+        id=model.id, obj_new=SomeModelUpdate(id=model.id, name="Updated Name")
+    )
+    assert updated.id == model.id
+    assert updated.name == "Updated Name"
+    assert updated.created_at == model.created_at
+    assert updated.updated_at > model.created_at
+
+    with pytest.raises(HTTPException) as error:
+        await crud.update_by_id(id=model.id + 1, obj_new={"name": "Missing"})
+    assert error.value.status_code == 404
+
+
+@pytest.mark.asyncio
+async def test_update_many_some_models(db_session):
+    crud = CRUDBase(SomeModel, db_session)
+    models = await crud.bulk_create(
+        objs_in=[SomeModelCreate(name=f"Model {i}") for i in range(3)]
+    )
+    ids = [model.id for model in models]
+
+    updated = await crud.update_many(
+        objs_new=[
+            SomeModelUpdate(id=ids[0], name="First"),
+            {"id": ids[2], "name": "Third"},
+        ],
+        chunk_size=1,
+    )
+    assert sorted(obj.name for obj in updated) == ["First", "Third"]
+
+    names = [obj.name for obj in await crud.get_multi()]
+    assert names == ["First", "Model 1", "Third"]
+
+    # nothing is written when a row is missing
+    with pytest.raises(HTTPException) as error:
+        await crud.update_many(
+            objs_new=[
+                {"id": ids[1], "name": "Second"},
+                {"id": ids[2] + 1, "name": "Missing"},
+            ]
+        )
+    assert error.value.status_code == 404
+    assert (await crud.get(id=ids[1])).name == "Model 1"
+
+
+@pytest.mark.asyncio
+async def test_bulk_upsert_some_models(db_session):
+    crud = CRUDBase(SomeModel, db_session)
+    existing = await crud.create(obj_in=SomeModelCreate(name="Existing"))
+    created_at = existing.created_at
+    new_id = existing.id + 1000
+
+    rows = [
+        SomeModel(id=existing.id, name="Replayed"),
+        SomeModel(id=new_id, name="New"),
+    ]
+    upserted = await crud.bulk_upsert(objs_in=rows)
+    assert sorted((obj.id, obj.name) for obj in upserted) == [
+        (existing.id, "Replayed"),
+        (new_id, "New"),
+    ]
+    assert (await crud.get(id=existing.id)).created_at == created_at
+
+    # replaying is idempotent
+    await crud.bulk_upsert(objs_in=rows)
+    assert await crud.get_count() == 2
+
+    # DO NOTHING skips the conflicting row
+    skipped = await crud.upsert(
+        obj_in=SomeModel(id=existing.id, name="Ignored"), update_columns=[]
+    )
+    assert skipped is None
+    assert (await crud.get(id=existing.id)).name == "Replayed"
+
+
+@pytest.mark.asyncio
+async def test_iter_batches_some_models(db_session):
+    crud = CRUDBase(SomeModel, db_session)
+    await crud.bulk_create(objs_in=[SomeModelCreate(name=f"Model {i}") for i in range(5)])
+
+    batches = [batch async for batch in crud.iter_batches(batch_size=2)]
+    assert [len(batch) for batch in batches] == [2, 2, 1]
+
+    names = [obj.name async for obj in crud.iter_all(batch_size=2)]
+    assert names == [f"Model {i}" for i in range(5)]
+
+
+@pytest.mark.asyncio
+async def test_copy_from_some_models(db_session):
+    crud = CRUDBase(SomeModel, db_session)
+
+    async def records():
+        for i in range(3):
+            yield SomeModelCreate(name=f"Model {i}")
+
+    assert await crud.copy_from(records=records(), chunk_size=2) == 3
+
+    now = datetime.now()
+    written = await crud.copy_from(
+        records=[("Tuple", now, now)], columns=["name", "created_at", "updated_at"]
+    )
+    assert written == 1
+    assert await crud.get_count() == 4
+
+    # staging table merged with ON CONFLICT (id) DO UPDATE
+    first = (await crud.get_multi())[0]
+    written = await crud.copy_from(
+        records=[
+            SomeModel(id=first.id, name="Merged"),
+            SomeModel(id=first.id + 1000, name="New"),
+        ],
+        columns=["id", "name", "created_at", "updated_at"],
+        merge=True,
+    )
+    assert written == 2
+    db_session.expunge_all()  # loaded rows are not refreshed by a Core write
+    names = [obj.name for obj in await crud.get_multi()]
+    assert names == ["Merged", "Model 1", "Model 2", "Tuple", "New"]
+
+
+@pytest.mark.asyncio
+async def test_reads_projected_on_a_schema(db_session):
+    crud = CRUDBase(SomeModel, db_session)
+    models = await crud.bulk_create(
+        objs_in=[SomeModelCreate(name=f"Model {i}") for i in range(3)]
+    )
+    db_session.expunge_all()
+
+    found = await crud.get(id=models[0].id, schema=SomeModelRead)
+    assert found == SomeModelRead(id=models[0].id, name="Model 0")
+    assert await crud.get(id=models[-1].id + 1, schema=SomeModelRead) is None
+
+    items = await crud.get_multi(schema=SomeModelRead)
+    assert [type(item) for item in items] == [SomeModelRead] * 3
+    # no ORM object was loaded
+    assert len(db_session.identity_map) == 0
+
+    page = await crud.get_multi_paginated_ordered(
+        params=Params(page=1, size=2), order=OrderEnum.desc, schema=SomeModelRead
+    )
+    assert [item.name for item in page.items] == ["Model 2", "Model 1"]
+    assert page.total == 3
+
+    # the cursor column is selected even though the schema does not have it
+    page = await crud.get_multi_cursor_paginated_ordered(
+        params=CursorParams(size=2), order_by="created_at", schema=SomeModelRead
+    )
+    assert [item.name for item in page.items] == ["Model 0", "Model 1"]
+    page = await crud.get_multi_cursor_paginated_ordered(
+        params=CursorParams(cursor=page.next_cursor, size=2),
+        order_by="created_at",
+        schema=SomeModelRead,
+    )
+    assert [item.name for item in page.items] == ["Model 2"]
+
+    batches = [batch async for batch in crud.iter_batches(schema=SomeModelRead)]
+    assert [item.name for item in batches[0]] == ["Model 0", "Model 1", "Model 2"]
+
+
+@pytest.mark.asyncio
+async def test_search_some_models_by_name(db_session):
+    repo = SomeModelRepo(db_session)
+    models = await repo.bulk_create(
+        objs_in=[
+            SomeModelCreate(name=name)
+            for name in ["Red apple", "Apple pie", "Apple apple", "Banana"]
+        ]
+    )
+
+    page = await repo.search_some_models_by_name(query="APPLE", schema=SomeModelRead)
+    # the name with the most matches ranks first
+    assert page.items[0].name == "Apple apple"
+    assert {item.name for item in page.items} == {"Red apple", "Apple pie", "Apple apple"}
+    assert page.total == 3
+
+    # every word must match, as the start of a word
+    page = await repo.search_some_models_by_name(query="app pi")
+    assert [item.name for item in page.items] == ["Apple pie"]
+    page = await repo.search_some_models_by_name(query="pple")
+    assert page.items == [] and page.total == 0
+    page = await repo.search_some_models_by_name(query="' & !")
+    assert page.items == [] and page.total == 0
+
+    page = await repo.search_some_models_by_name(
+        query="apple", params=Params(page=2, size=2), schema=SomeModelRead
+    )
+    assert len(page.items) == 1 and page.total == 3
+
+    # the index follows updates and deletes
+    await repo.update_by_id(
+        id=models[3].id, obj_new=SomeModelUpdate(id=models[3].id, name="Pineapple")
+    )
+    await repo.remove(id=models[0].id)
+    page = await repo.search_some_models_by_name(query="pineapple red")
+    assert page.items == []
+    page = await repo.search_some_models_by_name(query="pineapple")
+    assert [item.id for item in page.items] == [models[3].id]
+
+
 @pytest.mark.asyncio
 async def test_remove_some_model(db_session):
     crud = CRUDBase(SomeModel, db_session)
@@ -56,6 +268,30 @@ async def test_remove_some_model(db_session):
     assert result is None
 
 
+@pytest.mark.asyncio
+async def test_remove_many_and_remove_where_some_models(db_session):
+    crud = CRUDBase(SomeModel, db_session)
+    models = await crud.bulk_create(
+        objs_in=[SomeModelCreate(name=f"Model {i}") for i in range(5)]
+    )
+    ids = [model.id for model in models]
+
+    deleted = await crud.remove_many(ids=[ids[0], ids[1], ids[4] + 1], chunk_size=2)
+    assert sorted(deleted) == ids[:2]
+
+    deleted = await crud.remove_where(SomeModel.name.in_(["Model 2", "Model 3"]))
+    assert sorted(deleted) == ids[2:4]
+
+    assert [obj.id for obj in await crud.get_multi()] == [ids[4]]
+
+    with pytest.raises(ValueError):
+        await crud.remove_where()
+
+    with pytest.raises(HTTPException) as error:
+        await crud.remove(id=ids[0])
+    assert error.value.status_code == 404
+
+
 @pytest.mark.asyncio
 async def test_bulk_create_some_model(db_session):
     crud = CRUDBase(SomeModel, db_session)
@@ -79,6 +315,66 @@ async def test_bulk_create_some_model(db_session):
         assert found.name == f"Test Model {i+1}"
 
 
+@pytest.mark.asyncio
+async def test_bulk_create_query_budget(db_session):
+    crud = CRUDBase(SomeModel, db_session)
+    payload = [SomeModelCreate(name=f"Model {i}") for i in range(100)]
+
+    with query_budget(3):
+        created_objs = await crud.bulk_create(objs_in=payload)
+
+    assert [obj.name for obj in created_objs] == [obj.name for obj in payload]
+    assert len({obj.id for obj in created_objs}) == 100
+
+
+@pytest.mark.asyncio
+async def test_n_plus_one_raises_in_testing_mode(db_session):
+    crud = CRUDBase(SomeModel, db_session)
+    models = await crud.bulk_create(
+        objs_in=[SomeModelCreate(name=f"Model {i}") for i in range(30)]
+    )
+
+    with pytest.raises(NPlusOneError, match=r"21 times .* from CRUDBase\.get"):
+        with query_budget():
+            for model in models:
+                await crud.get(id=model.id)
+
+
+@pytest.mark.asyncio
+async def test_chunked_bulk_writes_are_not_n_plus_one(db_session):
+    crud = CRUDBase(SomeModel, db_session)
+    objs_in = [SomeModelCreate(name=f"Model {i}") for i in range(30)]
+
+    with query_budget() as timings:
+        await crud.bulk_insert(objs_in=objs_in, chunk_size=1)
+        await crud.bulk_create(objs_in=objs_in, chunk_size=1)
+
+    assert timings.statements == 60
+    assert await crud.get_count() == 60
+
+
+@pytest.mark.asyncio
+async def test_chunked_update_and_remove_many_are_not_n_plus_one(db_session):
+    crud = CRUDBase(SomeModel, db_session)
+    models = await crud.bulk_create(
+        objs_in=[SomeModelCreate(name=f"Model {i}") for i in range(50)]
+    )
+    ids = [model.id for model in models]
+
+    with query_budget() as timings:
+        updated = await crud.update_many(
+            objs_new=[{"id": id, "name": f"Updated {id}"} for id in ids], chunk_size=2
+        )
+    assert timings.statements == 25
+    assert {model.name for model in updated} == {f"Updated {id}" for id in ids}
+
+    with query_budget() as timings:
+        deleted = await crud.remove_many(ids=ids, chunk_size=2)
+    assert timings.statements == 25
+    assert sorted(deleted) == ids
+    assert await crud.get_count() == 0
+
+
 @pytest.mark.asyncio
 async def test_get_some_models(db_session):
     crud = CRUDBase(SomeModel, db_session)
@@ -98,3 +394,79 @@ async def test_get_some_models(db_session):
 
     for i, obj in enumerate(objs, 1):
         assert obj.name == f"Test Model {i}"
+
+
+@pytest.mark.asyncio
+async def test_bulk_create_some_model_in_chunks(db_session):
+    crud = CRUDBase(SomeModel, db_session)
+
+    payload = [SomeModelCreate(name=f"Test Model {i}") for i in range(1, 6)]
+    created_objs = await crud.bulk_create(objs_in=payload, chunk_size=2)
+
+    # rows come back populated and in the same order as the payload
+    assert [obj.name for obj in created_objs] == [obj.name for obj in payload]
+    assert len({obj.id for obj in created_objs}) == 5
+    assert all(obj.created_at is not None for obj in created_objs)
+    assert await crud.get_count() == 5
+
+
+@pytest.mark.asyncio
+async def test_bulk_insert_some_model(db_session):
+    crud = CRUDBase(SomeModel, db_session)
+
+    payload = [SomeModelCreate(name=f"Test Model {i}") for i in range(1, 4)]
+    inserted = await crud.bulk_insert(objs_in=payload, chunk_size=2)
+
+    assert inserted == 3
+    assert await crud.bulk_insert(objs_in=[]) == 0
+
+    objs = await crud.get_multi()
+    assert [obj.name for obj in objs] == [obj.name for obj in payload]
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize(
+    "count_mode", [CountModeEnum.exact, CountModeEnum.estimated, CountModeEnum.none]
+)
+async def test_get_some_models_paginated_count_modes(db_session, count_mode):
+    crud = CRUDBase(SomeModel, db_session)
+    await crud.bulk_create(
+        objs_in=[SomeModelCreate(name=f"Test Model {i}") for i in range(1, 6)]
+    )
+
+    first = await crud.get_multi_paginated_ordered(
+        params=Params(page=1, size=2), count_mode=count_mode
+    )
+    last = await crud.get_multi_paginated_ordered(
+        params=Params(page=3, size=2), count_mode=count_mode
+    )
+
+    assert [obj.name for obj in first.items] == ["Test Model 1", "Test Model 2"]
+    assert [obj.name for obj in last.items] == ["Test Model 5"]
+    assert first.has_next is True
+    if count_mode == CountModeEnum.none:
+        assert first.total is None
+        assert last.has_next is False
+    elif count_mode == CountModeEnum.exact:
+        assert first.total == 5
+        assert first.pages == 3
+        assert last.has_next is False
+
+
+@pytest.mark.asyncio
+async def test_get_some_models_paginated_cached_count(db_session, redis_client):
+    crud = CRUDBase(SomeModel, db_session, redis_client=redis_client)
+    await crud.bulk_create(objs_in=[SomeModelCreate(name="Test Model 1")])
+
+    page = await crud.get_multi_paginated(count_mode=CountModeEnum.cached)
+    assert page.total == 1
+
+    # the cached total is served until it expires
+    await crud.create(obj_in=SomeModelCreate(name="Test Model 2"))
+    page = await crud.get_multi_paginated(count_mode=CountModeEnum.cached)
+    assert page.total == 2  # never below what was fetched
+    page = await crud.get_multi_paginated(
+        params=Params(page=1, size=1), count_mode=CountModeEnum.cached
+    )
+    assert page.total == 1
+    assert page.has_next is False
@@ -0,0 +1,36 @@
+import json
+
+from fastapi.responses import JSONResponse, ORJSONResponse
+
+from apps.example.schemas import SomeModelRead
+from common.schemas.pagination import Page
+from common.schemas.response import StandardResponse
+from common.utils import responses
+from common.utils.responses import TrustedJSONResponse, default_response_class
+from config.settings import Settings
+
+
+def test_default_response_class():
+    assert default_response_class(Settings(FAST_JSON_RESPONSES=False)) is JSONResponse
+
+    expected = ORJSONResponse if responses.orjson is not None else JSONResponse
+    assert default_response_class(Settings(FAST_JSON_RESPONSES=True)) is expected
+
+
+def test_trusted_json_response_renders_the_declared_type():
+    items = [SomeModelRead(id=i, name=f"model {i}") for i in range(2)]
+    content = StandardResponse[Page[SomeModelRead]](
+        data=Page[SomeModelRead](items=items, total=2, page=1, size=50, pages=1)
+    )
+
+    response = TrustedJSONResponse(content, status_code=201)
+    assert response.status_code == 201
+    assert response.media_type == "application/json"
+    assert json.loads(response.body) == content.model_dump(mode="json")
+
+    # content that is not a model needs its `response_type`
+    response = TrustedJSONResponse(items, response_type=list[SomeModelRead])
+    assert json.loads(response.body) == [
+        {"id": 0, "name": "model 0"},
+        {"id": 1, "name": "model 1"},
+    ]
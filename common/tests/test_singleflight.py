@@ -0,0 +1,146 @@
+import asyncio
+
+import pytest
+from fastapi_pagination import Params
+
+from apps.example.models import SomeModel
+from apps.example.schemas import SomeModelCreate, SomeModelRead
+from common.repository.base import CRUDBase
+from common.utils.instrumentation import metrics, query_budget
+from common.utils.singleflight import RedisSingleFlight, SingleFlight
+from config.db import db
+
+
+def outcomes(name: str) -> dict[str, float]:
+    return {
+        outcome: value
+        for (flight, outcome), value in metrics.single_flight.values.items()
+        if flight == name
+    }
+
+
+@pytest.mark.asyncio
+async def test_concurrent_calls_share_one_result():
+    flight = SingleFlight("test_share")
+    calls = 0
+
+    async def load():
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.02)
+        return ["value"]
+
+    results = await asyncio.gather(*(flight.do("key", load) for _ in range(10)))
+
+    assert calls == 1
+    assert all(result is results[0] for result in results)
+    assert outcomes("test_share") == {"leader": 1, "coalesced": 9}
+    assert len(flight) == 0
+
+    # once finished, the next call runs again
+    await flight.do("key", load)
+    assert calls == 2
+
+
+@pytest.mark.asyncio
+async def test_errors_are_shared_and_cancelled_leaders_replaced():
+    flight = SingleFlight("test_errors")
+
+    async def fail():
+        await asyncio.sleep(0.02)
+        raise ValueError("boom")
+
+    results = await asyncio.gather(
+        *(flight.do("key", fail) for _ in range(3)), return_exceptions=True
+    )
+    assert [type(result) for result in results] == [ValueError] * 3
+
+    async def slow():
+        await asyncio.sleep(0.05)
+        return "value"
+
+    leader = asyncio.create_task(flight.do("key", slow))
+    await asyncio.sleep(0)
+    follower = asyncio.create_task(flight.do("key", slow))
+    await asyncio.sleep(0.01)
+    leader.cancel()
+
+    assert await follower == "value"
+    assert leader.cancelled()
+
+
+@pytest.mark.asyncio
+async def test_redis_single_flight_coalesces_across_workers(redis_client):
+    # two processes, each with its own in-process state
+    workers = [
+        RedisSingleFlight("test_redis", redis_client=redis_client, poll_interval=0.01)
+        for _ in range(2)
+    ]
+    calls = 0
+
+    async def load():
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.05)
+        return {"value": 1}
+
+    results = await asyncio.gather(
+        *(
+            worker.do("key", load, dumps=dict, loads=dict)
+            for worker in workers
+            for _ in range(3)
+        )
+    )
+
+    assert calls == 1
+    assert results == [{"value": 1}] * 6
+    assert outcomes("test_redis") == {"leader": 2, "coalesced": 4, "coalesced_redis": 1}
+
+
+@pytest.mark.asyncio
+async def test_redis_followers_get_the_result_of_the_current_leader(redis_client):
+    workers = [
+        RedisSingleFlight("test_stale", redis_client=redis_client, poll_interval=0.01)
+        for _ in range(2)
+    ]
+    version = 0
+
+    async def load():
+        nonlocal version
+        version += 1
+        loaded = version
+        await asyncio.sleep(0.05)
+        return {"v": loaded}
+
+    assert await workers[0].do("key", load, dumps=dict, loads=dict) == {"v": 1}
+    leader = asyncio.create_task(workers[0].do("key", load, dumps=dict, loads=dict))
+    await asyncio.sleep(0.01)
+    follower = await workers[1].do("key", load, dumps=dict, loads=dict)
+
+    assert await leader == {"v": 2}
+    assert follower == {"v": 2}
+
+
+class CoalescedCRUD(CRUDBase):
+    single_flight = ("get_multi_paginated_ordered",)
+
+
+@pytest.mark.asyncio
+async def test_repository_pages_are_coalesced(db_session):
+    await CRUDBase(SomeModel, db_session).bulk_create(
+        objs_in=[SomeModelCreate(name=f"model {i}") for i in range(3)]
+    )
+
+    async def read():
+        async with db.session_factory() as session:
+            return await CoalescedCRUD(SomeModel, session).get_multi_paginated_ordered(
+                params=Params(page=1, size=2), schema=SomeModelRead
+            )
+
+    with query_budget() as timings:
+        pages = await asyncio.gather(*(read() for _ in range(5)))
+
+    # one page query and one COUNT for all five readers
+    assert timings.statements == 2
+    assert {page.total for page in pages} == {3}
+    assert [item.name for item in pages[0].items] == ["model 0", "model 1"]
@@ -0,0 +1,61 @@
+import pytest
+from fastapi import HTTPException
+from pydantic import BaseModel, Field
+
+from common.utils.streaming import ingest, iter_csv, iter_ndjson
+
+
+class Row(BaseModel):
+    name: str = Field(min_length=1)
+
+
+async def aiter(items):
+    for item in items:
+        yield item
+
+
+async def collect(rows):
+    return [row async for row in rows]
+
+
+@pytest.mark.asyncio
+async def test_long_lines_answer_413():
+    # no newline at all, the pending line must not grow past the limit
+    with pytest.raises(HTTPException) as error:
+        await collect(iter_ndjson(aiter([b"x" * 8] * 4), max_line_bytes=16))
+    assert error.value.status_code == 413
+    assert error.value.detail == "Line 1 is longer than 16 bytes"
+
+    body = [b'{"name": "a"}\n', b"y" * 20 + b"\n"]
+    with pytest.raises(HTTPException, match="Line 2"):
+        await collect(iter_ndjson(aiter(body), max_line_bytes=16))
+
+    # an unterminated quote keeps the record open
+    body = [b'name\n"open\n', b"more\n" * 5]
+    with pytest.raises(HTTPException, match="Line 2"):
+        await collect(iter_csv(aiter(body), max_line_bytes=16))
+
+    rows = await collect(iter_ndjson(aiter([b'{"name": "a"}\n']), max_line_bytes=16))
+    assert rows == [(1, b'{"name": "a"}')]
+
+
+@pytest.mark.asyncio
+async def test_ingest_report_keeps_a_bounded_number_of_errors():
+    rows = [(line, {"name": "" if line % 2 else "ok"}) for line in range(1, 41)]
+
+    async def write(objs):
+        return len(objs)
+
+    report = await ingest(
+        aiter(rows),
+        schema=Row,
+        write=write,
+        batch_size=10,
+        max_row_errors=2,
+        max_error_batches=3,
+    )
+
+    assert (report.inserted, report.failed, report.batches) == (20, 20, 4)
+    assert [len(error.rows) for error in report.errors] == [2, 2, 2]
+    assert [error.omitted_rows for error in report.errors] == [3, 3, 3]
+    assert report.omitted_batches == 1
@@ -0,0 +1,12 @@
+from functools import lru_cache
+from typing import Any
+
+from pydantic import TypeAdapter
+
+
+@lru_cache(maxsize=256)
+def type_adapter(type_: Any) -> TypeAdapter:
+    """
+    Shared `TypeAdapter` of `type_`, building one compiles its whole schema
+    """
+    return TypeAdapter(type_)
@@ -0,0 +1,96 @@
+"""
+Conditional GET: validators built from `TimestampMixin.updated_at` and the
+`304 Not Modified` shortcut taken before a response is loaded or serialized
+"""
+
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import Optional, Sequence
+
+from fastapi import Request, Response, status
+from pydantic import BaseModel
+
+
+class Validator(BaseModel):
+    """
+    State of a row, or of a whole table when `count` is set: a page changes
+    when a row is written (`max(updated_at)`) or deleted (`count`)
+    """
+
+    last_modified: Optional[datetime] = None
+    count: Optional[int] = None
+
+    @property
+    def etag(self) -> str:
+        stamp = (
+            int(self.last_modified.timestamp() * 1_000_000) if self.last_modified else 0
+        )
+        version = f"{stamp:x}" if self.count is None else f"{self.count:x}-{stamp:x}"
+        # weak: equal JSON, not necessarily byte for byte
+        return f'W/"{version}"'
+
+    @property
+    def headers(self) -> dict[str, str]:
+        headers = {"ETag": self.etag, "Cache-Control": "no-cache"}
+        if self.last_modified is not None:
+            headers["Last-Modified"] = format_datetime(
+                self.last_modified.astimezone(timezone.utc), usegmt=True
+            )
+        return headers
+
+
+def is_conditional(request: Request) -> bool:
+    """
+    Whether the client revalidates a copy, i.e. a validator is worth loading
+    """
+    return "if-none-match" in request.headers or "if-modified-since" in request.headers
+
+
+def page_validator(items: Sequence, total: Optional[int] = None) -> Validator:
+    """
+    Validator of a page served without loading the table's one: its row count
+    only. It never matches the validator of a non-empty table (whose
+    `max(updated_at)` is set), so the next conditional request gets a full
+    response with the table's validator, and the ones after it a `304`.
+    """
+    return Validator(count=total if total is not None else len(items))
+
+
+def is_not_modified(request: Request, validator: Validator) -> bool:
+    """
+    Whether the client's copy is current. `If-None-Match` wins over
+    `If-Modified-Since`, which is only trusted for rows: deleting a row
+    changes a page but not its `Last-Modified`.
+    """
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        tags = {_opaque(tag) for tag in if_none_match.split(",")}
+        return "*" in tags or _opaque(validator.etag) in tags
+
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since is None or validator.count is not None:
+        return False
+    if validator.last_modified is None:
+        return False
+    try:
+        since = parsedate_to_datetime(if_modified_since)
+    except (TypeError, ValueError):
+        return False
+    if since.tzinfo is None:
+        since = since.replace(tzinfo=timezone.utc)
+    # HTTP dates have a one second resolution
+    return (
+        validator.last_modified.astimezone(timezone.utc).replace(microsecond=0) <= since
+    )
+
+
+def not_modified(validator: Validator) -> Response:
+    return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=validator.headers)
+
+
+def _opaque(tag: str) -> str:
+    """
+    Weak comparison: `W/"x"` and `"x"` match
+    """
+    tag = tag.strip()
+    return tag[2:] if tag.startswith("W/") else tag
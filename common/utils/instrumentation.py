@@ -0,0 +1,424 @@
+"""
+Request instrumentation: latency, SQL statements and pool checkout wait per
+request, returned in a `Server-Timing` header and aggregated as Prometheus
+metrics served on `/metrics`. Statements are also watched for slow queries and
+N+1 patterns.
+"""
+
+import bisect
+import logging
+import re
+import sys
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Iterable, Iterator, Optional
+
+import greenlet
+from fastapi import APIRouter, Response
+from sqlalchemy import Engine, event
+from sqlalchemy.pool import AsyncAdaptedQueuePool, NullPool
+from starlette.datastructures import MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from common.repository.cache import local_cache
+
+logger = logging.getLogger(__name__)
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+STATEMENT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100, 250)
+
+# execution option of a statement run once per chunk of a bulk write: repeated
+# on purpose, so it is not counted towards the N+1 detection
+CHUNKED = "chunked"
+
+
+class Counter:
+    def __init__(self, name: str, help: str, labelnames: tuple[str, ...] = ()):
+        self.name = name
+        self.help = help
+        self.labelnames = labelnames
+        self.values: dict[tuple[str, ...], float] = {}
+
+    def inc(self, amount: float = 1, **labels: Any) -> None:
+        key = tuple(str(labels[name]) for name in self.labelnames)
+        self.values[key] = self.values.get(key, 0) + amount
+
+    def render(self) -> Iterable[str]:
+        yield f"# HELP {self.name} {self.help}"
+        yield f"# TYPE {self.name} counter"
+        for key, value in self.values.items():
+            yield f"{self.name}{_labels(self.labelnames, key)} {value}"
+
+
+class Histogram:
+    def __init__(
+        self,
+        name: str,
+        help: str,
+        buckets: tuple[float, ...],
+        labelnames: tuple[str, ...] = (),
+    ):
+        self.name = name
+        self.help = help
+        self.buckets = buckets
+        self.labelnames = labelnames
+        # per label values: count in each bucket (+Inf last), sum
+        self.values: dict[tuple[str, ...], tuple[list[int], float]] = {}
+
+    def observe(self, value: float, **labels: Any) -> None:
+        key = tuple(str(labels[name]) for name in self.labelnames)
+        counts, total = self.values.get(key) or ([0] * (len(self.buckets) + 1), 0.0)
+        counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.values[key] = (counts, total + value)
+
+    def render(self) -> Iterable[str]:
+        yield f"# HELP {self.name} {self.help}"
+        yield f"# TYPE {self.name} histogram"
+        for key, (counts, total) in self.values.items():
+            cumulative = 0
+            for bound, count in zip([*self.buckets, "+Inf"], counts):
+                cumulative += count
+                labels = _labels((*self.labelnames, "le"), (*key, str(bound)))
+                yield f"{self.name}_bucket{labels} {cumulative}"
+            labels = _labels(self.labelnames, key)
+            yield f"{self.name}_sum{labels} {total}"
+            yield f"{self.name}_count{labels} {cumulative}"
+
+
+class Metrics:
+    """
+    The metrics of the process, in memory: each worker serves its own
+    """
+
+    def __init__(self):
+        self.requests = Counter(
+            "http_requests_total", "HTTP requests", ("method", "route", "status")
+        )
+        self.latency = Histogram(
+            "http_request_duration_seconds",
+            "HTTP request latency",
+            LATENCY_BUCKETS,
+            ("method", "route"),
+        )
+        self.statements = Histogram(
+            "db_statements_per_request",
+            "SQL statements sent while serving a request, high counts hint at N+1",
+            STATEMENT_BUCKETS,
+            ("method", "route"),
+        )
+        self.db_time = Histogram(
+            "db_time_per_request_seconds",
+            "Time spent in SQL statements while serving a request",
+            LATENCY_BUCKETS,
+            ("method", "route"),
+        )
+        self.pool_wait = Histogram(
+            "db_pool_checkout_wait_seconds",
+            "Time waited for a database connection from the pool",
+            LATENCY_BUCKETS,
+        )
+        self.single_flight = Counter(
+            "single_flight_calls_total",
+            "Reads that ran (`leader`) or shared the result of an identical "
+            "in-flight read, in this worker (`coalesced`) or another (`coalesced_redis`)",
+            ("name", "outcome"),
+        )
+
+    def render(self) -> str:
+        lines = [
+            line
+            for metric in (
+                self.requests,
+                self.latency,
+                self.statements,
+                self.db_time,
+                self.pool_wait,
+                self.single_flight,
+            )
+            for line in metric.render()
+        ]
+        for name, value in local_cache.stats().items():
+            lines.append(f"# TYPE cache_l1_{name} gauge")
+            lines.append(f"cache_l1_{name} {value}")
+        return "\n".join(lines) + "\n"
+
+
+metrics = Metrics()
+
+
+class RequestTimings:
+    """
+    Timings of the request being served, shared with the tasks it spawns
+    """
+
+    __slots__ = ("statements", "db_time", "pool_wait", "shapes")
+
+    def __init__(self):
+        self.statements = 0
+        self.db_time = 0.0
+        self.pool_wait = 0.0
+        self.shapes: dict[str, int] = {}  # runs of each statement shape
+
+    def server_timing(self, total: float) -> str:
+        return (
+            f"app;dur={total * 1000:.1f}, "
+            f'db;dur={self.db_time * 1000:.1f};desc="{self.statements} queries", '
+            f"pool;dur={self.pool_wait * 1000:.1f}"
+        )
+
+
+current_timings: ContextVar[Optional[RequestTimings]] = ContextVar(
+    "current_timings", default=None
+)
+
+
+class NPlusOneError(RuntimeError):
+    """
+    The same statement ran too many times in one request
+    """
+
+
+class QueryBudgetExceeded(AssertionError):
+    """
+    A `query_budget` block ran more statements than allowed
+    """
+
+
+class QueryMonitor:
+    """
+    Engine listeners timing each statement into the current request timings.
+    Statements slower than `slow_query_threshold` seconds are logged with the
+    shape of their parameters and the repository method that ran them.
+    A statement shape run more than `n_plus_one_threshold` times in one request
+    is an N+1 pattern: logged, or raised with `raise_on_n_plus_one` (tests),
+    unless the statement is `CHUNKED`.
+    """
+
+    def __init__(
+        self,
+        *,
+        slow_query_threshold: Optional[float] = None,
+        n_plus_one_threshold: Optional[int] = None,
+        raise_on_n_plus_one: bool = False,
+    ):
+        self.slow_query_threshold = slow_query_threshold
+        self.n_plus_one_threshold = n_plus_one_threshold
+        self.raise_on_n_plus_one = raise_on_n_plus_one
+
+    def listen(self, engine: Engine) -> None:
+        """
+        Watch `engine`, the `sync_engine` of an async one
+        """
+        event.listen(engine, "before_cursor_execute", self.before_cursor_execute)
+        event.listen(engine, "after_cursor_execute", self.after_cursor_execute)
+
+    def before_cursor_execute(
+        self, conn, cursor, statement, parameters, context, executemany
+    ) -> None:
+        if context is not None:
+            context._instrumentation_start = time.perf_counter()
+
+    def after_cursor_execute(
+        self, conn, cursor, statement, parameters, context, executemany
+    ) -> None:
+        if context is None:
+            return
+        elapsed = time.perf_counter() - context._instrumentation_start
+
+        if self.slow_query_threshold and elapsed >= self.slow_query_threshold:
+            logger.warning(
+                "Slow query, %.1f ms in %s: %s [%s]",
+                elapsed * 1000,
+                query_origin() or "unknown",
+                statement_shape(statement),
+                parameters_shape(parameters, executemany),
+            )
+
+        timings = current_timings.get()
+        if timings is None:
+            return
+        timings.statements += 1
+        timings.db_time += elapsed
+
+        shape = statement_shape(statement)
+        count = timings.shapes[shape] = timings.shapes.get(shape, 0) + 1
+        if context.execution_options.get(CHUNKED, False):
+            return
+        # reported once, when the count goes over the threshold
+        if self.n_plus_one_threshold and count == self.n_plus_one_threshold + 1:
+            message = (
+                f"N+1 query, run {count} times in one request "
+                f"from {query_origin() or 'unknown'}: {shape}"
+            )
+            if self.raise_on_n_plus_one:
+                raise NPlusOneError(message)
+            logger.warning(message)
+
+
+@contextmanager
+def query_budget(max_statements: Optional[int] = None) -> Iterator[RequestTimings]:
+    """
+    Count the statements of the block like a request of its own (N+1 detection
+    included) and fail if there are more than `max_statements`:
+
+        with query_budget(3):
+            await repo.bulk_create(objs_in=objs)
+    """
+    timings = RequestTimings()
+    token = current_timings.set(timings)
+    try:
+        yield timings
+    finally:
+        current_timings.reset(token)
+    if max_statements is not None and timings.statements > max_statements:
+        raise QueryBudgetExceeded(
+            f"{timings.statements} statements, over the budget of {max_statements}:\n"
+            + "\n".join(f"{count} x {shape}" for shape, count in timings.shapes.items())
+        )
+
+
+def statement_shape(statement: str) -> str:
+    """
+    `statement` without the variable length of its parameter lists, so the
+    same query with IN lists or VALUES rows of other sizes has the same shape
+    """
+    shape = _PLACEHOLDER.sub("?", " ".join(statement.split()))
+    shape = _PLACEHOLDER_LIST.sub("(...)", shape)
+    return _REPEATED_LISTS.sub("(...)", shape)
+
+
+def parameters_shape(parameters: Any, executemany: bool) -> str:
+    """
+    The shape of the parameters, not their values which may be sensitive
+    """
+    if executemany:
+        first = parameters[0] if parameters else ()
+        return f"{len(parameters)} rows of {len(first)} parameters"
+    return f"{len(parameters or ())} parameters"
+
+
+def query_origin() -> Optional[str]:
+    """
+    `Repository.method` of the outermost repository call on the stack. Async
+    statements run in a greenlet, the repository coroutines are on the stack of
+    the greenlet that spawned it.
+    """
+    from common.repository.base import CRUDBase  # imports the DB config
+
+    origin = None
+    current, frame = greenlet.getcurrent(), sys._getframe(1)
+    while frame is not None:
+        obj = frame.f_locals.get("self")
+        if isinstance(obj, CRUDBase):
+            origin = f"{type(obj).__name__}.{frame.f_code.co_name}"
+        frame = frame.f_back
+        if frame is None and current.parent is not None:
+            current = current.parent
+            frame = current.gr_frame
+    return origin
+
+
+class TimedCheckout:
+    """
+    Pool mixin recording how long each checkout waited for a connection,
+    connecting included when the pool opens a new one
+    """
+
+    def connect(self):
+        start = time.perf_counter()
+        try:
+            return super().connect()
+        finally:
+            waited = time.perf_counter() - start
+            metrics.pool_wait.observe(waited)
+            timings = current_timings.get()
+            if timings is not None:
+                timings.pool_wait += waited
+
+
+class TimedQueuePool(TimedCheckout, AsyncAdaptedQueuePool):
+    pass
+
+
+class TimedNullPool(TimedCheckout, NullPool):
+    pass
+
+
+class InstrumentationMiddleware:
+    """
+    Pure ASGI middleware timing each HTTP request. With `server_timing`, the
+    `Server-Timing` header is sent with the response start, DB work done while
+    streaming the body only shows in the metrics.
+    """
+
+    def __init__(
+        self, app: ASGIApp, metrics: Metrics = metrics, server_timing: bool = False
+    ):
+        self.app = app
+        self.metrics = metrics
+        self.server_timing = server_timing
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        timings = RequestTimings()
+        token = current_timings.set(timings)
+        start = time.perf_counter()
+        status = 500
+
+        async def send_with_timing(message: Message) -> None:
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            if message["type"] == "http.response.start" and self.server_timing:
+                headers = MutableHeaders(scope=message)
+                headers.append(
+                    "Server-Timing", timings.server_timing(time.perf_counter() - start)
+                )
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            current_timings.reset(token)
+            route = scope.get("route")
+            labels = {
+                "method": scope["method"],
+                # the path template, raw paths would make one series per id
+                "route": getattr(route, "path", "unmatched"),
+            }
+            self.metrics.requests.inc(status=status, **labels)
+            self.metrics.latency.observe(time.perf_counter() - start, **labels)
+            self.metrics.statements.observe(timings.statements, **labels)
+            self.metrics.db_time.observe(timings.db_time, **labels)
+
+
+router = APIRouter()
+
+
+@router.get("/metrics", include_in_schema=False)
+async def metrics_api():
+    return Response(
+        metrics.render(), media_type="text/plain; version=0.0.4; charset=utf-8"
+    )
+
+
+# `$1`, `$1::VARCHAR` (asyncpg) or `%(name)s`, then lists of them (with the
+# integer sentinels of batched inserts), then runs of such lists
+_PLACEHOLDER = re.compile(r"\$\d+(?:::[\w ]+?(?=[,)]))?|%\(\w+\)s")
+_PLACEHOLDER_LIST = re.compile(r"\(\s*(?:\?|\d+)(?:\s*,\s*(?:\?|\d+))*\s*\)")
+_REPEATED_LISTS = re.compile(r"\(\.\.\.\)(?:\s*,\s*\(\.\.\.\))+")
+
+
+def _labels(names: tuple[str, ...], values: tuple[str, ...]) -> str:
+    if not names:
+        return ""
+    pairs = (f'{name}="{_escape(value)}"' for name, value in zip(names, values))
+    return "{" + ",".join(pairs) + "}"
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
@@ -0,0 +1,358 @@
+"""
+Background jobs on a Redis stream read by a consumer group: each job is
+delivered to one worker and acknowledged once it is done, so the job of a
+crashed worker is claimed by another one after `JOBS_CLAIM_TIMEOUT`.
+
+    @job("example.bulk_create_models")
+    async def bulk_create_models(payload: list[dict]) -> list[int]: ...
+
+    await job_queue.enqueue("example.bulk_create_models", payload=[...])
+
+Jobs are plain coroutines taking JSON arguments, registered from the `jobs`
+module of each app and run by `poetry run worker`. Jobs failing on a transient
+error (connection, timeout, 5xx) are retried with an exponential backoff, other
+errors fail them at once. Status and result are kept in a hash per job.
+"""
+
+import asyncio
+import json
+import logging
+import os
+import socket
+import time
+from datetime import datetime, timezone
+from typing import Any, Awaitable, Callable, Optional, TypeVar
+from uuid import uuid4
+
+from fastapi import HTTPException
+from fastapi.encoders import jsonable_encoder
+from redis.asyncio import Redis
+from redis.exceptions import RedisError, ResponseError
+from sqlalchemy.exc import InterfaceError, OperationalError
+
+from common.schemas.enums import JobStatusEnum
+from common.schemas.jobs import JobRead
+from config.redis import redis_registry
+from config.settings import get_settings
+
+settings = get_settings()
+
+logger = logging.getLogger(__name__)
+
+F = TypeVar("F", bound=Callable[..., Awaitable[Any]])
+
+registry: dict[str, Callable[..., Awaitable[Any]]] = {}
+
+
+def job(name: str) -> Callable[[F], F]:
+    """
+    Register a coroutine function as the job `name`
+    """
+
+    def register(fn: F) -> F:
+        if name in registry:
+            raise ValueError(f"Job {name} is already registered")
+        registry[name] = fn
+        return fn
+
+    return register
+
+
+# connections lost, timeouts, locks and deadlocks: the next attempt may succeed
+TRANSIENT_ERRORS = (OSError, RedisError, OperationalError, InterfaceError)
+
+
+def is_transient(error: Exception) -> bool:
+    """
+    Whether a job failing with `error` is worth retrying
+    """
+    if isinstance(error, HTTPException):
+        return error.status_code >= 500
+    return isinstance(error, TRANSIENT_ERRORS)
+
+
+class JobQueue:
+    """
+    Keys: `<prefix>` is the stream, `<prefix>:<id>` the status hash of a job
+    and `<prefix>:delayed` a sorted set of the retries, scored by due time
+    """
+
+    def __init__(
+        self,
+        redis_client: Optional[Redis] = None,
+        *,
+        prefix: str = f"{settings.APP_NAME}:jobs",
+        group: str = "workers",
+        max_attempts: int = settings.JOBS_MAX_ATTEMPTS,
+        retry_delay: float = settings.JOBS_RETRY_DELAY,
+        claim_timeout: float = settings.JOBS_CLAIM_TIMEOUT,
+        result_ttl: int = settings.JOBS_RESULT_TTL,
+    ):
+        self._redis_client = redis_client
+        self.stream = prefix
+        self.group = group
+        self.max_attempts = max_attempts
+        self.retry_delay = retry_delay
+        self.claim_timeout = claim_timeout
+        self.result_ttl = result_ttl
+
+    @property
+    def redis_client(self) -> Redis:
+        # the client of `config.redis` unless given, built on first use
+        return self._redis_client or redis_registry.client
+
+    @property
+    def delayed_key(self) -> str:
+        return f"{self.stream}:delayed"
+
+    def status_key(self, job_id: str) -> str:
+        return f"{self.stream}:{job_id}"
+
+    async def enqueue(self, name: str, **kwargs: Any) -> JobRead:
+        """
+        Queue the job `name` with JSON `kwargs`, returns its status
+        """
+        job_id, now = uuid4().hex, _now()
+        arguments = json.dumps(jsonable_encoder(kwargs))
+        async with self.redis_client.pipeline(transaction=True) as pipe:
+            pipe.hset(
+                self.status_key(job_id),
+                mapping={
+                    "id": job_id,
+                    "name": name,
+                    "status": JobStatusEnum.queued.value,
+                    "attempts": 0,
+                    "created_at": now,
+                    "updated_at": now,
+                },
+            )
+            pipe.expire(self.status_key(job_id), self.result_ttl)
+            pipe.xadd(self.stream, {"id": job_id, "name": name, "kwargs": arguments})
+            await pipe.execute()
+        return await self.get(job_id)
+
+    async def get(self, job_id: str) -> Optional[JobRead]:
+        data = await self.redis_client.hgetall(self.status_key(job_id))
+        if not data:
+            return None
+        if "result" in data:
+            data["result"] = json.loads(data["result"])
+        return JobRead(**data)
+
+    async def ensure_group(self) -> None:
+        try:
+            await self.redis_client.xgroup_create(
+                self.stream, self.group, id="0", mkstream=True
+            )
+        except ResponseError as exc:
+            if "BUSYGROUP" not in str(exc):
+                raise
+
+    async def read(
+        self, consumer: str, count: int, block: float
+    ) -> list[tuple[str, dict[str, str]]]:
+        """
+        Up to `count` messages: jobs of crashed workers first, then new ones
+        """
+        _, messages, *_ = await self.redis_client.xautoclaim(
+            self.stream,
+            self.group,
+            consumer,
+            min_idle_time=int(self.claim_timeout * 1000),
+            count=count,
+        )
+        messages = [(id, fields) for id, fields in messages if fields]
+        if len(messages) < count:
+            response = await self.redis_client.xreadgroup(
+                self.group,
+                consumer,
+                {self.stream: ">"},
+                count=count - len(messages),
+                block=int(block * 1000),
+            )
+            for _, stream_messages in response:
+                messages.extend(stream_messages)
+        return messages
+
+    async def keep_claimed(self, consumer: str, message_id: str) -> None:
+        """
+        Reset the idle time of a running job so it is not claimed by another worker
+        """
+        await self.redis_client.xclaim(
+            self.stream,
+            self.group,
+            consumer,
+            min_idle_time=0,
+            message_ids=[message_id],
+            justid=True,  # does not count as a delivery
+        )
+
+    async def start(self, job_id: str) -> int:
+        """
+        Mark the job running, returns its attempt number
+        """
+        async with self.redis_client.pipeline(transaction=True) as pipe:
+            pipe.hincrby(self.status_key(job_id), "attempts", 1)
+            pipe.hset(
+                self.status_key(job_id),
+                mapping={"status": JobStatusEnum.running.value, "updated_at": _now()},
+            )
+            attempts, _ = await pipe.execute()
+        return attempts
+
+    async def finish(
+        self,
+        message_id: str,
+        job_id: str,
+        status: JobStatusEnum,
+        *,
+        result: Any = None,
+        error: Optional[str] = None,
+    ) -> None:
+        fields = {"status": status.value, "updated_at": _now()}
+        if result is not None:
+            fields["result"] = json.dumps(jsonable_encoder(result))
+        if error is not None:
+            fields["error"] = error
+        async with self.redis_client.pipeline(transaction=True) as pipe:
+            pipe.hset(self.status_key(job_id), mapping=fields)
+            if status == JobStatusEnum.succeeded:
+                pipe.hdel(self.status_key(job_id), "error")  # of a failed attempt
+            pipe.expire(self.status_key(job_id), self.result_ttl)
+            pipe.xack(self.stream, self.group, message_id)
+            pipe.xdel(self.stream, message_id)
+            await pipe.execute()
+
+    async def retry_later(
+        self, message_id: str, fields: dict[str, str], attempts: int, error: str
+    ) -> None:
+        """
+        Queue the job again after the backoff of its attempt
+        """
+        due = time.time() + self.retry_delay * 2 ** (attempts - 1)
+        async with self.redis_client.pipeline(transaction=True) as pipe:
+            pipe.hset(
+                self.status_key(fields["id"]),
+                mapping={
+                    "status": JobStatusEnum.retrying.value,
+                    "error": error,
+                    "updated_at": _now(),
+                },
+            )
+            pipe.zadd(self.delayed_key, {json.dumps(fields): due})
+            pipe.xack(self.stream, self.group, message_id)
+            pipe.xdel(self.stream, message_id)
+            await pipe.execute()
+
+    async def promote_due(self) -> None:
+        """
+        Move the retries that are due back to the stream
+        """
+        due = await self.redis_client.zrangebyscore(self.delayed_key, 0, time.time())
+        for member in due:
+            # only the worker that removed it queues it
+            if await self.redis_client.zrem(self.delayed_key, member):
+                await self.redis_client.xadd(self.stream, json.loads(member))
+
+
+class Worker:
+    """
+    Runs the jobs of a queue, at most `concurrency` at once
+    """
+
+    def __init__(
+        self,
+        queue: JobQueue,
+        *,
+        concurrency: int = settings.JOBS_CONCURRENCY,
+        consumer: Optional[str] = None,
+        block: float = 1.0,
+    ):
+        self.queue = queue
+        self.concurrency = concurrency
+        self.consumer = consumer or f"{socket.gethostname()}-{os.getpid()}"
+        self.block = block
+        self._running: set[asyncio.Task] = set()
+
+    async def run(self, stop: Optional[asyncio.Event] = None) -> None:
+        """
+        Run jobs until `stop` is set, then wait for the running ones
+        """
+        stop = stop or asyncio.Event()
+        await self.queue.ensure_group()
+        logger.info("Worker %s started, jobs: %s", self.consumer, ", ".join(registry))
+        while not stop.is_set():
+            free = self.concurrency - len(self._running)
+            if free == 0:
+                await asyncio.wait(
+                    self._running, timeout=self.block, return_when=asyncio.FIRST_COMPLETED
+                )
+                continue
+            try:
+                await self.queue.promote_due()
+                messages = await self.queue.read(self.consumer, free, self.block)
+            except RedisError:
+                logger.exception("Redis unavailable, retrying")
+                await asyncio.sleep(self.block)
+                continue
+            for message_id, fields in messages:
+                task = asyncio.create_task(self.handle(message_id, fields))
+                self._running.add(task)
+                task.add_done_callback(self._running.discard)
+
+        if self._running:
+            await asyncio.wait(self._running)
+
+    async def handle(self, message_id: str, fields: dict[str, str]) -> None:
+        heartbeat = asyncio.create_task(self._keep_claimed(message_id))
+        try:
+            await self._run(message_id, fields)
+        except RedisError:
+            # the job stays pending, another worker claims it after the timeout
+            logger.exception("Redis unavailable, job %s not updated", fields["id"])
+        finally:
+            heartbeat.cancel()
+
+    async def _keep_claimed(self, message_id: str) -> None:
+        while True:
+            await asyncio.sleep(self.queue.claim_timeout / 3)
+            try:
+                await self.queue.keep_claimed(self.consumer, message_id)
+            except RedisError:
+                logger.warning("Redis unavailable, job %s not claimed", message_id)
+
+    async def _run(self, message_id: str, fields: dict[str, str]) -> None:
+        job_id, name = fields["id"], fields["name"]
+        attempts = await self.queue.start(job_id)
+        fn = registry.get(name)
+        if fn is None:
+            logger.error("Unknown job %s (%s)", name, job_id)
+            await self.queue.finish(
+                message_id, job_id, JobStatusEnum.failed, error=f"Unknown job {name}"
+            )
+            return
+
+        try:
+            result = await fn(**json.loads(fields["kwargs"]))
+        except Exception as exc:
+            error = f"{type(exc).__name__}: {exc}"
+            if is_transient(exc) and attempts < self.queue.max_attempts:
+                logger.warning("Job %s (%s) failed, retrying: %s", name, job_id, error)
+                await self.queue.retry_later(message_id, fields, attempts, error)
+            else:
+                logger.exception("Job %s (%s) failed", name, job_id)
+                await self.queue.finish(
+                    message_id, job_id, JobStatusEnum.failed, error=error
+                )
+            return
+
+        await self.queue.finish(
+            message_id, job_id, JobStatusEnum.succeeded, result=result
+        )
+
+
+def _now() -> str:
+    return datetime.now(timezone.utc).isoformat()
+
+
+job_queue = JobQueue()
@@ -0,0 +1,77 @@
+"""
+Short-lived Redis locks letting one worker load a value the others wait for,
+used by the repository cache and the single-flight across workers. A lock is
+taken with `SET NX PX` under a random token and only released by its holder.
+"""
+
+import asyncio
+from typing import Optional
+from uuid import uuid4
+
+from redis.asyncio import Redis
+from redis.exceptions import RedisError
+
+# delete the lock only if it is still ours: it may have expired and been taken
+RELEASE_SCRIPT = """
+if redis.call("get", KEYS[1]) == ARGV[1] then
+    return redis.call("del", KEYS[1])
+end
+return 0
+"""
+
+
+class RedisLock:
+    """
+    Lock on `key`, expiring after `timeout` seconds. `acquire`, `holder` and
+    `wait` raise `RedisError`, `release` does not.
+    """
+
+    def __init__(
+        self, redis_client: Redis, key: str, *, timeout: float, poll_interval: float
+    ):
+        self.redis_client = redis_client
+        self.key = key
+        self.timeout = timeout
+        self.poll_interval = poll_interval
+        self.token = uuid4().hex
+        self.acquired = False
+
+    async def acquire(self) -> bool:
+        self.acquired = bool(
+            await self.redis_client.set(
+                self.key, self.token, nx=True, px=int(self.timeout * 1000)
+            )
+        )
+        return self.acquired
+
+    async def release(self) -> None:
+        if not self.acquired:
+            return
+        self.acquired = False
+        try:
+            await self.redis_client.eval(RELEASE_SCRIPT, 1, self.key, self.token)
+        except RedisError:
+            pass  # the lock expires on its own
+
+    async def holder(self) -> Optional[str]:
+        """
+        Token of the current holder, `None` when the lock is free
+        """
+        return await self.redis_client.get(self.key)
+
+    async def wait(self, result_key: str, holder: Optional[str] = None) -> Optional[str]:
+        """
+        Poll for the value the holder stores under `result_key`. `None` when the
+        lock is released (or, given a `holder`, taken over) without it, or on timeout.
+        """
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.timeout
+        while loop.time() < deadline:
+            await asyncio.sleep(self.poll_interval)
+            async with self.redis_client.pipeline(transaction=False) as pipe:
+                result, current = await pipe.get(result_key).get(self.key).execute()
+            if result is not None or current is None:
+                return result
+            if holder is not None and current != holder:
+                return None
+        return None
@@ -0,0 +1,48 @@
+"""
+JSON rendering shortcuts for large responses
+"""
+
+from typing import Any, Mapping, Optional
+
+from fastapi.responses import JSONResponse, ORJSONResponse, Response
+
+from common.utils.adapters import type_adapter
+from config.settings import Settings
+
+try:
+    import orjson
+except ImportError:  # optional, only needed for `FAST_JSON_RESPONSES`
+    orjson = None
+
+
+def default_response_class(settings: Settings) -> type[JSONResponse]:
+    """
+    `ORJSONResponse` when `FAST_JSON_RESPONSES` is on and orjson is installed
+    """
+    if settings.FAST_JSON_RESPONSES and orjson is not None:
+        return ORJSONResponse
+    return JSONResponse
+
+
+class TrustedJSONResponse(Response):
+    """
+    Serialize `content` straight to JSON bytes with its pydantic serializer.
+    Returning it from a view skips the `response_model` validation, so the
+    content must already be the declared schema, e.g. `SomeModelRead` objects
+    rather than ORM rows.
+    """
+
+    media_type = "application/json"
+
+    def __init__(
+        self,
+        content: Any,
+        status_code: int = 200,
+        headers: Optional[Mapping[str, str]] = None,
+        response_type: Any = None,
+    ):
+        self.response_type = response_type if response_type is not None else type(content)
+        super().__init__(content, status_code=status_code, headers=headers)
+
+    def render(self, content: Any) -> bytes:
+        return type_adapter(self.response_type).dump_json(content)
@@ -0,0 +1,188 @@
+"""
+Single-flight: identical reads in flight at the same time run once and share
+the result. `SingleFlight` coalesces within a worker, `RedisSingleFlight` also
+across workers through a Redis lock.
+
+Repositories enable it per method with `CRUDBase.single_flight`, anything else
+(e.g. a view) can wrap a call:
+
+    flight = get_single_flight("daily_report")
+    report = await flight.do(day, lambda: service.daily_report(day))
+"""
+
+import asyncio
+import hashlib
+import json
+import logging
+from typing import Any, Awaitable, Callable, Hashable, Optional, TypeVar
+
+from redis.asyncio import Redis
+from redis.exceptions import RedisError
+
+from common.utils.instrumentation import metrics
+from common.utils.locks import RedisLock
+from config.settings import get_settings
+
+settings = get_settings()
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+
+class SingleFlight:
+    """
+    The first caller of a key runs `fn`, callers arriving before it finished
+    await its result (or exception) instead. Results are shared, so they must
+    not be mutated nor hold per-request state such as ORM rows of a session.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self._calls: dict[Hashable, asyncio.Future] = {}
+
+    def __len__(self) -> int:
+        return len(self._calls)
+
+    async def do(
+        self,
+        key: Hashable,
+        fn: Callable[[], Awaitable[T]],
+        *,
+        dumps: Optional[Callable[[T], Any]] = None,
+        loads: Optional[Callable[[Any], T]] = None,
+    ) -> T:
+        """
+        `dumps` / `loads` convert the result from and to JSON-compatible data,
+        only `RedisSingleFlight` needs them
+        """
+        while (call := self._calls.get(key)) is not None:
+            try:
+                result = await asyncio.shield(call)
+            except asyncio.CancelledError:
+                if call.cancelled():
+                    continue  # the leader was cancelled, take over
+                raise
+            metrics.single_flight.inc(name=self.name, outcome="coalesced")
+            return result
+
+        call = asyncio.get_running_loop().create_future()
+        self._calls[key] = call
+        metrics.single_flight.inc(name=self.name, outcome="leader")
+        try:
+            result = await self._run(key, fn, dumps, loads)
+        except asyncio.CancelledError:
+            call.cancel()
+            raise
+        except Exception as exc:
+            call.set_exception(exc)
+            call.exception()  # retrieved, even without followers
+            raise
+        else:
+            call.set_result(result)
+            return result
+        finally:
+            del self._calls[key]
+
+    async def _run(
+        self,
+        key: Hashable,
+        fn: Callable[[], Awaitable[T]],
+        dumps: Optional[Callable[[T], Any]],
+        loads: Optional[Callable[[Any], T]],
+    ) -> T:
+        return await fn()
+
+
+class RedisSingleFlight(SingleFlight):
+    """
+    Coalesces in the worker first, then across workers: the leader of each key
+    holds a Redis lock and publishes its result for `lock_timeout` seconds,
+    under the token of its lock; the other workers poll for the result of the
+    leader holding the lock when they arrived. Any Redis error runs `fn` unshared.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        *,
+        redis_client: Redis,
+        lock_timeout: float = 5.0,
+        poll_interval: float = 0.05,
+    ):
+        super().__init__(name)
+        self.redis_client = redis_client
+        self.lock_timeout = lock_timeout
+        self.poll_interval = poll_interval
+
+    async def _run(
+        self,
+        key: Hashable,
+        fn: Callable[[], Awaitable[T]],
+        dumps: Optional[Callable[[T], Any]],
+        loads: Optional[Callable[[Any], T]],
+    ) -> T:
+        if dumps is None or loads is None:
+            raise TypeError(f"{type(self).__name__} needs `dumps` and `loads`")
+
+        digest = hashlib.sha1(repr(key).encode()).hexdigest()
+        result_key = f"{settings.APP_NAME}:singleflight:{self.name}:{digest}"
+        lock = RedisLock(
+            self.redis_client,
+            f"{result_key}:lock",
+            timeout=self.lock_timeout,
+            poll_interval=self.poll_interval,
+        )
+        try:
+            if not await lock.acquire():
+                raw = await self._wait_for(result_key, lock)
+                if raw is not None:
+                    metrics.single_flight.inc(name=self.name, outcome="coalesced_redis")
+                    return loads(json.loads(raw))
+        except RedisError:
+            logger.warning("Redis unavailable, %s runs unshared", self.name)
+            return await fn()
+
+        try:
+            result = await fn()
+            if lock.acquired:
+                await self._publish(f"{result_key}:{lock.token}", dumps(result))
+        finally:
+            await lock.release()
+        return result
+
+    async def _publish(self, result_key: str, data: Any) -> None:
+        try:
+            await self.redis_client.set(
+                result_key, json.dumps(data), px=int(self.lock_timeout * 1000)
+            )
+        except RedisError:
+            pass  # the waiters see the lock released and run `fn` themselves
+
+    async def _wait_for(self, result_key: str, lock: RedisLock) -> Optional[str]:
+        """
+        Poll for the result of the current leader until its lock is released.
+        Earlier leaders published under other tokens, their results are stale.
+        """
+        token = await lock.holder()
+        if token is None:  # released in between, its result may predate us
+            return None
+        return await lock.wait(f"{result_key}:{token}", holder=token)
+
+
+_flights: dict[str, SingleFlight] = {}
+
+
+def get_single_flight(name: str, redis_client: Optional[Redis] = None) -> SingleFlight:
+    """
+    The single-flight group `name` of the process, coalescing across workers
+    when created with a `redis_client`
+    """
+    flight = _flights.get(name)
+    if flight is None:
+        flight = _flights[name] = (
+            RedisSingleFlight(name, redis_client=redis_client)
+            if redis_client is not None
+            else SingleFlight(name)
+        )
+    return flight
@@ -0,0 +1,271 @@
+"""
+Streamed files: encoders turning batches of rows into a response body, one
+chunk per batch, and decoders reading rows from a request body as it arrives
+"""
+
+import codecs
+import csv
+import io
+from typing import Any, AsyncIterable, AsyncIterator, Awaitable, Callable
+
+from fastapi import HTTPException, Request, status
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel, ValidationError
+
+from common.schemas.enums import ExportFormatEnum
+from common.schemas.ingest import IngestBatchError, IngestReport, IngestRowError
+from common.utils.iterables import achunked
+from config.settings import get_settings
+
+settings = get_settings()
+
+try:
+    import pyarrow as pa
+except ImportError:  # optional, only needed for Arrow exports
+    pa = None
+
+
+async def encode_ndjson(
+    batches: AsyncIterable[list[Any]], schema: type[BaseModel]
+) -> AsyncIterator[bytes]:
+    async for batch in batches:
+        yield b"".join(
+            schema.model_validate(obj).model_dump_json().encode() + b"\n" for obj in batch
+        )
+
+
+async def encode_csv(
+    batches: AsyncIterable[list[Any]], schema: type[BaseModel]
+) -> AsyncIterator[bytes]:
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=list(schema.model_fields))
+    writer.writeheader()
+    async for batch in batches:
+        writer.writerows(
+            schema.model_validate(obj).model_dump(mode="json") for obj in batch
+        )
+        yield _drain(buffer).encode()
+    if buffer.tell():
+        yield _drain(buffer).encode()
+
+
+async def encode_arrow(
+    batches: AsyncIterable[list[Any]], schema: type[BaseModel]
+) -> AsyncIterator[bytes]:
+    """
+    Arrow IPC stream, the Arrow schema is inferred from the first batch
+    """
+    buffer = io.BytesIO()
+    writer = None
+    async for batch in batches:
+        rows = [schema.model_validate(obj).model_dump() for obj in batch]
+        if writer is None:
+            record_batch = pa.RecordBatch.from_pylist(rows)
+            writer = pa.ipc.new_stream(buffer, record_batch.schema)
+        else:
+            record_batch = pa.RecordBatch.from_pylist(rows, schema=writer.schema)
+        writer.write_batch(record_batch)
+        yield _drain(buffer)
+
+    if writer is None:  # no rows, still a valid stream
+        writer = pa.ipc.new_stream(
+            buffer, pa.schema([(name, pa.null()) for name in schema.model_fields])
+        )
+    writer.close()
+    yield _drain(buffer)
+
+
+ENCODERS = {
+    ExportFormatEnum.ndjson: (encode_ndjson, "application/x-ndjson"),
+    ExportFormatEnum.csv: (encode_csv, "text/csv"),
+    ExportFormatEnum.arrow: (encode_arrow, "application/vnd.apache.arrow.stream"),
+}
+
+
+def export_response(
+    batches: AsyncIterable[list[Any]],
+    schema: type[BaseModel],
+    format: ExportFormatEnum,
+    filename: str,
+) -> StreamingResponse:
+    """
+    Stream `batches` as a `format` file download
+    """
+    if format == ExportFormatEnum.arrow and pa is None:
+        raise HTTPException(
+            status_code=status.HTTP_501_NOT_IMPLEMENTED,
+            detail="Arrow export needs pyarrow installed",
+        )
+
+    encoder, media_type = ENCODERS[format]
+    return StreamingResponse(
+        encoder(batches, schema),
+        media_type=media_type,
+        headers={
+            "Content-Disposition": f'attachment; filename="{filename}.{format.value}"'
+        },
+    )
+
+
+async def iter_ndjson(
+    chunks: AsyncIterable[bytes], max_line_bytes: int = settings.INGEST_MAX_LINE_BYTES
+) -> AsyncIterator[tuple[int, bytes]]:
+    """
+    `(line number, raw JSON)` for each non-empty line of an NDJSON body.
+    A line longer than `max_line_bytes` answers 413, so memory stays bounded.
+    """
+    pending, line = b"", 0
+    async for chunk in chunks:
+        *lines, pending = (pending + chunk).split(b"\n")
+        for raw in lines:
+            line += 1
+            _check_length(line, len(raw), max_line_bytes)
+            if raw.strip():
+                yield line, raw
+        _check_length(line + 1, len(pending), max_line_bytes)
+    if pending.strip():
+        yield line + 1, pending
+
+
+async def iter_csv(
+    chunks: AsyncIterable[bytes],
+    encoding: str = "utf-8",
+    max_line_bytes: int = settings.INGEST_MAX_LINE_BYTES,
+) -> AsyncIterator[tuple[int, dict[str, str]]]:
+    """
+    `(line number, row)` for each record of a CSV body with a header line.
+    A record spans lines while it has an unbalanced quote. A record longer
+    than `max_line_bytes` characters answers 413, so memory stays bounded.
+    """
+    decoder = codecs.getincrementaldecoder(encoding)()
+    header: list[str] | None = None
+    pending, record, first_line, line, size = "", [], 0, 0, 0
+
+    async def lines() -> AsyncIterator[str]:
+        nonlocal pending
+        async for chunk in chunks:
+            *complete, pending = (pending + decoder.decode(chunk)).split("\n")
+            for text in complete:
+                yield text
+            _check_length(
+                line + 1, (size if record else 0) + len(pending), max_line_bytes
+            )
+        pending += decoder.decode(b"", final=True)
+        if pending:
+            yield pending
+
+    async for text in lines():
+        line += 1
+        if not record:
+            first_line, size = line, 0
+        record.append(text)
+        size += len(text) + 1
+        _check_length(first_line, size, max_line_bytes)
+        if sum(part.count('"') for part in record) % 2:
+            continue  # quoted newline, the record goes on
+
+        values = next(csv.reader(["\n".join(record)]), [])
+        record = []
+        if header is None:
+            header = values
+        elif values:
+            yield first_line, dict(zip(header, values))
+
+
+DECODERS = {
+    "application/x-ndjson": iter_ndjson,
+    "text/csv": iter_csv,
+}
+
+
+def iter_request_rows(request: Request) -> AsyncIterator[tuple[int, Any]]:
+    """
+    Rows of the request body as it is received, decoded by its content type
+    """
+    content_type = request.headers.get("content-type", "").split(";")[0].strip()
+    if content_type not in DECODERS:
+        raise HTTPException(
+            status_code=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE,
+            detail=f"Send one of {', '.join(DECODERS)}",
+        )
+    return DECODERS[content_type](request.stream())
+
+
+async def ingest(
+    rows: AsyncIterable[tuple[int, Any]],
+    *,
+    schema: type[BaseModel],
+    write: Callable[[list[Any]], Awaitable[int]],
+    batch_size: int = 1000,
+    max_row_errors: int = settings.INGEST_MAX_ROW_ERRORS,
+    max_error_batches: int = settings.INGEST_MAX_ERROR_BATCHES,
+) -> IngestReport:
+    """
+    Validate `(line number, raw JSON or dict)` rows against `schema` in batches
+    and pass the valid ones of each batch to `write`. Only one batch is held
+    in memory, and the body is not read further until it is written. The
+    report keeps at most `max_row_errors` row errors per batch and
+    `max_error_batches` batches with errors, the others are only counted.
+    """
+    report = IngestReport()
+    async for batch in achunked(rows, batch_size):
+        objs, errors, invalid = [], [], 0
+        for line, raw in batch:
+            try:
+                if isinstance(raw, (str, bytes)):
+                    objs.append(schema.model_validate_json(raw))
+                else:
+                    objs.append(schema.model_validate(raw))
+            except ValidationError as error:
+                invalid += 1
+                if len(errors) >= max_row_errors:
+                    continue
+                errors.append(
+                    IngestRowError(
+                        line=line,
+                        errors=error.errors(
+                            include_url=False, include_context=False, include_input=False
+                        ),
+                    )
+                )
+
+        inserted, detail = 0, None
+        if objs:
+            try:
+                inserted = await write(objs)
+            except HTTPException as error:
+                detail = error.detail
+
+        if (invalid or detail) and len(report.errors) >= max_error_batches:
+            report.omitted_batches += 1
+        elif invalid or detail:
+            report.errors.append(
+                IngestBatchError(
+                    batch=report.batches,
+                    first_line=batch[0][0],
+                    last_line=batch[-1][0],
+                    inserted=inserted,
+                    rows=errors,
+                    omitted_rows=invalid - len(errors),
+                    detail=detail,
+                )
+            )
+        report.batches += 1
+        report.inserted += inserted
+        report.failed += len(batch) - inserted
+    return report
+
+
+def _check_length(line: int, length: int, max_length: int) -> None:
+    if length > max_length:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=f"Line {line} is longer than {max_length} bytes",
+        )
+
+
+def _drain(buffer: io.StringIO | io.BytesIO) -> Any:
+    data = buffer.getvalue()
+    buffer.seek(0)
+    buffer.truncate()
+    return data
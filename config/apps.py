@@ -0,0 +1,122 @@
+"""
+Registry of the sub-apps, Django style: every package under `apps/` is an app,
+nothing to register. Its API versions are the `apis/v*` packages, each with a
+`router`, mounted under the app's `url_prefix` (`/<app name>` unless its
+`__init__.py` sets one). Other modules (`models`, `jobs`, ...) are only
+imported when asked for, e.g. by alembic, the shell or the worker.
+"""
+
+import importlib
+import importlib.util
+import pkgutil
+from functools import cached_property
+from types import ModuleType
+from typing import TYPE_CHECKING, Optional
+
+import apps as apps_package
+
+if TYPE_CHECKING:  # fastapi is only needed to build the routes
+    from fastapi import APIRouter
+
+
+class AppConfig:
+    def __init__(self, name: str, package: str = apps_package.__name__):
+        self.name = name
+        self.module_name = f"{package}.{name}"
+
+    def __repr__(self) -> str:
+        return f"<AppConfig {self.name}>"
+
+    @cached_property
+    def module(self) -> ModuleType:
+        return importlib.import_module(self.module_name)
+
+    @property
+    def url_prefix(self) -> str:
+        return getattr(self.module, "url_prefix", f"/{self.name}")
+
+    def import_module(self, name: str) -> Optional[ModuleType]:
+        """
+        The `name` submodule of the app, `None` when the app has none
+        """
+        module_name = f"{self.module_name}.{name}"
+        try:
+            if importlib.util.find_spec(module_name) is None:
+                return None
+        except ModuleNotFoundError:  # a parent package is missing
+            return None
+        return importlib.import_module(module_name)
+
+    def api_versions(self) -> list[str]:
+        """
+        Names of the `apis/v*` packages, without importing them
+        """
+        try:
+            spec = importlib.util.find_spec(f"{self.module_name}.apis")
+        except ModuleNotFoundError:
+            return []
+        if spec is None or spec.submodule_search_locations is None:
+            return []
+        versions = [
+            module.name
+            for module in pkgutil.iter_modules(spec.submodule_search_locations)
+            if module.ispkg and module.name.startswith("v")
+        ]
+        return sorted(versions, key=lambda name: (len(name), name))  # v2 before v10
+
+    def routers(self) -> list["APIRouter"]:
+        return [
+            self.import_module(f"apis.{version}").router
+            for version in self.api_versions()
+        ]
+
+
+class AppRegistry:
+    """
+    The apps found under a package, by name. Discovery lists the package
+    directory only, the apps are imported on first use.
+    """
+
+    def __init__(self, package: ModuleType = apps_package):
+        self.package = package
+
+    @cached_property
+    def app_configs(self) -> dict[str, AppConfig]:
+        return {
+            module.name: AppConfig(module.name, self.package.__name__)
+            for module in sorted(
+                pkgutil.iter_modules(self.package.__path__), key=lambda m: m.name
+            )
+            if module.ispkg
+        }
+
+    def get_app_config(self, name: str) -> AppConfig:
+        return self.app_configs[name]
+
+    def import_modules(self, name: str) -> list[ModuleType]:
+        """
+        The `name` submodule of every app that has one
+        """
+        modules = (app.import_module(name) for app in self.app_configs.values())
+        return [module for module in modules if module is not None]
+
+    def import_models(self) -> list[ModuleType]:
+        """
+        Import the models of every app, filling `SQLModel.metadata`
+        """
+        return self.import_modules("models")
+
+    def api_router(self) -> "APIRouter":
+        """
+        Router of every API version of every app, under its `url_prefix`
+        """
+        from fastapi import APIRouter
+
+        router = APIRouter()
+        for app in self.app_configs.values():
+            for version_router in app.routers():
+                router.include_router(version_router, prefix=app.url_prefix)
+        return router
+
+
+app_registry = AppRegistry()
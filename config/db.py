@@ -1,35 +1,280 @@
-from typing import AsyncGenerator
+import asyncio
+import itertools
+import logging
+from contextlib import contextmanager
+from typing import Any, AsyncGenerator, Iterator, Optional
 
-from sqlalchemy import create_engine
-from sqlalchemy.ext.asyncio import create_async_engine
-from sqlalchemy.orm import sessionmaker
-from sqlalchemy.pool import AsyncAdaptedQueuePool, NullPool
+from sqlalchemy import Engine, create_engine, event, text
+from sqlalchemy.engine import make_url
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.ext.asyncio import AsyncEngine, async_sessionmaker, create_async_engine
+from sqlalchemy.pool import AsyncAdaptedQueuePool, NullPool, Pool
+from sqlalchemy.sql import Select
+from sqlmodel import Session
 from sqlmodel.ext.asyncio.session import AsyncSession
 
-from config.settings import ModeEnum, get_settings
+from common.utils.instrumentation import QueryMonitor, TimedNullPool, TimedQueuePool
+from config.settings import ModeEnum, ReplicaStrategyEnum, Settings, get_settings
 
 settings = get_settings()
 
-engine = create_engine(
-    url=str(settings.DATABASE_URI),
-    echo=settings.DEBUG,
-)
+logger = logging.getLogger(__name__)
 
-async_engine = create_async_engine(
-    url=str(settings.ASYNC_DATABASE_URI),
-    echo=settings.DEBUG,
-    poolclass=(
-        NullPool if settings.MODE == ModeEnum.testing else AsyncAdaptedQueuePool
-    ),  # Asincio pytest works with NullPool
-)
+# execution option sending a SELECT to the primary, e.g. before writing its result
+USE_PRIMARY = "use_primary"
 
 
-async def get_session() -> AsyncGenerator[AsyncSession, None]:
-    async_session: AsyncSession = sessionmaker(
-        async_engine,
-        class_=AsyncSession,
-        expire_on_commit=False,
-    )
+class ReplicaRouter:
+    """
+    Picks the replica engine for a read, round-robin or the one with the fewest
+    checked out connections, among the replicas that passed the last health check
+    """
+
+    def __init__(
+        self,
+        engines: list[AsyncEngine],
+        *,
+        strategy: ReplicaStrategyEnum = ReplicaStrategyEnum.round_robin,
+        health_check_timeout: float = 2.0,
+    ):
+        self.engines = engines
+        self.strategy = strategy
+        self.health_check_timeout = health_check_timeout
+        self.healthy = list(engines)
+        self.connections = {engine: 0 for engine in engines}
+        self._counter = itertools.count()
+
+        for engine in engines:
+            event.listen(engine.sync_engine, "checkout", self._on_checkout(engine))
+            event.listen(engine.sync_engine, "checkin", self._on_checkin(engine))
+
+    def choose(self) -> Optional[AsyncEngine]:
+        """
+        Replica for the next read, `None` when none is healthy
+        """
+        healthy = self.healthy
+        if not healthy:
+            return None
+        if self.strategy == ReplicaStrategyEnum.least_connections:
+            return min(healthy, key=self.connections.__getitem__)
+        return healthy[next(self._counter) % len(healthy)]
+
+    async def check_health(self) -> None:
+        healthy = []
+        for engine in self.engines:
+            try:
+                async with asyncio.timeout(self.health_check_timeout):
+                    async with engine.connect() as conn:
+                        await conn.execute(text("SELECT 1"))
+            except (SQLAlchemyError, OSError, TimeoutError):
+                logger.warning("Replica %s is unhealthy", engine.url)
+                continue
+            healthy.append(engine)
+        self.healthy = healthy
+
+    async def run_health_checks(self, interval: float) -> None:
+        """
+        Check the replicas every `interval` seconds, runs until cancelled
+        """
+        while True:
+            await self.check_health()
+            await asyncio.sleep(interval)
+
+    def _on_checkout(self, engine: AsyncEngine):
+        def on_checkout(*args: Any) -> None:
+            self.connections[engine] += 1
+
+        return on_checkout
+
+    def _on_checkin(self, engine: AsyncEngine):
+        def on_checkin(*args: Any) -> None:
+            self.connections[engine] -= 1
+
+        return on_checkin
+
+
+class RoutingSession(Session):
+    """
+    Sends plain SELECTs to a replica and everything else to the primary.
+    Once the session writes, it sticks to the primary until the transaction
+    ends, so it reads its own writes. `refresh()` and the reads in a
+    `reading_primary()` block always read the primary.
+    """
+
+    def __init__(self, *args: Any, router: Optional[ReplicaRouter] = None, **kwargs: Any):
+        super().__init__(*args, **kwargs)
+        self.router = router
+        self.wrote = False
+        self.primary_reads = False
+
+    def get_bind(self, mapper=None, *, clause=None, **kwargs):
+        if self.router is not None:
+            if self._flushing or (clause is not None and clause.is_dml):
+                self.wrote = True
+            elif not (self.wrote or self.primary_reads) and self._is_read(clause):
+                replica = self.router.choose()
+                if replica is not None:
+                    return replica.sync_engine
+        return super().get_bind(mapper, clause=clause, **kwargs)
+
+    def refresh(self, instance: Any, *args: Any, **kwargs: Any) -> None:
+        # refreshing is reading back a write, a replica may not have it yet
+        with self.reading_primary():
+            super().refresh(instance, *args, **kwargs)
+
+    @contextmanager
+    def reading_primary(self) -> Iterator[None]:
+        primary_reads, self.primary_reads = self.primary_reads, True
+        try:
+            yield
+        finally:
+            self.primary_reads = primary_reads
+
+    @staticmethod
+    def _is_read(clause: Any) -> bool:
+        return (
+            isinstance(clause, Select)
+            and clause._for_update_arg is None
+            and not clause.get_execution_options().get(USE_PRIMARY, False)
+        )
+
 
-    async with async_session() as session:
+@event.listens_for(RoutingSession, "after_transaction_end")
+def _reset_primary_stickiness(session: RoutingSession, transaction: Any) -> None:
+    if transaction.parent is None:
+        session.wrote = False
+
+
+@contextmanager
+def reading_primary(session: AsyncSession) -> Iterator[None]:
+    """
+    Send the reads of the block to the primary, with or without replicas
+    """
+    if isinstance(session.sync_session, RoutingSession):
+        with session.sync_session.reading_primary():
+            yield
+    else:
+        yield
+
+
+class DatabaseRegistry:
+    """
+    Owns the engines and the session factory of the process.
+    They are built once, on `init()` from the app lifespan or on first use,
+    and released with `dispose()` on shutdown.
+    """
+
+    def __init__(self, settings: Settings):
+        self.settings = settings
+        self._engine: Engine | None = None
+        self._async_engine: AsyncEngine | None = None
+        self._router: ReplicaRouter | None = None
+        self._session_factory: async_sessionmaker[AsyncSession] | None = None
+
+    @property
+    def engine(self) -> Engine:
+        if self._engine is None:
+            self._engine = create_engine(
+                url=str(self.settings.DATABASE_URI),
+                echo=self.settings.DEBUG,
+            )
+        return self._engine
+
+    @property
+    def async_engine(self) -> AsyncEngine:
+        if self._async_engine is None:
+            self._async_engine = self._create_async_engine(
+                str(self.settings.ASYNC_DATABASE_URI)
+            )
+        return self._async_engine
+
+    @property
+    def router(self) -> ReplicaRouter | None:
+        """
+        Router over the `ASYNC_REPLICA_URIS` engines, `None` without replicas
+        """
+        if self._router is None and self.settings.ASYNC_REPLICA_URIS:
+            engines = [
+                self._create_async_engine(url)
+                for url in map(str, self.settings.ASYNC_REPLICA_URIS)
+            ]
+            self._router = ReplicaRouter(
+                engines,
+                strategy=self.settings.DB_REPLICA_STRATEGY,
+                health_check_timeout=self.settings.DB_REPLICA_HEALTH_CHECK_TIMEOUT,
+            )
+        return self._router
+
+    @property
+    def session_factory(self) -> async_sessionmaker[AsyncSession]:
+        if self._session_factory is None:
+            self._session_factory = async_sessionmaker(
+                self.async_engine,
+                class_=AsyncSession,
+                sync_session_class=RoutingSession,
+                expire_on_commit=False,
+                router=self.router,
+            )
+        return self._session_factory
+
+    def async_engine_options(self, url: str) -> dict[str, Any]:
+        """
+        Keyword arguments for `create_async_engine`, with the pool tuned from settings
+        """
+        poolclass: type[Pool] = (
+            NullPool if self.settings.MODE == ModeEnum.testing else AsyncAdaptedQueuePool
+        )  # Asincio pytest works with NullPool
+        if self.settings.instrumentation:
+            # same pools, timing how long checkouts wait
+            poolclass = TimedNullPool if poolclass is NullPool else TimedQueuePool
+        options: dict[str, Any] = {
+            "echo": self.settings.DEBUG,
+            "poolclass": poolclass,
+            "pool_pre_ping": self.settings.DB_POOL_PRE_PING,
+            "pool_recycle": self.settings.DB_POOL_RECYCLE,
+        }
+        if not issubclass(poolclass, NullPool):
+            options.update(
+                pool_size=self.settings.DB_POOL_SIZE,
+                max_overflow=self.settings.DB_MAX_OVERFLOW,
+                pool_timeout=self.settings.DB_POOL_TIMEOUT,
+            )
+        if make_url(url).get_driver_name() == "asyncpg":
+            options["connect_args"] = {
+                "statement_cache_size": self.settings.DB_STATEMENT_CACHE_SIZE,
+                "prepared_statement_cache_size": self.settings.DB_STATEMENT_CACHE_SIZE,
+            }
+        return options
+
+    def _create_async_engine(self, url: str) -> AsyncEngine:
+        engine = create_async_engine(url=url, **self.async_engine_options(url))
+        QueryMonitor(
+            slow_query_threshold=self.settings.DB_SLOW_QUERY_THRESHOLD,
+            n_plus_one_threshold=self.settings.DB_N_PLUS_ONE_THRESHOLD,
+            raise_on_n_plus_one=self.settings.MODE == ModeEnum.testing,
+        ).listen(engine.sync_engine)
+        return engine
+
+    def init(self) -> None:
+        """
+        Build the async engines and session factory up front
+        """
+        self._session_factory = self.session_factory
+
+    async def dispose(self) -> None:
+        if self._async_engine is not None:
+            await self._async_engine.dispose()
+        if self._router is not None:
+            for replica in self._router.engines:
+                await replica.dispose()
+        if self._engine is not None:
+            self._engine.dispose()
+        self._engine = self._async_engine = self._router = self._session_factory = None
+
+
+db = DatabaseRegistry(settings)
+
+
+async def get_session() -> AsyncGenerator[AsyncSession, None]:
+    async with db.session_factory() as session:
         yield session
@@ -1,22 +1,45 @@
 import redis.asyncio as async_redis
 
-from config.settings import get_settings
+from config.settings import Settings, get_settings
 
 settings = get_settings()
 
-redis_client = async_redis.Redis.from_url(
-    url=str(settings.REDIS_URI),
-    decode_responses=True,  # makes Redis return strings instead of bytes
-)
+
+class RedisRegistry:
+    """
+    Owns the Redis client of the process, built on first use (no connection
+    is opened before the first command) and closed with `close()` on shutdown
+    """
+
+    def __init__(self, settings: Settings):
+        self.settings = settings
+        self._client: async_redis.Redis | None = None
+
+    @property
+    def client(self) -> async_redis.Redis:
+        if self._client is None:
+            self._client = async_redis.Redis.from_url(
+                url=str(self.settings.REDIS_URI),
+                decode_responses=True,  # makes Redis return strings instead of bytes
+            )
+        return self._client
+
+    async def close(self) -> None:
+        if self._client is not None:
+            await self._client.aclose()
+            await self._client.connection_pool.disconnect()
+        self._client = None
+
+
+redis_registry = RedisRegistry(settings)
 
 
 async def get_redis():
-    return redis_client
+    return redis_registry.client
 
 
 async def shutdown_redis() -> None:
     """
     Closing redis connection
     """
-    await redis_client.close()
-    await redis_client.connection_pool.disconnect()
+    await redis_registry.close()
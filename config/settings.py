@@ -17,6 +17,11 @@ class ModeEnum(str, Enum):
     prod = "prod"
 
 
+class ReplicaStrategyEnum(str, Enum):
+    round_robin = "round_robin"
+    least_connections = "least_connections"
+
+
 class Settings(BaseSettings):
     """
     Application settings pulled from environment variables or a .env file.
@@ -27,6 +32,15 @@ class Settings(BaseSettings):
     DEBUG: bool = False
     ALLOWED_ORIGINS: List[str] = Field(default_factory=list)
     MODE: ModeEnum = ModeEnum.dev
+    # render responses with orjson when it is installed
+    FAST_JSON_RESPONSES: bool = False
+    # Prometheus metrics on `/metrics`, unauthenticated: only enable it where
+    # the endpoint is not reachable from the public network,
+    # see `common.utils.instrumentation`
+    METRICS_ENABLED: bool = False
+    # `Server-Timing` headers with the DB and pool timings of each response,
+    # always sent with DEBUG
+    SERVER_TIMING_ENABLED: bool = False
 
     # database
     ASYNC_SQLITE_URI: str = ""
@@ -48,15 +62,67 @@ class Settings(BaseSettings):
     DATABASE_URI: PostgresDsn | str = ""
     ASYNC_DATABASE_URI: PostgresDsn | str = ""
 
+    # async engine pool, see `config.db.DatabaseRegistry`
+    DB_POOL_SIZE: int = 5
+    DB_MAX_OVERFLOW: int = 10
+    DB_POOL_TIMEOUT: float = 30.0  # seconds to wait for a free connection
+    DB_POOL_PRE_PING: bool = True
+    DB_POOL_RECYCLE: int = 1800  # seconds, -1 to never recycle
+    # asyncpg prepared statements cached per connection, 0 behind pgbouncer
+    DB_STATEMENT_CACHE_SIZE: int = 100
+    # statements slower than this are logged with their origin, `None` to disable
+    DB_SLOW_QUERY_THRESHOLD: float | None = 0.5  # seconds
+    # a statement run more times than this in one request is an N+1 pattern,
+    # logged or raised in testing mode; 0 to disable
+    DB_N_PLUS_ONE_THRESHOLD: int = 20
+
+    # read replicas, reads are routed to them by `config.db.RoutingSession`
+    ASYNC_REPLICA_URIS: List[str] = Field(default_factory=list)
+    DB_REPLICA_STRATEGY: ReplicaStrategyEnum = ReplicaStrategyEnum.round_robin
+    DB_REPLICA_HEALTH_CHECK_INTERVAL: float = 10.0  # seconds
+    DB_REPLICA_HEALTH_CHECK_TIMEOUT: float = 2.0  # seconds
+
     # redis
     REDIS_URI: RedisDsn | str = ""
     REDIS_HOST: str = "localhost"
     REDIS_PORT: int = 6379
     REDIS_PATH: str = "/0"
 
+    # in-process (L1) cache in front of the Redis repository cache,
+    # workers evict each other's entries through Redis pub/sub
+    CACHE_L1_ENABLED: bool = True
+    CACHE_L1_MAX_ENTRIES: int = 10_000
+    CACHE_L1_MAX_BYTES: int = 32 * 1024 * 1024
+    CACHE_L1_TTL: float = 30.0  # seconds
+
+    # background jobs on a Redis stream, see `common.utils.jobs`
+    JOBS_CONCURRENCY: int = 10  # jobs one worker runs at once
+    JOBS_MAX_ATTEMPTS: int = 3  # of the jobs failing on transient errors
+    JOBS_RETRY_DELAY: float = 1.0  # seconds before the first retry, then doubled
+    # seconds after which the job of a crashed worker is run by another one,
+    # running jobs are claimed again every third of it
+    JOBS_CLAIM_TIMEOUT: float = 300.0
+    JOBS_RESULT_TTL: int = 86_400  # seconds job statuses and results are kept
+
+    # streamed ingests (NDJSON / CSV bodies), see `common.utils.streaming`
+    INGEST_MAX_LINE_BYTES: int = 1024 * 1024  # longer lines/records answer 413
+    INGEST_MAX_ROW_ERRORS: int = 100  # row errors kept per batch in the report
+    INGEST_MAX_ERROR_BATCHES: int = 100  # batches with errors kept in the report
+
     # Add more custom settings as needed
     # e.g. rate_limit_per_minute: int = 30
 
+    @property
+    def server_timing(self) -> bool:
+        return self.SERVER_TIMING_ENABLED or self.DEBUG
+
+    @property
+    def instrumentation(self) -> bool:
+        """
+        Whether requests and statements are timed, for metrics or headers
+        """
+        return self.METRICS_ENABLED or self.server_timing
+
     @field_validator("REDIS_URI", mode="after")
     def assemble_redis_uri(cls, v: str | None, info: ValidationInfo) -> Any:
         if isinstance(v, str):
@@ -1,6 +1,13 @@
 from fastapi import APIRouter
 
 from api.urls import api_router
+from common.utils.instrumentation import router as metrics_router
+from config.settings import get_settings
+
+settings = get_settings()
 
 router = APIRouter()
 router.include_router(api_router, prefix="/api")
+
+if settings.METRICS_ENABLED:
+    router.include_router(metrics_router)
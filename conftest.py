@@ -1,12 +1,13 @@
 # conftest.py
 import pytest
+import redis.asyncio as async_redis
+from httpx import ASGITransport, AsyncClient
 from pydantic import PostgresDsn
-from sqlalchemy import NullPool
-from sqlalchemy.ext.asyncio import create_async_engine
-from sqlalchemy.orm import sessionmaker
+from redis.exceptions import RedisError
 from sqlmodel import SQLModel
-from sqlmodel.ext.asyncio.session import AsyncSession
 
+from common.repository.cache import local_cache
+from config.db import db, get_session
 from config.settings import get_settings
 
 settings = get_settings()
@@ -14,11 +15,8 @@ settings = get_settings()
 
 @pytest.fixture(scope="session")
 async def async_db_engine():
-    async_engine = create_async_engine(
-        url=str(settings.ASYNC_DATABASE_URI),
-        echo=True,
-        poolclass=NullPool,  # Asincio pytest works with NullPool
-    )
+    # same registry as the app, NullPool in testing mode
+    async_engine = db.async_engine
     async with async_engine.begin() as conn:
         await conn.run_sync(SQLModel.metadata.create_all)
 
@@ -27,15 +25,12 @@ async def async_db_engine():
     async with async_engine.begin() as conn:
         await conn.run_sync(SQLModel.metadata.drop_all)
 
-    await async_engine.dispose()
+    await db.dispose()
 
 
 @pytest.fixture(scope="function")
 async def db_session(async_db_engine):
-    async_session = sessionmaker(
-        async_db_engine, class_=AsyncSession, expire_on_commit=False
-    )
-    async with async_session() as session:
+    async with db.session_factory() as session:
         yield session
 
 
@@ -45,3 +40,53 @@ async def truncate_tables(async_db_engine):
     async with async_db_engine.begin() as conn:
         for table in reversed(SQLModel.metadata.sorted_tables):
             await conn.execute(table.delete())
+
+
+@pytest.fixture(scope="function")
+async def client(db_session):
+    from main import app
+
+    app.dependency_overrides[get_session] = lambda: db_session
+    async with AsyncClient(
+        transport=ASGITransport(app=app), base_url="http://test"
+    ) as async_client:
+        yield async_client
+    app.dependency_overrides.clear()
+
+
+@pytest.fixture(autouse=True)
+async def redis_connection():
+    """
+    Redis from `REDIS_URI`, or `None` when it is not reachable.
+    Keys under the app prefix are cleared around each test so cached entries
+    never leak between tests.
+    """
+    client = async_redis.Redis.from_url(
+        url=str(settings.REDIS_URI), decode_responses=True
+    )
+    try:
+        await client.ping()
+    except RedisError:
+        await client.aclose()
+        yield None
+        return
+
+    async def clear():
+        local_cache.clear()
+        async for key in client.scan_iter(match=f"{settings.APP_NAME}:*"):
+            await client.delete(key)
+
+    await clear()
+    yield client
+    await clear()
+    await client.aclose()
+
+
+@pytest.fixture(scope="function")
+async def redis_client(redis_connection):
+    """
+    Tests using Redis are skipped when it is not reachable
+    """
+    if redis_connection is None:
+        pytest.skip("Redis is not available")
+    return redis_connection
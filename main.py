@@ -1,9 +1,14 @@
-from contextlib import asynccontextmanager
+import asyncio
+from contextlib import asynccontextmanager, suppress
 
 from fastapi import FastAPI
 from fastapi_pagination import add_pagination
 
-from config.redis import shutdown_redis
+from common.repository.cache import listen_for_invalidations
+from common.utils.instrumentation import InstrumentationMiddleware
+from common.utils.responses import default_response_class
+from config.db import db
+from config.redis import redis_registry, shutdown_redis
 from config.settings import get_settings
 from config.urls import router as root_router
 
@@ -16,10 +21,31 @@ async def lifespan(app: FastAPI):
     Init the app on startup
     """
     # Do stuff when starting
+    db.init()
+
+    replica_checks = None
+    if db.router is not None:
+        replica_checks = asyncio.create_task(
+            db.router.run_health_checks(settings.DB_REPLICA_HEALTH_CHECK_INTERVAL)
+        )
+
+    cache_listener = None
+    if settings.CACHE_L1_ENABLED:
+        cache_listener = asyncio.create_task(
+            listen_for_invalidations(redis_registry.client)
+        )
 
     yield
 
     # Do stuff when closing
+    for task in (cache_listener, replica_checks):
+        if task is not None:
+            task.cancel()
+            with suppress(asyncio.CancelledError):
+                await task
+
+    # database
+    await db.dispose()
 
     # redis
     await shutdown_redis()
@@ -36,10 +62,16 @@ def create_app() -> FastAPI:
         redoc_url=None if is_prod else "/redoc",
         openapi_url=None if is_prod else "/openapi.json",
         lifespan=lifespan,
+        default_response_class=default_response_class(settings),
     )
 
     app.include_router(root_router)
 
+    if settings.instrumentation:
+        app.add_middleware(
+            InstrumentationMiddleware, server_timing=settings.server_timing
+        )
+
     # add pagination
     add_pagination(app)
 
@@ -0,0 +1,249 @@
+"""
+Index audit: runs EXPLAIN over the queries the repositories of every app
+generate, for each of their `order_by_columns`, and reports sequential scans,
+sorts and the indexes missing to serve those orders.
+
+    poetry run audit_indexes
+    poetry run audit_indexes --emit-migration -m "index sortable columns"
+
+Exits with 1 when an index is missing. Queries run in a rolled back
+transaction, on Postgres with seq scans and sorts disabled so the plans show
+what the indexes can serve whatever the size of the tables.
+"""
+
+import argparse
+import asyncio
+import json
+import sys
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Iterator
+
+from pydantic import BaseModel
+from sqlalchemy import event, inspect, text
+from sqlalchemy.ext.asyncio import AsyncConnection
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from alembic.config import Config
+from alembic.script import ScriptDirectory
+from alembic.util import rev_id
+from common.repository.base import CRUDBase
+from common.schemas.enums import OrderEnum
+from config.apps import app_registry
+from config.db import db
+
+ROOT = Path(__file__).resolve().parents[1]
+
+Probe = tuple[str, str | None, Callable[[], Awaitable[Any]]]
+
+
+class Finding(BaseModel):
+    repository: str
+    call: str
+    issues: list[str]
+
+
+class IndexSuggestion(BaseModel):
+    table: str
+    columns: list[str]
+
+    @property
+    def name(self) -> str:
+        return f"ix_{self.table}_{'_'.join(self.columns)}"
+
+
+class AuditReport(BaseModel):
+    findings: list[Finding] = []
+    suggestions: list[IndexSuggestion] = []
+
+
+def repositories() -> list[type[CRUDBase]]:
+    """
+    `CRUDBase` subclasses of the `repositories` package of every app
+    """
+    app_registry.import_modules("repositories")
+
+    def subclasses(cls: type) -> Iterator[type]:
+        for subclass in cls.__subclasses__():
+            yield subclass
+            yield from subclasses(subclass)
+
+    return [cls for cls in subclasses(CRUDBase) if cls.__module__.startswith("apps.")]
+
+
+def probes(repo: CRUDBase) -> Iterator[Probe]:
+    """
+    `(call, order_by column, call)` for each read query of the repository
+    """
+    yield "get_multi()", None, lambda: repo.get_multi()
+    yield "get_multi_paginated()", None, lambda: repo.get_multi_paginated()
+    for column in repo.sortable_columns():
+        for order in OrderEnum:
+            kwargs = {"order_by": column, "order": order}
+            args = f"order_by={column}, order={order.value}"
+            for method in (
+                "get_multi_ordered",
+                "get_multi_paginated_ordered",
+                "get_multi_cursor_paginated_ordered",
+            ):
+                yield (
+                    f"{method}({args})",
+                    column,
+                    lambda method=method, kwargs=kwargs: getattr(repo, method)(**kwargs),
+                )
+
+
+async def explain(conn: AsyncConnection, statement: str, parameters: Any) -> list[str]:
+    """
+    Sequential scans and sorts in the plan of `statement`
+    """
+    if conn.dialect.name == "postgresql":
+        result = await conn.exec_driver_sql(
+            f"EXPLAIN (FORMAT JSON) {statement}", parameters
+        )
+        plan = result.scalar_one()
+        plan = json.loads(plan) if isinstance(plan, str) else plan
+        return list(_postgres_issues(plan[0]["Plan"]))
+
+    result = await conn.exec_driver_sql(f"EXPLAIN QUERY PLAN {statement}", parameters)
+    return list(_sqlite_issues([row[-1] for row in result]))
+
+
+async def audit(conn: AsyncConnection) -> AuditReport:
+    report = AuditReport()
+    statements: list[tuple[str, Any]] = []
+
+    def capture(conn, cursor, statement, parameters, context, executemany) -> None:
+        statements.append((statement, parameters))
+
+    # everything runs in one transaction, rolled back at the end
+    if conn.dialect.name == "postgresql":
+        await conn.execute(text("SET LOCAL enable_seqscan = off"))
+        await conn.execute(text("SET LOCAL enable_sort = off"))
+
+    session = AsyncSession(bind=conn)
+    event.listen(conn.sync_connection, "before_cursor_execute", capture)
+    try:
+        for repository in repositories():
+            repo = repository(session=session)
+            repo.cache = None  # audit the database queries, not the cache
+            table = repo.model.__tablename__
+            for call, column, run in probes(repo):
+                statements.clear()
+                await run()
+                issues = []
+                for statement, parameters in list(statements):
+                    issues += await explain(conn, statement, parameters)
+                issues = list(dict.fromkeys(issues))
+                if not issues:
+                    continue
+
+                report.findings.append(
+                    Finding(repository=repository.__name__, call=call, issues=issues)
+                )
+                # the order is served by an index on `(column, id)`, the id also
+                # being the tie-breaker of keyset pagination
+                if column in (None, "id") or not any(
+                    issue.startswith("sort") for issue in issues
+                ):
+                    continue
+                suggestion = IndexSuggestion(table=table, columns=[column, "id"])
+                if suggestion not in report.suggestions:
+                    report.suggestions.append(suggestion)
+    finally:
+        event.remove(conn.sync_connection, "before_cursor_execute", capture)
+        await session.close()
+        await conn.rollback()
+    return report
+
+
+def emit_migration(suggestions: list[IndexSuggestion], message: str) -> str:
+    """
+    Write an Alembic revision creating the suggested indexes, returns its path
+    """
+    script = ScriptDirectory.from_config(Config(str(ROOT / "alembic.ini")))
+    upgrades = [
+        f"op.create_index({index.name!r}, {index.table!r}, {index.columns!r})"
+        for index in suggestions
+    ]
+    downgrades = [
+        f"op.drop_index({index.name!r}, table_name={index.table!r})"
+        for index in reversed(suggestions)
+    ]
+    revision = script.generate_revision(
+        rev_id(),
+        message,
+        head="head",
+        upgrades="\n    ".join(upgrades),
+        downgrades="\n    ".join(downgrades),
+    )
+    return revision.path
+
+
+def print_report(report: AuditReport) -> None:
+    repository = None
+    for finding in report.findings:
+        if finding.repository != repository:
+            repository = finding.repository
+            print(repository)
+        print(f"  {finding.call}")
+        for issue in finding.issues:
+            print(f"    - {issue}")
+
+    if not report.suggestions:
+        print("No missing index")
+        return
+    print("\nMissing indexes, also declare them in the model `__table_args__`:")
+    for index in report.suggestions:
+        columns = ", ".join(map(repr, index.columns))
+        print(f"  {index.table}: Index({index.name!r}, {columns})")
+
+
+async def run(args: argparse.Namespace) -> int:
+    async with db.async_engine.connect() as conn:
+        existing = await conn.run_sync(
+            lambda sync_conn: inspect(sync_conn).get_table_names()
+        )
+        if not existing:
+            print("No tables, run the migrations first", file=sys.stderr)
+            return 2
+        report = await audit(conn)
+    await db.dispose()
+
+    print_report(report)
+    if args.emit_migration and report.suggestions:
+        print(f"\nWrote {emit_migration(report.suggestions, args.message)}")
+    return 1 if report.suggestions else 0
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Report the repository queries no index serves"
+    )
+    parser.add_argument(
+        "--emit-migration",
+        action="store_true",
+        help="write an Alembic revision creating the missing indexes",
+    )
+    parser.add_argument("-m", "--message", default="add missing indexes")
+    sys.exit(asyncio.run(run(parser.parse_args())))
+
+
+def _postgres_issues(node: dict[str, Any]) -> Iterator[str]:
+    if node["Node Type"] == "Seq Scan":
+        yield f"seq scan on {node['Relation Name']}"
+    elif node["Node Type"] in ("Sort", "Incremental Sort"):
+        yield f"sort on {', '.join(node['Sort Key'])}"
+    for child in node.get("Plans", []):
+        yield from _postgres_issues(child)
+
+
+def _sqlite_issues(details: list[str]) -> Iterator[str]:
+    for detail in details:
+        if detail.startswith("SCAN ") and "INDEX" not in detail:
+            yield f"seq scan on {detail.split()[1]}"
+        elif detail.startswith("USE TEMP B-TREE FOR"):
+            yield f"sort, {detail.lower()}"
+
+
+if __name__ == "__main__":
+    main()
@@ -2,18 +2,12 @@ import asyncio
 
 import nest_asyncio
 from IPython.terminal.embed import InteractiveShellEmbed
-from sqlalchemy import NullPool
-from sqlalchemy.ext.asyncio import create_async_engine
-from sqlalchemy.orm import sessionmaker
-from sqlmodel.ext.asyncio.session import AsyncSession
+from sqlmodel import SQLModel
 from traitlets.config import Config
 
-from apps.example.models import *
-from apps.example.repositories.somemodel_repo import *
-from apps.example.services.core_service import *
-from config.redis import *
-
-# App-specific imports (services, models, etc.)
+from config.apps import app_registry
+from config.db import db
+from config.redis import redis_registry
 from config.settings import get_settings
 
 # ---------------------------
@@ -23,19 +17,8 @@ from config.settings import get_settings
 # Load app settings (e.g. DB URL, debug mode)
 settings = get_settings()
 
-# Create async engine for SQLModel
-async_engine = create_async_engine(
-    url=str(settings.ASYNC_DATABASE_URI),
-    echo=settings.DEBUG,
-    poolclass=NullPool,
-)
-
-# Async session factory (like Django’s connection/session)
-async_session = sessionmaker(
-    bind=async_engine,
-    class_=AsyncSession,
-    expire_on_commit=False,
-)
+# Async session factory shared with the app (like Django’s connection/session)
+async_session = db.session_factory
 
 # Patch the event loop so we can re-enter it (IPython already has one running)
 nest_asyncio.apply()
@@ -50,10 +33,28 @@ banner = """
 Available:
 - session              : active AsyncSession
 - async_session        : session factory (for manual `async with`)
-- Imported all models/services from apps.example.*
+- redis                : the app's Redis client
+- app_registry         : the apps, e.g. app_registry.get_app_config("example")
+- the models of every app, by class name
+Repositories and services import on demand, e.g.
+    from apps.example.services.core_service import SomeModelService
 """
 
 
+def app_models() -> dict[str, type[SQLModel]]:
+    """
+    The models of every app, by class name
+    """
+    return {
+        name: value
+        for module in app_registry.import_models()
+        for name, value in vars(module).items()
+        if isinstance(value, type)
+        and issubclass(value, SQLModel)
+        and value is not SQLModel
+    }
+
+
 # Async entrypoint — ensures session context is active throughout shell
 async def start_shell():
     async with async_session() as session:
@@ -67,12 +68,18 @@ async def start_shell():
         # Start IPython with a preloaded namespace
         shell(
             user_ns={
+                **app_models(),
                 "session": session,
                 "async_session": async_session,
+                "redis": redis_registry.client,
+                "app_registry": app_registry,
                 # Add common service classes or helpers here if desired
             }
         )
 
+    await db.dispose()
+    await redis_registry.close()
+
 
 # Synchronous entrypoint for poetry/CLI
 def main():
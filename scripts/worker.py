@@ -0,0 +1,74 @@
+"""
+Background job worker: runs the jobs registered in the `jobs` module of every
+app, see `common.utils.jobs`. Stops on SIGINT / SIGTERM once the running jobs
+are done. Like the app, it evicts the keys other workers invalidate from its
+local cache (`CACHE_L1_ENABLED`).
+
+    poetry run worker
+    poetry run worker --concurrency 4
+"""
+
+import argparse
+import asyncio
+import logging
+import signal
+from contextlib import suppress
+
+from common.repository.cache import listen_for_invalidations
+from common.utils.jobs import Worker, job_queue, registry
+from config.apps import app_registry
+from config.db import db
+from config.redis import redis_registry, shutdown_redis
+from config.settings import get_settings
+
+settings = get_settings()
+
+
+def discover_jobs() -> list[str]:
+    """
+    Import the `jobs` module of every app, returns the registered job names
+    """
+    app_registry.import_modules("jobs")
+    return list(registry)
+
+
+async def run(args: argparse.Namespace) -> None:
+    discover_jobs()
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for signum in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(signum, stop.set)
+
+    cache_listener = None
+    if settings.CACHE_L1_ENABLED:
+        cache_listener = asyncio.create_task(
+            listen_for_invalidations(redis_registry.client)
+        )
+
+    try:
+        await Worker(job_queue, concurrency=args.concurrency).run(stop)
+    finally:
+        if cache_listener is not None:
+            cache_listener.cancel()
+            with suppress(asyncio.CancelledError):
+                await cache_listener
+        await db.dispose()
+        await shutdown_redis()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the background jobs")
+    parser.add_argument(
+        "--concurrency",
+        type=int,
+        default=settings.JOBS_CONCURRENCY,
+        help="jobs run at once",
+    )
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()